@@ -0,0 +1,158 @@
+"""CPU cost against bytes saved of each response compression setting.
+
+Fetches real payloads uncompressed, the OpenAPI schema, a page of the
+schedule, the seat map of a half booked session and the staff NDJSON
+stream of reservations, then compresses each with every available
+encoding at a few levels, once as a whole body and once chunk by chunk
+the way CompressionMiddleware handles streaming responses. The data it
+creates is removed at the end.
+
+    python benchmarks/compression.py [--sessions 100] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "planetarium_api_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from planetarium.booking import book_seats  # noqa: E402
+from planetarium.models import (  # noqa: E402
+    AstronomyShow,
+    PlanetariumDome,
+    SaleEvent,
+    ShowSession,
+)
+from planetarium_api_service.compression import COMPRESSORS  # noqa: E402
+
+LEVELS = {
+    "gzip": (1, 4, 6, 9),
+    "br": (1, 4, 5, 9, 11),
+    "zstd": (1, 3, 6, 12, 19),
+}
+
+
+def fetch(client, path, **headers):
+    response = client.get(path, HTTP_ACCEPT_ENCODING="identity", **headers)
+    if response.streaming:
+        return list(response.streaming_content)
+    return [response.content]
+
+
+def timed(compressor_class, level, chunks, streamed, repeat):
+    """(compressed bytes, median seconds) of compressing `chunks`"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compressor = compressor_class(level)
+        if streamed:
+            size = sum(
+                len(compressor.compress(chunk) + compressor.flush())
+                for chunk in chunks
+            )
+        else:
+            size = len(compressor.compress(b"".join(chunks)))
+        size += len(compressor.finish())
+        timings.append(time.perf_counter() - started)
+    return size, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    astronomy_show = AstronomyShow.objects.create(
+        title="Compression benchmark",
+        description="Payload for the compression benchmark",
+    )
+    dome = PlanetariumDome.objects.create(
+        name="Compression benchmark", rows=20, seats_in_row=30
+    )
+    show_time = timezone.now() + timedelta(days=1)
+    show_sessions = ShowSession.objects.bulk_create(
+        ShowSession(
+            astronomy_show=astronomy_show,
+            planetarium_dome=dome,
+            show_time=show_time + timedelta(hours=hours),
+        )
+        for hours in range(args.sessions)
+    )
+    staff = get_user_model().objects.create(
+        email="compression-benchmark@example.com", is_staff=True
+    )
+    client = Client(
+        HTTP_HOST="localhost",
+        HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(staff)}",
+    )
+    show_session = show_sessions[0]
+    try:
+        for row in range(1, dome.rows + 1):
+            for seat in range(1, dome.seats_in_row // 2, 2):
+                book_seats(
+                    staff.id,
+                    [(show_session, row, seat), (show_session, row, seat + 1)],
+                )
+
+        payloads = {
+            "schema": fetch(client, "/api/schema/?format=json"),
+            "schedule": fetch(
+                client, "/api/planetarium/show-session/?limit=100"
+            ),
+            "seat map": fetch(
+                client,
+                f"/api/planetarium/show-session/{show_session.id}/seats/",
+            ),
+            "stream": fetch(client, "/api/planetarium/reservation/stream/"),
+        }
+
+        print(f"encodings: {', '.join(COMPRESSORS)}")
+        print(
+            f"{'payload':<10}{'bytes':>9}{'mode':>8}{'encoding':>10}"
+            f"{'level':>7}{'ratio':>8}{'ms':>9}{'MB/s':>9}"
+        )
+        for name, chunks in payloads.items():
+            size = sum(len(chunk) for chunk in chunks)
+            modes = (False, True) if len(chunks) > 1 else (False,)
+            for streamed in modes:
+                for encoding, compressor_class in COMPRESSORS.items():
+                    for level in LEVELS[encoding]:
+                        compressed, seconds = timed(
+                            compressor_class, level, chunks, streamed,
+                            args.repeat,
+                        )
+                        print(
+                            f"{name:<10}{size:>9}"
+                            f"{'chunked' if streamed else 'whole':>8}"
+                            f"{encoding:>10}{level:>7}"
+                            f"{size / compressed:>8.2f}{seconds * 1000:>9.2f}"
+                            f"{size / seconds / 1e6:>9.1f}"
+                        )
+    finally:
+        staff.delete()
+        SaleEvent.objects.filter(
+            show_session_id__in=[session.id for session in show_sessions]
+        ).delete()
+        ShowSession.objects.filter(
+            id__in=[session.id for session in show_sessions]
+        ).delete()
+        dome.delete()
+        astronomy_show.delete()
+
+
+if __name__ == "__main__":
+    main()
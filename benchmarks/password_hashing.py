@@ -0,0 +1,61 @@
+"""Registration password hashing throughput per core.
+
+Hashes passwords the way CreateUserView does, first on one thread and
+then on PASSWORD_HASHING_WORKERS threads, for each configured hasher.
+
+    python benchmarks/password_hashing.py [--seconds 3]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "planetarium_api_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import get_hasher, make_password  # noqa: E402
+
+
+def hashes_per_second(executor, workers, algorithm, seconds):
+    """keep `workers` hashes in flight for `seconds`, return hashes/s"""
+    done = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        futures = [
+            executor.submit(make_password, "s3cret-passw0rd", None, algorithm)
+            for _ in range(workers)
+        ]
+        wait(futures)
+        done += workers
+    return done / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    workers = settings.PASSWORD_HASHING_WORKERS
+    print(f"PASSWORD_HASHING_WORKERS={workers}, cpu_count={os.cpu_count()}")
+    print(f"{'hasher':<14}{'1 thread/s':>12}{'pool/s':>10}{'per core/s':>12}")
+
+    for algorithm in ("pbkdf2_sha256", "argon2", "scrypt"):
+        get_hasher(algorithm)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            single = hashes_per_second(executor, 1, algorithm, args.seconds)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pooled = hashes_per_second(executor, workers, algorithm, args.seconds)
+        per_core = pooled / min(workers, os.cpu_count() or 1)
+        print(f"{algorithm:<14}{single:>12.1f}{pooled:>10.1f}{per_core:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Reservation throughput with many bookers racing for one show session.
+
+Each booker thread keeps booking random blocks of adjacent seats of the
+same session, the way ReservationSerializer does, until every seat is
+taken. Meant to run against PostgreSQL, the data it creates is removed
+at the end.
+
+    python benchmarks/reservation_contention.py [--bookers 48] [--seats 2]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "planetarium_api_service.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from planetarium.booking import SeatsTaken, book_seats  # noqa: E402
+from planetarium.models import (  # noqa: E402
+    AstronomyShow,
+    PlanetariumDome,
+    SaleEvent,
+    ShowSession,
+)
+
+
+def booker(user, show_session, seats, results, lock):
+    dome = show_session.planetarium_dome
+    try:
+        while True:
+            free = set(
+                (row, seat)
+                for row in range(1, dome.rows + 1)
+                for seat in range(1, dome.seats_in_row + 1)
+            ) - set(show_session.active_tickets.values_list("row", "seat"))
+            blocks = [
+                (row, first)
+                for row, first in free
+                if all(
+                    (row, seat) in free for seat in range(first, first + seats)
+                )
+            ]
+            if not blocks:
+                return
+
+            row, first = random.choice(blocks)
+            block = [
+                (show_session, row, seat)
+                for seat in range(first, first + seats)
+            ]
+            started = time.perf_counter()
+            try:
+                book_seats(user.id, block)
+                outcome = "booked"
+            except SeatsTaken:
+                outcome = "conflict"
+            except Exception:
+                outcome = "error"
+            with lock:
+                results[outcome].append(time.perf_counter() - started)
+    finally:
+        connections.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookers", type=int, default=48)
+    parser.add_argument("--seats", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--seats-in-row", type=int, default=30)
+    args = parser.parse_args()
+
+    astronomy_show = AstronomyShow.objects.create(
+        title="Contention benchmark", description=""
+    )
+    dome = PlanetariumDome.objects.create(
+        name="Contention benchmark",
+        rows=args.rows,
+        seats_in_row=args.seats_in_row,
+    )
+    show_session = ShowSession.objects.create(
+        astronomy_show=astronomy_show,
+        planetarium_dome=dome,
+        show_time=timezone.now() + timedelta(days=1),
+    )
+    users = [
+        get_user_model().objects.create(
+            email=f"contention-benchmark-{number}@example.com"
+        )
+        for number in range(args.bookers)
+    ]
+    connection.close()
+
+    results = {"booked": [], "conflict": [], "error": []}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=booker, args=(user, show_session, args.seats, results, lock)
+        )
+        for user in users
+    ]
+    try:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        attempts = sum(len(latencies) for latencies in results.values())
+        print(
+            f"{args.bookers} bookers, {args.seats} seats per booking, "
+            f"{dome.capacity} seats, {connection.vendor}"
+        )
+        print(f"{'outcome':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        for outcome, latencies in results.items():
+            if len(latencies) > 1:
+                p50 = statistics.median(latencies) * 1000
+                p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+            else:
+                p50 = p95 = sum(latencies) * 1000
+            print(f"{outcome:<10}{len(latencies):>8}{p50:>10.1f}{p95:>10.1f}")
+        print(
+            f"{attempts / elapsed:.1f} attempts/s, "
+            f"{len(results['booked']) / elapsed:.1f} bookings/s "
+            f"in {elapsed:.2f}s"
+        )
+    finally:
+        for user in users:
+            user.delete()
+        SaleEvent.objects.filter(show_session_id=show_session.id).delete()
+        show_session.delete()
+        dome.delete()
+        astronomy_show.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+from django.db import transaction
+
+from planetarium.booking import create_reservation, lock_show_sessions
+
+# the best row sits this far back from the screen, as a share of all rows
+BEST_ROW_DEPTH = 0.6
+# how much a row away from the best row costs against a seat off centre
+ROW_WEIGHT = 0.5
+
+
+class NoSeatsAvailable(Exception):
+    pass
+
+
+def seat_scores(rows, seats_in_row):
+    """centre-weighted cost of every seat, lower is better"""
+    row_numbers = np.arange(1, rows + 1, dtype=np.float64)[:, None]
+    seat_numbers = np.arange(1, seats_in_row + 1, dtype=np.float64)[None, :]
+    best_row = 1 + BEST_ROW_DEPTH * (rows - 1)
+    centre_seat = (seats_in_row + 1) / 2
+    return (
+        np.abs(seat_numbers - centre_seat) / max(seats_in_row, 1)
+        + ROW_WEIGHT * np.abs(row_numbers - best_row) / max(rows, 1)
+    )
+
+
+def _window_sums(grid, width):
+    """sum of every `width` long horizontal window of a 2d grid"""
+    cumulative = np.cumsum(grid, axis=1, dtype=np.float64)
+    cumulative = np.pad(cumulative, ((0, 0), (1, 0)))
+    return cumulative[:, width:] - cumulative[:, :-width]
+
+
+def find_best_block(free, scores, count):
+    """return (row, first seat), 1-based, of the best block of `count`
+    adjacent free seats, or None when no row has such a block"""
+    if count > free.shape[1]:
+        return None
+
+    fits = _window_sums(free, count) == count
+    if not fits.any():
+        return None
+
+    cost = np.where(fits, _window_sums(scores, count), np.inf)
+    row, start = np.unravel_index(np.argmin(cost), cost.shape)
+    return int(row) + 1, int(start) + 1
+
+
+def reserve_best_available(user_id, show_session_id, count):
+    """atomically reserve the best block of `count` adjacent seats"""
+    with transaction.atomic():
+        show_session = lock_show_sessions([show_session_id])[show_session_id]
+        planetarium_dome = show_session.planetarium_dome
+
+        # aisles and gaps of the layout split rows into separate blocks
+        free = planetarium_dome.seat_layout.free_seats(
+            [
+                *show_session.active_tickets.values_list("row", "seat"),
+                *show_session.active_holds.values_list("row", "seat"),
+            ]
+        )
+
+        block = find_best_block(
+            free,
+            seat_scores(planetarium_dome.rows, planetarium_dome.seats_in_row),
+            count,
+        )
+        if block is None:
+            raise NoSeatsAvailable(f"No {count} adjacent seats are available.")
+
+        row, first_seat = block
+        return create_reservation(
+            user_id,
+            [
+                (show_session, row, seat)
+                for seat in range(first_seat, first_seat + count)
+            ],
+        )
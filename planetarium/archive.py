@@ -0,0 +1,235 @@
+"""Cold storage of past show sessions.
+
+Every archived reservation of a session becomes one JSON line in
+``ARCHIVE_ROOT/show-sessions-YYYY-MM.ndjson.gz``, by month of the show,
+and in the user's own ``ARCHIVE_ROOT/users/NNN/<user id>.ndjson.gz``,
+so the history of a user reads one small file. Each archiving run
+appends a new gzip member, and readers see the members as one stream.
+"""
+import gzip
+import json
+import os
+import shutil
+from collections import defaultdict
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from planetarium.models import Reservation, ShowSession, Ticket
+from planetarium.occupancy import bump_tickets_version
+
+ARCHIVE_FILE_PATTERN = "show-sessions-*.ndjson.gz"
+USER_ARCHIVE_DIR = "users"
+# user files are spread over this many directories
+USER_ARCHIVE_BUCKETS = 1000
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def archive_path(show_time):
+    return Path(settings.ARCHIVE_ROOT) / (
+        f"show-sessions-{show_time:%Y-%m}.ndjson.gz"
+    )
+
+
+def user_archive_path(user_id):
+    return (
+        Path(settings.ARCHIVE_ROOT)
+        / USER_ARCHIVE_DIR
+        / f"{user_id % USER_ARCHIVE_BUCKETS:03d}"
+        / f"{user_id}.ndjson.gz"
+    )
+
+
+def _append_lines(path, lines):
+    """append lines to a gzip file as a new member and sync it to disk"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as file:
+        with gzip.GzipFile(fileobj=file, mode="ab") as compressed:
+            compressed.writelines(lines)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def write_user_archives(lines_by_user):
+    """append lines to the archive files of their users"""
+    for user_id, lines in lines_by_user.items():
+        _append_lines(user_archive_path(user_id), lines)
+
+
+def archive_records(show_session_ids):
+    """yield (show_time, record) for every reservation of the sessions"""
+    tickets = (
+        Ticket.objects.filter(show_session_id__in=show_session_ids)
+        .order_by("show_session_id", "reservation_id", "row", "seat")
+        .values_list(
+            "show_session_id",
+            "reservation_id",
+            "reservation__user_id",
+            "reservation__created_at",
+            "reservation__cancelled_at",
+            "show_session__show_time",
+            "show_session__astronomy_show__title",
+            "show_session__planetarium_dome__name",
+            "row",
+            "seat",
+            "cancelled_at",
+        )
+        .iterator(chunk_size=settings.ARCHIVE_BATCH_SIZE)
+    )
+    for (show_session_id, reservation_id), group in groupby(
+        tickets, key=lambda ticket: ticket[:2]
+    ):
+        group = list(group)
+        (
+            _, _, user_id, created_at, cancelled_at,
+            show_time, astronomy_show, planetarium_dome, *_,
+        ) = group[0]
+        yield show_time, {
+            "user_id": user_id,
+            "reservation": reservation_id,
+            "created_at": _isoformat(created_at),
+            "cancelled_at": _isoformat(cancelled_at),
+            "show_session": {
+                "id": show_session_id,
+                "show_time": _isoformat(show_time),
+                "astronomy_show": astronomy_show,
+                "planetarium_dome": planetarium_dome,
+            },
+            "tickets": [
+                {
+                    "row": row,
+                    "seat": seat,
+                    "cancelled_at": _isoformat(ticket_cancelled_at),
+                }
+                for *_, row, seat, ticket_cancelled_at in group
+            ],
+        }
+
+
+def write_archive(records):
+    """append records to their monthly and user files, synced to disk
+
+    Lines of a user are buffered and written once per call, so a batch
+    keeps one file open per month instead of one per user.
+    Returns the number of written records.
+    """
+    files = {}
+    lines_by_user = defaultdict(list)
+    written = 0
+    try:
+        for show_time, record in records:
+            path = archive_path(show_time)
+            if path not in files:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                file = open(path, "ab")
+                files[path] = file, gzip.GzipFile(fileobj=file, mode="ab")
+            line = json.dumps(record).encode() + b"\n"
+            files[path][1].write(line)
+            lines_by_user[record["user_id"]].append(line)
+            written += 1
+    finally:
+        for file, compressed in files.values():
+            compressed.close()
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+    write_user_archives(lines_by_user)
+    return written
+
+
+def rebuild_user_archives():
+    """rewrite every user file from the monthly files
+
+    For archives written before user files existed, or to repair them.
+    Returns the number of users with archived reservations.
+    """
+    users_root = Path(settings.ARCHIVE_ROOT) / USER_ARCHIVE_DIR
+    shutil.rmtree(users_root, ignore_errors=True)
+    users = set()
+    for path in sorted(Path(settings.ARCHIVE_ROOT).glob(ARCHIVE_FILE_PATTERN)):
+        lines_by_user = defaultdict(list)
+        with gzip.open(path, "rb") as file:
+            for line in file:
+                lines_by_user[json.loads(line)["user_id"]].append(line)
+        write_user_archives(lines_by_user)
+        users.update(lines_by_user)
+    return len(users)
+
+
+def delete_show_sessions(show_session_ids):
+    """delete archived sessions, their tickets and emptied reservations
+
+    Tickets go with one raw DELETE per batch, skipping the per-ticket
+    signals, which only refresh caches of live sessions.
+    """
+    with transaction.atomic():
+        reservation_ids = set(
+            Ticket.objects.filter(
+                show_session_id__in=show_session_ids
+            ).values_list("reservation_id", flat=True)
+        )
+        placeholders = ", ".join(["%s"] * len(show_session_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Ticket._meta.db_table} "
+                f"WHERE show_session_id IN ({placeholders})",
+                list(show_session_ids),
+            )
+        # reservations with tickets for upcoming sessions stay
+        Reservation.objects.filter(id__in=reservation_ids).exclude(
+            tickets__isnull=False
+        ).delete()
+        ShowSession.objects.filter(id__in=show_session_ids).delete()
+
+
+def archive_show_sessions(before, batch_size=None):
+    """move sessions that started before `before` to the archive
+
+    Returns (archived sessions, archived reservations).
+    """
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    sessions = reservations = 0
+    while True:
+        show_session_ids = list(
+            ShowSession.objects.filter(show_time__lt=before)
+            .order_by("show_time", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not show_session_ids:
+            if sessions:
+                bump_tickets_version()
+            return sessions, reservations
+
+        reservations += write_archive(archive_records(show_session_ids))
+        delete_show_sessions(show_session_ids)
+        sessions += len(show_session_ids)
+
+
+def archived_reservations(user_id):
+    """archived reservations of a user, latest shows first
+
+    Reads only the user's own file. A run interrupted between writing
+    and deleting a batch archives it again on the next run, so repeated
+    records are dropped here.
+    """
+    path = user_archive_path(user_id)
+    if not path.exists():
+        return []
+    records = {}
+    with gzip.open(path, "rb") as file:
+        for line in file:
+            record = json.loads(line)
+            key = record["show_session"]["id"], record["reservation"]
+            records[key] = record
+    return sorted(
+        records.values(),
+        key=lambda record: (
+            record["show_session"]["show_time"], record["reservation"]
+        ),
+        reverse=True,
+    )
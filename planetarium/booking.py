@@ -0,0 +1,166 @@
+import time
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from planetarium.models import (
+    Reservation,
+    SaleEvent,
+    SeatHold,
+    ShowSession,
+    Ticket,
+)
+from planetarium.sales import record_sale_events
+from planetarium.signals import tickets_changed
+
+
+class SeatsTaken(Exception):
+    def __init__(self, seats):
+        self.seats = seats
+        super().__init__(
+            "Seats already taken: "
+            + ", ".join(
+                f"session {show_session_id} row {row} seat {seat}"
+                for show_session_id, row, seat in seats
+            )
+        )
+
+
+def lock_show_sessions(show_session_ids):
+    """lock the show session rows, in id order so bookers never deadlock
+
+    Every booking path takes this lock before checking seats, so seat
+    checks and inserts for a session are serialized without holding row
+    locks on tickets. On PostgreSQL the wait is capped by
+    RESERVATION_LOCK_TIMEOUT.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true)",
+                [f"{settings.RESERVATION_LOCK_TIMEOUT}ms"],
+            )
+    return {
+        show_session.id: show_session
+        for show_session in ShowSession.objects.select_for_update(of=("self",))
+        .select_related("planetarium_dome")
+        .filter(id__in=show_session_ids)
+        .order_by("id")
+    }
+
+
+def taken_seats(seats):
+    """the (show session, row, seat) of `seats` held by active tickets
+
+    `seats` is a list of (show_session, row, seat), checked in one query.
+    """
+    if not seats:
+        return []
+    return list(
+        Ticket.objects.active()
+        .filter(
+            reduce(
+                or_,
+                (
+                    Q(
+                        show_session_id=show_session.id,
+                        show_time=show_session.show_time,
+                        row=row,
+                        seat=seat,
+                    )
+                    for show_session, row, seat in seats
+                ),
+            )
+        )
+        .values_list("show_session_id", "row", "seat")
+    )
+
+
+def held_seats(seats):
+    """the (show session, row, seat) of `seats` kept for the waitlist
+
+    `seats` is a list of (show_session, row, seat), checked in one query.
+    """
+    if not seats:
+        return []
+    return list(
+        SeatHold.objects.filter(expires_at__gt=timezone.now())
+        .filter(
+            reduce(
+                or_,
+                (
+                    Q(show_session_id=show_session.id, row=row, seat=seat)
+                    for show_session, row, seat in seats
+                ),
+            )
+        )
+        .values_list("show_session_id", "row", "seat")
+    )
+
+
+def create_reservation(user_id, seats):
+    """insert a reservation and its tickets with one bulk INSERT
+
+    Must run under lock_show_sessions for every session in `seats`.
+    """
+    reservation = Reservation.objects.create(user_id=user_id)
+    Ticket.objects.bulk_create(
+        Ticket(
+            row=row,
+            seat=seat,
+            show_session=show_session,
+            show_time=show_session.show_time,
+            reservation=reservation,
+        )
+        for show_session, row, seat in seats
+    )
+    record_sale_events(
+        SaleEvent.SALE,
+        [(reservation.id, show_session.id) for show_session, _, _ in seats],
+    )
+
+    taken = defaultdict(list)
+    for show_session, row, seat in seats:
+        taken[show_session.id].append((row, seat))
+    for show_session_id, show_session_seats in taken.items():
+        tickets_changed.send(
+            sender=Ticket,
+            show_session_id=show_session_id,
+            taken=show_session_seats,
+            released=[],
+        )
+    return reservation
+
+
+def book_seats(user_id, seats):
+    """reserve the given (show_session, row, seat) seats all at once
+
+    Raises SeatsTaken when any seat is held by an active ticket or kept
+    for a waitlist offer. A lock
+    timeout, or a unique constraint hit by a writer that skipped the
+    session lock, rolls the attempt back and retries it up to
+    RESERVATION_RETRIES times.
+    """
+    for attempt in range(settings.RESERVATION_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                show_sessions = lock_show_sessions(
+                    {show_session.id for show_session, _, _ in seats}
+                )
+                seats = [
+                    (show_sessions[show_session.id], row, seat)
+                    for show_session, row, seat in seats
+                ]
+                taken = taken_seats(seats) + held_seats(seats)
+                if taken:
+                    raise SeatsTaken(taken)
+                return create_reservation(user_id, seats)
+        except (IntegrityError, OperationalError):
+            if attempt == settings.RESERVATION_RETRIES:
+                raise
+            time.sleep(settings.RESERVATION_RETRY_BACKOFF * 2 ** attempt)
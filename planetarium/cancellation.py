@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from planetarium.models import Reservation, SaleEvent, Ticket
+from planetarium.sales import record_sale_events
+from planetarium.signals import tickets_changed
+
+
+def cancel_tickets(tickets):
+    """release the seats of the given tickets in a single UPDATE
+
+    Tickets and their reservations are kept with ``cancelled_at`` set as
+    an audit trail. Reservations left without active tickets are
+    cancelled too. Returns the number of released seats.
+    """
+    with transaction.atomic():
+        cancelled_at = timezone.now()
+        released = list(
+            tickets.active().values_list(
+                "id", "show_session_id", "row", "seat", "reservation_id"
+            )
+        )
+        if not released:
+            return 0
+
+        Ticket.objects.filter(
+            id__in=[ticket_id for ticket_id, *_ in released],
+            cancelled_at__isnull=True,
+        ).update(cancelled_at=cancelled_at)
+
+        Reservation.objects.filter(
+            id__in={reservation_id for *_, reservation_id in released},
+            cancelled_at__isnull=True,
+        ).exclude(
+            tickets__cancelled_at__isnull=True,
+        ).update(cancelled_at=cancelled_at)
+
+        record_sale_events(
+            SaleEvent.CANCELLATION,
+            [
+                (reservation_id, show_session_id)
+                for _, show_session_id, _, _, reservation_id in released
+            ],
+        )
+
+        released_seats = defaultdict(list)
+        for _, show_session_id, row, seat, _ in released:
+            released_seats[show_session_id].append((row, seat))
+        for show_session_id, seats in released_seats.items():
+            tickets_changed.send(
+                sender=Ticket,
+                show_session_id=show_session_id,
+                taken=[],
+                released=seats,
+            )
+
+    return len(released)
+
+
+def cancel_reservation(reservation):
+    return cancel_tickets(Ticket.objects.filter(reservation=reservation))
+
+
+def cancel_show_session_reservations(show_session):
+    """cancel every booking of a show session that was called off"""
+    return cancel_tickets(Ticket.objects.for_show_session(show_session))
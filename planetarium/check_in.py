@@ -0,0 +1,109 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+
+from planetarium.models import Ticket
+from planetarium.tokens import (
+    InvalidTicketToken,
+    TicketClaims,
+    sign_token,
+    verify_token,
+)
+
+
+def signing_key():
+    """TICKET_TOKEN_KEY, or a key derived from SECRET_KEY without it"""
+    if settings.TICKET_TOKEN_KEY:
+        return settings.TICKET_TOKEN_KEY.encode()
+    return hashlib.sha256(
+        f"planetarium.tokens:{settings.SECRET_KEY}".encode()
+    ).digest()
+
+
+def ticket_token(ticket):
+    claims = TicketClaims(
+        ticket.id, ticket.show_session_id, ticket.row, ticket.seat
+    )
+    return sign_token(claims, signing_key())
+
+
+def check_in_tickets(show_session, scans):
+    """record door scans of `show_session`, one result per scan
+
+    `scans` is a list of (token, scanned_at). Tokens are verified without
+    the database, then the scanned tickets are locked and read in one
+    query and checked in with one UPDATE per CHECK_IN_BATCH_SIZE
+    tickets. The earliest scan of a ticket checks it in, any other scan
+    of it, in this batch or an earlier one, is a duplicate.
+    """
+    key = signing_key()
+    results = [None] * len(scans)
+    scans_per_ticket = {}
+    for index, (token, scanned_at) in enumerate(scans):
+        try:
+            claims = verify_token(token, key)
+        except InvalidTicketToken:
+            results[index] = {
+                "ticket": None, "status": "invalid", "checked_in_at": None,
+            }
+            continue
+        if claims.show_session != show_session.id:
+            results[index] = {
+                "ticket": claims.ticket,
+                "status": "wrong_session",
+                "checked_in_at": None,
+            }
+            continue
+        scans_per_ticket.setdefault(claims.ticket, []).append(
+            (scanned_at, index, claims)
+        )
+
+    with transaction.atomic():
+        tickets = {
+            ticket.id: ticket
+            for ticket in Ticket.objects.for_show_session(show_session)
+            .filter(id__in=scans_per_ticket)
+            .select_for_update()
+            .only("id", "row", "seat", "cancelled_at", "checked_in_at")
+        }
+
+        checked_in = {}
+        for ticket_id, ticket_scans in scans_per_ticket.items():
+            ticket_scans.sort(key=lambda scan: scan[:2])
+            scanned_at, index, claims = ticket_scans[0]
+            ticket = tickets.get(ticket_id)
+            if ticket is None or (ticket.row, ticket.seat) != claims[2:]:
+                status = "invalid"
+            elif ticket.cancelled_at is not None:
+                status = "cancelled"
+            elif ticket.checked_in_at is not None:
+                status = "duplicate"
+            else:
+                status = "checked_in"
+                ticket.checked_in_at = scanned_at
+                checked_in[ticket_id] = scanned_at
+
+            for position, (_, index, _) in enumerate(ticket_scans):
+                results[index] = {
+                    "ticket": ticket_id,
+                    "status": status if position == 0 else "duplicate",
+                    "checked_in_at": getattr(ticket, "checked_in_at", None),
+                }
+
+        ticket_ids = list(checked_in)
+        for start in range(0, len(ticket_ids), settings.CHECK_IN_BATCH_SIZE):
+            batch = ticket_ids[start:start + settings.CHECK_IN_BATCH_SIZE]
+            Ticket.objects.for_show_session(show_session).filter(
+                id__in=batch
+            ).update(
+                checked_in_at=Case(
+                    *(
+                        When(id=ticket_id, then=Value(checked_in[ticket_id]))
+                        for ticket_id in batch
+                    ),
+                    output_field=DateTimeField(),
+                )
+            )
+    return results
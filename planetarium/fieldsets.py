@@ -0,0 +1,218 @@
+"""Sparse fieldsets and expansion for read endpoints.
+
+``?fields=id,astronomy_show.title`` limits the response to the listed
+fields, dotted names select fields of nested serializers.
+``?expand=planetarium_dome`` swaps in the nested serializers declared in
+``Meta.expandable_fields``. The queryset follows the selected fields:
+relations are joined or prefetched only when some field reads them, and
+columns no field reads are deferred.
+"""
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type=OpenApiTypes.STR,
+        description=(
+            "Comma separated fields to return, dotted names select nested "
+            "fields (ex. ?fields=id,astronomy_show.title)"
+        ),
+    ),
+    OpenApiParameter(
+        "expand",
+        type=OpenApiTypes.STR,
+        description=(
+            "Comma separated relations to return as nested objects "
+            "(ex. ?expand=planetarium_dome)"
+        ),
+    ),
+]
+
+
+def parse_fieldset(value):
+    """'id,show.title' -> {"id": None, "show": {"title": None}}
+
+    None selects every field of a nested serializer.
+    """
+    tree = {}
+    for path in value.split(","):
+        names = [name.strip() for name in path.split(".")]
+        if not all(names):
+            continue
+
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+class DynamicFieldsMixin:
+    """Serializer mixin for ?fields= and ?expand=.
+
+    ``Meta.expandable_fields`` maps a field name to (serializer class,
+    kwargs). ``Meta.field_sources`` lists the model columns read by fields
+    that are not plain model fields, e.g. properties, as "column" or
+    "relation__column". Fields reading anything else keep every column
+    of their model loaded.
+    """
+
+    _fieldset = None
+
+    def _is_root(self):
+        parent = getattr(self, "parent", None)
+        if isinstance(parent, serializers.ListSerializer):
+            parent = getattr(parent, "parent", None)
+        return parent is None
+
+    def _requested(self):
+        """(fieldset tree or None, expanded names) for this serializer"""
+        request = self.context.get("request")
+        if (
+            not self._is_root()
+            or request is None
+            or request.method not in SAFE_METHODS
+        ):
+            return self._fieldset, set()
+
+        fields = request.query_params.get("fields")
+        expand = request.query_params.get("expand", "")
+        return (
+            parse_fieldset(fields) if fields else None,
+            {name.strip() for name in expand.split(",") if name.strip()},
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset, expand = self._requested()
+
+        expandable_fields = getattr(self.Meta, "expandable_fields", {})
+        for name in expand & set(expandable_fields):
+            serializer_class, kwargs = expandable_fields[name]
+            fields[name] = serializer_class(read_only=True, **kwargs)
+
+        if fieldset is None:
+            return fields
+
+        selected = {}
+        for name, field in fields.items():
+            if name not in fieldset and name not in expand:
+                continue
+            nested = getattr(field, "child", field)
+            if fieldset.get(name) and isinstance(nested, DynamicFieldsMixin):
+                nested._fieldset = fieldset[name]
+            selected[name] = field
+        return selected
+
+    def optimize_queryset(self, queryset, prefix="", required=()):
+        """join, prefetch and defer only what the selected fields read
+
+        `prefix` is the select_related path of this serializer when it is
+        nested in the serializer of `queryset`, `required` are columns of
+        its model read by fields of the parent.
+        """
+        model = self.Meta.model
+        field_sources = getattr(self.Meta, "field_sources", {})
+        needed = defaultdict(set)
+        needed[""].update(required)
+        nested = {}
+        opaque = set()
+
+        for name, field in self.fields.items():
+            for source in field_sources.get(name, ()):
+                relation, _, column = source.rpartition("__")
+                needed[relation].add(column)
+
+            attrs = [] if field.source == "*" else field.source.split(".")
+            model_field = _model_field(model, attrs[0]) if attrs else None
+            if model_field is None:
+                # annotations are computed by the query, anything else
+                # may read any column
+                if name not in field_sources and not (
+                    attrs and attrs[0] in queryset.query.annotations
+                ):
+                    opaque.add("")
+                continue
+
+            path = prefix + attrs[0]
+            if not model_field.is_relation:
+                needed[""].add(attrs[0])
+            elif model_field.many_to_many or model_field.one_to_many:
+                child = getattr(field, "child", None)
+                if isinstance(child, DynamicFieldsMixin):
+                    related = model_field.related_model._default_manager.all()
+                    queryset = queryset.prefetch_related(
+                        Prefetch(path, queryset=child.optimize_queryset(related))
+                    )
+                else:
+                    queryset = queryset.prefetch_related(path)
+            elif len(attrs) == 1 and isinstance(field, serializers.RelatedField):
+                # primary key fields read the local foreign key column
+                if not field.use_pk_only_optimization():
+                    queryset = queryset.select_related(path)
+                    opaque.add(attrs[0])
+            else:
+                queryset = queryset.select_related(path)
+                if isinstance(field, DynamicFieldsMixin):
+                    nested[attrs[0]] = field
+                elif len(attrs) == 2 and (
+                    name in field_sources
+                    or _model_field(model_field.related_model, attrs[1])
+                ):
+                    if name not in field_sources:
+                        needed[attrs[0]].add(attrs[1])
+                else:
+                    opaque.add(attrs[0])
+
+        for relation, field in nested.items():
+            queryset = field.optimize_queryset(
+                queryset, f"{prefix}{relation}__", needed.pop(relation, ())
+            )
+
+        for relation, columns in needed.items():
+            if relation in opaque:
+                continue
+            related_model = (
+                model._meta.get_field(relation).related_model
+                if relation else model
+            )
+            path = f"{prefix}{relation}__" if relation else prefix
+            deferred = [
+                path + model_field.name
+                for model_field in related_model._meta.concrete_fields
+                if not model_field.is_relation
+                and not model_field.primary_key
+                and model_field.name not in columns
+            ]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        return queryset
+
+
+class SparseFieldsetMixin:
+    """viewset mixin shaping read querysets after ?fields= and ?expand="""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SAFE_METHODS:
+            serializer = self.get_serializer()
+            if isinstance(serializer, DynamicFieldsMixin):
+                queryset = serializer.optimize_queryset(queryset)
+        return queryset
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still in progress."
+    default_code = "idempotency_conflict"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = (
+        "This Idempotency-Key was already used with a different payload."
+    )
+    default_code = "idempotency_key_reused"
+
+
+class IdempotentCreateMixin:
+    """Replay stored responses for retried creates with an Idempotency-Key.
+
+    The first successful response is kept in the cache for
+    IDEMPOTENCY_KEY_TTL seconds. A duplicate sent while the first request
+    is still running waits for its response instead of racing it.
+    """
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                IDEMPOTENCY_HEADER,
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                description="Unique key that makes retries of this request safe",
+            ),
+        ]
+    )
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > 255:
+            raise ValidationError(
+                {IDEMPOTENCY_HEADER: "Ensure this value has at most 255 characters."}
+            )
+
+        cache_key = f"idempotency:{request.user.pk}:{key}"
+        lock_key = f"{cache_key}:lock"
+        fingerprint = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+
+            if cache.add(lock_key, fingerprint, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                try:
+                    response = super().create(request, *args, **kwargs)
+                    if status.is_success(response.status_code):
+                        cache.set(
+                            cache_key,
+                            {
+                                "fingerprint": fingerprint,
+                                "status": response.status_code,
+                                "data": response.data,
+                                "headers": dict(response.headers),
+                            },
+                            settings.IDEMPOTENCY_KEY_TTL,
+                        )
+                    return response
+                finally:
+                    cache.delete(lock_key)
+
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict()
+            time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+    @staticmethod
+    def _replay(stored, fingerprint):
+        if stored["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReused()
+
+        headers = {
+            name: value
+            for name, value in stored["headers"].items()
+            if name != "Content-Type"
+        }
+        headers["Idempotent-Replayed"] = "true"
+        return Response(stored["data"], status=stored["status"], headers=headers)
@@ -0,0 +1,122 @@
+"""Seat layouts of domes that are not a full rows x seats_in_row grid.
+
+A layout is a bitmask over the rows x seats_in_row grid of a dome, one
+bit per position packed row by row, 0 for aisles, removed seats and the
+ends of short curved rows. Seat numbers are positions in the grid, so a
+row with an aisle after seat 6 goes on with seat 8. Domes without a
+layout are full rectangles.
+
+Layouts are compiled once per process and layout, so looking a seat up
+is an index into a flat byte string.
+"""
+import functools
+
+import numpy as np
+
+SEAT = "#"
+NO_SEAT = "."
+
+# compiled layouts kept per process, one per dome and layout version
+LAYOUT_CACHE_SIZE = 256
+
+
+class InvalidLayout(ValueError):
+    pass
+
+
+class DomeLayout:
+    """compiled seat layout of a dome"""
+
+    __slots__ = ("rows", "seats_in_row", "mask", "capacity", "_cells")
+
+    def __init__(self, mask):
+        mask = np.array(mask, dtype=bool)
+        mask.setflags(write=False)
+        self.mask = mask
+        self.rows, self.seats_in_row = mask.shape
+        self.capacity = int(mask.sum())
+        self._cells = mask.tobytes()
+
+    def has_seat(self, row, seat):
+        """whether (row, seat), 1-based, is a seat of the layout"""
+        return (
+            1 <= row <= self.rows
+            and 1 <= seat <= self.seats_in_row
+            and self._cells[(row - 1) * self.seats_in_row + seat - 1] == 1
+        )
+
+    def free_seats(self, taken):
+        """bool grid of seats not in `taken`, a list of (row, seat)"""
+        free = self.mask.copy()
+        for row, seat in taken:
+            if self.has_seat(row, seat):
+                free[row - 1, seat - 1] = False
+        return free
+
+    def available(self, taken):
+        """number of seats not in `taken`"""
+        return self.capacity - len(
+            {(row, seat) for row, seat in taken if self.has_seat(row, seat)}
+        )
+
+
+def encode_layout(mask):
+    """pack a bool grid of seats into layout bytes"""
+    return np.packbits(np.asarray(mask, dtype=bool), axis=None).tobytes()
+
+
+def decode_layout(layout, rows, seats_in_row):
+    """unpack layout bytes into a rows x seats_in_row bool grid"""
+    cells = rows * seats_in_row
+    if len(layout) != (cells + 7) // 8:
+        raise InvalidLayout(
+            f"Layout of {len(layout)} bytes does not fit "
+            f"{rows} rows of {seats_in_row} seats."
+        )
+    bits = np.unpackbits(np.frombuffer(layout, dtype=np.uint8), count=cells)
+    return bits.astype(bool).reshape(rows, seats_in_row)
+
+
+def parse_layout(lines):
+    """bool grid of seats from one string per row, SEAT or NO_SEAT each"""
+    if not lines or not lines[0]:
+        raise InvalidLayout("Layout has no seats.")
+    if any(len(line) != len(lines[0]) for line in lines):
+        raise InvalidLayout("Every row of a layout must have the same length.")
+    if any(set(line) - {SEAT, NO_SEAT} for line in lines):
+        raise InvalidLayout(
+            f'Layout rows may only contain "{SEAT}" and "{NO_SEAT}".'
+        )
+    return np.array(
+        [[position == SEAT for position in line] for line in lines],
+        dtype=bool,
+    )
+
+
+def layout_lines(mask):
+    """one string per row of a bool grid of seats"""
+    return [
+        "".join(SEAT if position else NO_SEAT for position in row)
+        for row in mask.tolist()
+    ]
+
+
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def compile_layout(rows, seats_in_row, layout=None):
+    """DomeLayout of layout bytes, or of a full rectangle for None"""
+    if layout is None:
+        return DomeLayout(
+            np.ones((max(rows, 0), max(seats_in_row, 0)), dtype=bool)
+        )
+    return DomeLayout(decode_layout(layout, rows, seats_in_row))
+
+
+def dome_layout(planetarium_dome):
+    """compiled layout of a dome"""
+    layout = planetarium_dome.layout
+    if layout is not None:
+        # PostgreSQL returns memoryview, which is not hashable
+        layout = bytes(layout)
+    return compile_layout(
+        planetarium_dome.rows, planetarium_dome.seats_in_row, layout
+    )
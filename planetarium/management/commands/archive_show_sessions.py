@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from planetarium.archive import archive_show_sessions, rebuild_user_archives
+
+
+class Command(BaseCommand):
+    help = (
+        "Move past show sessions with their tickets and reservations "
+        "to the compressed archive"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help="Archive sessions that started more than this many days ago",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ARCHIVE_BATCH_SIZE,
+            help="Sessions written and deleted per transaction",
+        )
+        parser.add_argument(
+            "--rebuild-user-files",
+            action="store_true",
+            help="Rewrite the per-user files from the monthly files first",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild_user_files"]:
+            users = rebuild_user_archives()
+            self.stdout.write(f"Rebuilt archive files of {users} users")
+        before = timezone.now() - timedelta(days=options["days"])
+        sessions, reservations = archive_show_sessions(
+            before, options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {sessions} show sessions "
+                f"with {reservations} reservations"
+            )
+        )
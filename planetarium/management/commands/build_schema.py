@@ -0,0 +1,28 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from planetarium_api_service.schema import (
+    generate_schema,
+    write_schema_variants,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema served at /api/schema/ into SCHEMA_FILE, "
+        "with every format precompressed next to it"
+    )
+
+    def handle(self, *args, **options):
+        schema = generate_schema()
+        with open(settings.SCHEMA_FILE, "w") as schema_file:
+            json.dump(schema, schema_file)
+        variants = write_schema_variants(schema)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"OpenAPI schema written to {settings.SCHEMA_FILE} "
+                f"with {len(variants)} rendered variants"
+            )
+        )
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from planetarium.partitions import (
+    detach_ticket_partitions,
+    ensure_ticket_partitions,
+    is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly Ticket partitions and detach partitions "
+        "older than the retention period"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.TICKET_PARTITION_MONTHS_AHEAD,
+            help="Months past the current one to create partitions for",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.TICKET_PARTITION_RETENTION_MONTHS,
+            help=(
+                "Archive sessions of months older than this, then detach "
+                "their partitions"
+            ),
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop old partitions instead of keeping them detached",
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError(
+                "The Ticket table is not partitioned, "
+                "partitioning needs PostgreSQL."
+            )
+
+        for name in ensure_ticket_partitions(options["months_ahead"]):
+            self.stdout.write(f"Created partition {name}")
+
+        if options["retention_months"] is not None:
+            for name in detach_ticket_partitions(
+                options["retention_months"], drop=options["drop"]
+            ):
+                action = "Dropped" if options["drop"] else "Detached"
+                self.stdout.write(f"{action} partition {name}")
+
+        self.stdout.write(self.style.SUCCESS("Ticket partitions are up to date"))
@@ -0,0 +1,59 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from planetarium.waitlist import process_waitlist
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Offer freed seats to waitlisted users, notify them in batches "
+        "and expire unclaimed offers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run a single pass instead of working until stopped",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.WAITLIST_WORKER_INTERVAL,
+            help="Seconds to sleep between passes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.WAITLIST_BATCH_SIZE,
+            help="Entries offered per session and notified per batch",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                expired, offered, notified = process_waitlist(
+                    options["batch_size"]
+                )
+            except Exception:
+                if options["once"]:
+                    raise
+                # held seats stay held, the next pass picks up where this
+                # one failed
+                logger.exception("Waitlist pass failed")
+            else:
+                if expired or offered or notified or options["once"]:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Waitlist: {expired} offers expired, "
+                            f"{offered} made, {notified} notified"
+                        )
+                    )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,43 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from planetarium.sales import refresh_sales_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Fold new ticket sale events into the hourly sales rollup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help=(
+                "Keep refreshing every INTERVAL seconds until stopped "
+                "instead of refreshing once"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["interval"] is None:
+            self.report(refresh_sales_rollups())
+            return
+
+        while True:
+            try:
+                updated = refresh_sales_rollups()
+            except Exception:
+                # the events stay after the checkpoint for the next pass
+                logger.exception("Sales rollup refresh failed")
+            else:
+                if updated:
+                    self.report(updated)
+            time.sleep(options["interval"])
+
+    def report(self, updated):
+        self.stdout.write(
+            self.style.SUCCESS(f"Sales rollup refreshed, {updated} rows updated")
+        )
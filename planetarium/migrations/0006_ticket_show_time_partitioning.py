@@ -0,0 +1,119 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_show_time(apps, schema_editor):
+    Ticket = apps.get_model("planetarium", "Ticket")
+    ShowSession = apps.get_model("planetarium", "ShowSession")
+    Ticket.objects.update(
+        show_time=Subquery(
+            ShowSession.objects.filter(pk=OuterRef("show_session_id")).values(
+                "show_time"
+            )[:1]
+        )
+    )
+
+
+def rebuild_ticket_table(schema_editor, partitioned):
+    """recreate planetarium_ticket, partitioned by show_time or not
+
+    Partitioned tables need the partition key in every unique index, so
+    the primary key becomes (id, show_time). Rows land in a DEFAULT
+    partition; manage_ticket_partitions splits them into months.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    if partitioned:
+        primary_key = "PRIMARY KEY (id, show_time)"
+        partition_by = "PARTITION BY RANGE (show_time)"
+    else:
+        primary_key = "PRIMARY KEY (id)"
+        partition_by = ""
+
+    columns = (
+        'id, "row", seat, cancelled_at, show_time, '
+        "reservation_id, show_session_id"
+    )
+    for statement in [
+        "ALTER TABLE planetarium_ticket RENAME TO planetarium_ticket_old",
+        f"""
+        CREATE TABLE planetarium_ticket (
+            id bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY,
+            "row" integer NOT NULL,
+            seat integer NOT NULL,
+            cancelled_at timestamp with time zone NULL,
+            show_time timestamp with time zone NOT NULL,
+            reservation_id bigint NOT NULL
+                REFERENCES planetarium_reservation (id)
+                DEFERRABLE INITIALLY DEFERRED,
+            show_session_id bigint NOT NULL
+                REFERENCES planetarium_showsession (id)
+                DEFERRABLE INITIALLY DEFERRED,
+            {primary_key}
+        ) {partition_by}
+        """,
+        *(
+            [
+                "CREATE TABLE planetarium_ticket_default "
+                "PARTITION OF planetarium_ticket DEFAULT"
+            ]
+            if partitioned
+            else []
+        ),
+        f"INSERT INTO planetarium_ticket ({columns}) "
+        f"SELECT {columns} FROM planetarium_ticket_old",
+        "DROP TABLE planetarium_ticket_old",
+        "CREATE INDEX planetarium_ticket_reservation_id "
+        "ON planetarium_ticket (reservation_id)",
+        "CREATE INDEX planetarium_ticket_show_session_id "
+        "ON planetarium_ticket (show_session_id)",
+        "CREATE UNIQUE INDEX unique_active_ticket_seat "
+        'ON planetarium_ticket (show_session_id, "row", seat, show_time) '
+        "WHERE cancelled_at IS NULL",
+        "SELECT setval(pg_get_serial_sequence('planetarium_ticket', 'id'), "
+        "COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM planetarium_ticket",
+    ]:
+        schema_editor.execute(statement)
+
+
+def partition_tickets(apps, schema_editor):
+    rebuild_ticket_table(schema_editor, partitioned=True)
+
+
+def unpartition_tickets(apps, schema_editor):
+    rebuild_ticket_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0005_saleevent_salesrollup_salesrollupcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="show_time",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(copy_show_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="ticket",
+            name="show_time",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.RemoveConstraint(
+            model_name="ticket",
+            name="unique_active_ticket_seat",
+        ),
+        migrations.AddConstraint(
+            model_name="ticket",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("cancelled_at__isnull", True)),
+                fields=("show_session", "row", "seat", "show_time"),
+                name="unique_active_ticket_seat",
+            ),
+        ),
+        migrations.RunPython(partition_tickets, unpartition_tickets),
+    ]
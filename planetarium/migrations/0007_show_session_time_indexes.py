@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-19 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0006_ticket_show_time_partitioning"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="showsession",
+            index=models.Index(fields=["show_time"], name="show_session_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="showsession",
+            index=models.Index(
+                fields=["astronomy_show", "show_time"],
+                name="show_session_show_time_idx",
+            ),
+        ),
+    ]
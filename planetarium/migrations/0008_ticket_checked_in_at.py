@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0007_show_session_time_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="checked_in_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
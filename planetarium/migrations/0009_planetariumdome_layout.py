@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_total_seats(apps, schema_editor):
+    PlanetariumDome = apps.get_model("planetarium", "PlanetariumDome")
+    # existing domes have no layout, so every position is a seat
+    PlanetariumDome.objects.update(total_seats=F("rows") * F("seats_in_row"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planetarium", "0008_ticket_checked_in_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="planetariumdome",
+            name="layout",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="planetariumdome",
+            name="total_seats",
+            field=models.IntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_total_seats, migrations.RunPython.noop),
+    ]
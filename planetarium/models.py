@@ -1,10 +1,15 @@
 import os
 import uuid
 
-from django.db import models
+from django.core import exceptions
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 from rest_framework.exceptions import ValidationError
 
+from planetarium.layouts import InvalidLayout, dome_layout
 from planetarium_api_service import settings
 
 
@@ -36,14 +41,79 @@ class PlanetariumDome(models.Model):
     name = models.CharField(max_length=200)
     rows = models.IntegerField()
     seats_in_row = models.IntegerField()
+    # packed seat bitmask over rows x seats_in_row, see planetarium.layouts,
+    # None for a full rectangle
+    layout = models.BinaryField(null=True, blank=True)
+    # seats of the layout, kept by save() so SQL can read the capacity
+    total_seats = models.IntegerField(editable=False)
+
+    @property
+    def seat_layout(self):
+        return dome_layout(self)
 
     @property
     def capacity(self) -> int:
-        return self.rows * self.seats_in_row
+        return self.total_seats
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.total_seats = self.seat_layout.capacity
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        if self.layout is None:
+            return
+        if self.pk is not None:
+            stored = (
+                PlanetariumDome.objects.filter(pk=self.pk)
+                .values("rows", "seats_in_row", "layout")
+                .first()
+            )
+            if (
+                stored is not None
+                and stored["layout"] is not None
+                and bytes(stored["layout"]) == bytes(self.layout)
+                and (stored["rows"], stored["seats_in_row"])
+                != (self.rows, self.seats_in_row)
+            ):
+                raise exceptions.ValidationError(
+                    "The seat layout must be replaced or removed "
+                    "when rows or seats_in_row change."
+                )
+        try:
+            self.seat_layout
+        except InvalidLayout as error:
+            raise exceptions.ValidationError(str(error))
+
+
+class ShowSessionQuerySet(models.QuerySet):
+    def with_tickets_available(self):
+        """annotate tickets_sold and tickets_available per session"""
+        return self.annotate(
+            tickets_sold=Coalesce(
+                Subquery(
+                    # matching show_time lets the planner prune the count
+                    # to the session's ticket partition
+                    Ticket.objects.active()
+                    .filter(
+                        show_session=OuterRef("pk"),
+                        show_time=OuterRef("show_time"),
+                    )
+                    .order_by()
+                    .values("show_session")
+                    .annotate(count=Count("id"))
+                    .values("count")
+                ),
+                0,
+            )
+        ).annotate(
+            tickets_available=(
+                F("planetarium_dome__total_seats") - F("tickets_sold")
+            )
+        )
+
 
 class ShowSession(models.Model):
     astronomy_show = models.ForeignKey(
@@ -54,15 +124,44 @@ class ShowSession(models.Model):
     )
     show_time = models.DateTimeField()
 
+    objects = ShowSessionQuerySet.as_manager()
+
     class Meta:
+        indexes = [
+            # schedule queries are range scans over show_time
+            models.Index(fields=["show_time"], name="show_session_time_idx"),
+            models.Index(
+                fields=["astronomy_show", "show_time"],
+                name="show_session_show_time_idx",
+            ),
+        ]
         ordering = ["-show_time"]
 
     def __str__(self):
         return f"{self.astronomy_show.title} {self.show_time}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not adding:
+                # tickets carry the show time as their partition key
+                self.tickets.exclude(show_time=self.show_time).update(
+                    show_time=self.show_time
+                )
+
+    @property
+    def active_tickets(self):
+        return self.tickets.for_show_session(self).active()
+
+    @property
+    def active_holds(self):
+        return self.seat_holds.filter(expires_at__gt=timezone.now())
+
 
 class Reservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE
     )
@@ -74,6 +173,18 @@ class Reservation(models.Model):
         return str(self.created_at)
 
 
+class TicketQuerySet(models.QuerySet):
+    def active(self):
+        """tickets that still hold their seat"""
+        return self.filter(cancelled_at__isnull=True)
+
+    def for_show_session(self, show_session):
+        """tickets of a session, pruned to the partition of its show time"""
+        return self.filter(
+            show_session=show_session, show_time=show_session.show_time
+        )
+
+
 class Ticket(models.Model):
     row = models.IntegerField()
     seat = models.IntegerField()
@@ -83,9 +194,23 @@ class Ticket(models.Model):
     reservation = models.ForeignKey(
         Reservation, on_delete=models.CASCADE, related_name="tickets"
     )
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    checked_in_at = models.DateTimeField(null=True, blank=True)
+    # copy of show_session.show_time, the key tickets are partitioned by
+    show_time = models.DateTimeField(editable=False)
+
+    objects = TicketQuerySet.as_manager()
 
     class Meta:
-        unique_together = ("show_session", "row", "seat")
+        constraints = [
+            # show_time follows show_session, so this still makes
+            # (show_session, row, seat) unique among active tickets
+            models.UniqueConstraint(
+                fields=["show_session", "row", "seat", "show_time"],
+                condition=models.Q(cancelled_at__isnull=True),
+                name="unique_active_ticket_seat",
+            ),
+        ]
         ordering = ["row", "seat"]
 
     def __str__(self):
@@ -108,6 +233,10 @@ class Ticket(models.Model):
                                           f"(1, {count_attrs})"
                     }
                 )
+        if not planetarium_dome.seat_layout.has_seat(row, seat):
+            raise error_to_raise(
+                {"seat": f"row {row} has no seat {seat} in this dome"}
+            )
 
     def save(
             self,
@@ -116,6 +245,7 @@ class Ticket(models.Model):
             using=None,
             update_fields=None,
     ):
+        self.show_time = self.show_session.show_time
         self.full_clean()
         return super(Ticket, self).save(
             force_insert, force_update, using, update_fields
@@ -128,3 +258,167 @@ class Ticket(models.Model):
             self.show_session.planetarium_dome,
             ValidationError,
         )
+
+
+class WaitlistEntry(models.Model):
+    """A user waiting for seats of a sold-out show session.
+
+    Entries double as the waitlist queue: waiting entries are offered
+    seats in id order, offered entries are notified and expire.
+    """
+
+    WAITING = "waiting"
+    OFFERED = "offered"
+    CLAIMED = "claimed"
+    EXPIRED = "expired"
+    LEFT = "left"
+    STATUS_CHOICES = [
+        (WAITING, "Waiting"),
+        (OFFERED, "Offered"),
+        (CLAIMED, "Claimed"),
+        (EXPIRED, "Expired"),
+        (LEFT, "Left"),
+    ]
+
+    show_session = models.ForeignKey(
+        ShowSession, on_delete=models.CASCADE, related_name="waitlist"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    seats = models.PositiveSmallIntegerField()
+    status = models.CharField(
+        max_length=8, choices=STATUS_CHOICES, default=WAITING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    offered_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+    reservation = models.ForeignKey(
+        Reservation, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["show_session", "user"],
+                condition=models.Q(status__in=["waiting", "offered"]),
+                name="unique_open_waitlist_entry",
+            ),
+        ]
+        indexes = [
+            # the FIFO of a session, and offers by expiry for the worker
+            models.Index(
+                fields=["show_session", "status", "id"],
+                name="waitlist_queue_idx",
+            ),
+            models.Index(
+                fields=["status", "expires_at"], name="waitlist_expiry_idx"
+            ),
+        ]
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.user_id} waiting for {self.seats} ({self.status})"
+
+
+class SeatHold(models.Model):
+    """A seat kept for the waitlist entry it was offered to."""
+
+    show_session = models.ForeignKey(
+        ShowSession, on_delete=models.CASCADE, related_name="seat_holds"
+    )
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    waitlist_entry = models.ForeignKey(
+        WaitlistEntry, on_delete=models.CASCADE, related_name="holds"
+    )
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["show_session", "row", "seat"],
+                name="unique_seat_hold",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.show_session_id} (row: {self.row}, seat: {self.seat})"
+
+
+class SaleEvent(models.Model):
+    """Append-only log of ticket sales and cancellations.
+
+    References are kept without database constraints so the log outlives
+    the sessions and reservations it describes.
+    """
+
+    SALE = "sale"
+    CANCELLATION = "cancellation"
+    KIND_CHOICES = [(SALE, "Sale"), (CANCELLATION, "Cancellation")]
+
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    occurred_at = models.DateTimeField(default=timezone.now)
+    tickets = models.IntegerField()
+    reservation = models.ForeignKey(
+        Reservation, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="+",
+    )
+    show_session = models.ForeignKey(
+        ShowSession, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="+",
+    )
+    astronomy_show = models.ForeignKey(
+        AstronomyShow, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="+",
+    )
+    planetarium_dome = models.ForeignKey(
+        PlanetariumDome, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="+",
+    )
+
+    def __str__(self):
+        return f"{self.kind} of {self.tickets} ({self.occurred_at})"
+
+
+class SalesRollup(models.Model):
+    """Hourly ticket sales per show session, built from SaleEvent"""
+
+    hour = models.DateTimeField()
+    show_session = models.ForeignKey(
+        ShowSession, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="+",
+    )
+    astronomy_show = models.ForeignKey(
+        AstronomyShow, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="+",
+    )
+    planetarium_dome = models.ForeignKey(
+        PlanetariumDome, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="+",
+    )
+    tickets_sold = models.IntegerField(default=0)
+    tickets_cancelled = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hour", "show_session"], name="unique_sales_rollup_hour"
+            ),
+        ]
+        ordering = ["hour"]
+
+    def __str__(self):
+        return f"{self.show_session_id} {self.hour}"
+
+
+class SalesRollupCheckpoint(models.Model):
+    """Last SaleEvent folded into SalesRollup"""
+
+    last_event_id = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return str(self.last_event_id)
@@ -0,0 +1,191 @@
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from planetarium.models import PlanetariumDome, ShowSession, Ticket
+
+TICKETS_VERSION_KEY = "planetarium:tickets_version"
+
+# hours before showtime at which the fill curve is sampled
+FILL_CURVE_HOURS = [720, 336, 168, 72, 48, 24, 12, 6, 3, 1, 0]
+
+
+def get_tickets_version():
+    version = cache.get(TICKETS_VERSION_KEY)
+    if version is None:
+        cache.add(TICKETS_VERSION_KEY, 1, None)
+        version = cache.get(TICKETS_VERSION_KEY, 1)
+    return version
+
+
+def bump_tickets_version():
+    """expire every cached occupancy report"""
+    try:
+        cache.incr(TICKETS_VERSION_KEY)
+    except ValueError:
+        cache.add(TICKETS_VERSION_KEY, 1, None)
+
+
+def load_ticket_columns(show_sessions):
+    """stream active tickets of the sessions into columnar arrays
+
+    Returns (dome ids, rows, seats, hours between sale and showtime).
+    """
+    tickets = (
+        Ticket.objects.active()
+        .filter(show_session__in=show_sessions)
+        .values_list(
+            "show_session__planetarium_dome_id",
+            "row",
+            "seat",
+            "show_session__show_time",
+            "reservation__created_at",
+        )
+        .order_by()
+        .iterator(chunk_size=settings.OCCUPANCY_CHUNK_SIZE)
+    )
+    domes, rows, seats, lead_hours = [], [], [], []
+    while chunk := list(islice(tickets, settings.OCCUPANCY_CHUNK_SIZE)):
+        dome_ids, chunk_rows, chunk_seats, show_times, sold_at = zip(*chunk)
+        domes.append(np.array(dome_ids, dtype=np.int64))
+        rows.append(np.array(chunk_rows, dtype=np.int32))
+        seats.append(np.array(chunk_seats, dtype=np.int32))
+        lead_hours.append(
+            np.array(
+                [
+                    (show_time - created_at).total_seconds() / 3600
+                    for show_time, created_at in zip(show_times, sold_at)
+                ],
+                dtype=np.float64,
+            )
+        )
+
+    if not domes:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, np.array([], dtype=np.float64)
+    return (
+        np.concatenate(domes),
+        np.concatenate(rows),
+        np.concatenate(seats),
+        np.concatenate(lead_hours),
+    )
+
+
+def _rounded(values, ndigits=3):
+    return [
+        [None if np.isnan(value) else round(float(value), ndigits) for value in row]
+        for row in values
+    ]
+
+
+def dome_occupancy(planetarium_dome, sessions, rows, seats, lead_hours):
+    """seat heatmap, sell order and popular seats of one dome"""
+    cells = planetarium_dome.rows * planetarium_dome.seats_in_row
+    # tickets sold before the dome was resized fall outside the grid
+    in_grid = (
+        (rows <= planetarium_dome.rows)
+        & (seats <= planetarium_dome.seats_in_row)
+    )
+    rows, seats, lead_hours = rows[in_grid], seats[in_grid], lead_hours[in_grid]
+    index = (rows - 1) * planetarium_dome.seats_in_row + (seats - 1)
+    sold = np.bincount(index, minlength=cells)
+    lead_total = np.bincount(index, weights=lead_hours, minlength=cells)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_lead = np.where(sold > 0, lead_total / sold, np.nan)
+    shape = (planetarium_dome.rows, planetarium_dome.seats_in_row)
+
+    top = np.argsort(-sold, kind="stable")[:settings.OCCUPANCY_POPULAR_SEATS]
+    top = top[sold[top] > 0]
+    return {
+        "planetarium_dome": planetarium_dome.id,
+        "name": planetarium_dome.name,
+        "rows": planetarium_dome.rows,
+        "seats_in_row": planetarium_dome.seats_in_row,
+        "sessions": sessions,
+        # positions without a seat in the layout read as null
+        "heatmap": _rounded(
+            np.where(
+                planetarium_dome.seat_layout.mask,
+                (sold / max(sessions, 1)).reshape(shape),
+                np.nan,
+            )
+        ),
+        "mean_lead_hours": _rounded(mean_lead.reshape(shape), 1),
+        "popular_seats": [
+            {
+                "row": int(cell // planetarium_dome.seats_in_row) + 1,
+                "seat": int(cell % planetarium_dome.seats_in_row) + 1,
+                "sold": int(sold[cell]),
+            }
+            for cell in top
+        ],
+    }
+
+
+def fill_curve(lead_hours, capacity):
+    """share of capacity sold at least N hours before showtime"""
+    if not capacity:
+        return []
+
+    lead_hours = np.sort(lead_hours)
+    sold_before = len(lead_hours) - np.searchsorted(
+        lead_hours, FILL_CURVE_HOURS, side="left"
+    )
+    return [
+        {"hours_before": hours, "fill_rate": round(float(sold) / capacity, 4)}
+        for hours, sold in zip(FILL_CURVE_HOURS, sold_before)
+    ]
+
+
+def build_occupancy_report(filters):
+    show_sessions = ShowSession.objects.filter(**filters)
+    sessions_per_dome = dict(
+        show_sessions.values("planetarium_dome")
+        .annotate(sessions=Count("id"))
+        .order_by()
+        .values_list("planetarium_dome", "sessions")
+    )
+    planetarium_domes = PlanetariumDome.objects.filter(
+        id__in=sessions_per_dome
+    ).order_by("id")
+    domes, rows, seats, lead_hours = load_ticket_columns(show_sessions)
+
+    capacity = sum(
+        planetarium_dome.capacity * sessions_per_dome[planetarium_dome.id]
+        for planetarium_dome in planetarium_domes
+    )
+    report = {
+        "sessions": sum(sessions_per_dome.values()),
+        "tickets": int(len(rows)),
+        "fill_curve": fill_curve(lead_hours, capacity),
+        "domes": [],
+    }
+    for planetarium_dome in planetarium_domes:
+        mask = domes == planetarium_dome.id
+        report["domes"].append(
+            dome_occupancy(
+                planetarium_dome,
+                sessions_per_dome[planetarium_dome.id],
+                rows[mask],
+                seats[mask],
+                lead_hours[mask],
+            )
+        )
+    return report
+
+
+def get_occupancy_report(filters):
+    """occupancy report cached until the next ticket change"""
+    key = "planetarium:occupancy:{}:{}".format(
+        get_tickets_version(),
+        ":".join(f"{name}={value}" for name, value in sorted(filters.items())),
+    )
+    report = cache.get(key)
+    if report is None:
+        report = build_occupancy_report(filters)
+        cache.set(key, report, settings.OCCUPANCY_CACHE_TIMEOUT)
+    return report
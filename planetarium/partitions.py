@@ -0,0 +1,171 @@
+"""Monthly range partitions of the Ticket table on PostgreSQL.
+
+Migration 0006 turns ``planetarium_ticket`` into a table partitioned by
+``show_time`` with a single DEFAULT partition. ``ensure_ticket_partitions``
+splits it into one partition per month and keeps partitions ready for
+upcoming months, ``detach_ticket_partitions`` takes old months out of the
+live table after moving their sessions to the archive.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from planetarium.archive import archive_show_sessions
+from planetarium.models import Ticket
+
+TICKET_TABLE = Ticket._meta.db_table
+DEFAULT_PARTITION = f"{TICKET_TABLE}_default"
+PARTITION_NAME = re.compile(rf"{TICKET_TABLE}_p(\d{{4}})(\d{{2}})")
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return f"{TICKET_TABLE}_p{month:%Y%m}"
+
+
+def archived_partition_name(month):
+    return f"{TICKET_TABLE}_archived_p{month:%Y%m}"
+
+
+def _timestamp(value):
+    return f"'{value:%Y-%m-%d %H:%M:%S}+00'"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s)",
+            [TICKET_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def ticket_partitions():
+    """(name, month) of every attached monthly partition, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s)",
+            [TICKET_TABLE],
+        )
+        names = [name for name, in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.fullmatch(name)
+        if match:
+            month = datetime(
+                int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc
+            )
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_ticket_partition(month):
+    """attach the partition of one month, moving its rows out of DEFAULT"""
+    name = connection.ops.quote_name(partition_name(month))
+    table = connection.ops.quote_name(TICKET_TABLE)
+    default = connection.ops.quote_name(DEFAULT_PARTITION)
+    lower, upper = _timestamp(month), _timestamp(add_months(month, 1))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"WITH moved AS ("
+            f"DELETE FROM {default} "
+            f"WHERE show_time >= {lower} AND show_time < {upper} "
+            f"RETURNING *"
+            f") INSERT INTO {name} SELECT * FROM moved"
+        )
+        # indexes and foreign keys of the parent are cloned on attach
+        cursor.execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ({lower}) TO ({upper})"
+        )
+
+
+def ensure_ticket_partitions(months_ahead):
+    """create monthly partitions up to `months_ahead` months from now
+
+    Months older than the current one get a partition only while the
+    DEFAULT partition still holds their tickets. Returns the names of the
+    created partitions.
+    """
+    current = month_start(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT MIN(show_time) FROM "
+            + connection.ops.quote_name(DEFAULT_PARTITION)
+        )
+        oldest, = cursor.fetchone()
+
+    month = min(month_start(oldest), current) if oldest else current
+    existing = {month for _, month in ticket_partitions()}
+    created = []
+    while month <= add_months(current, months_ahead):
+        if month not in existing:
+            create_ticket_partition(month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_ticket_partitions(retention_months, drop=False):
+    """take partitions of months older than `retention_months` offline
+
+    Sessions of those months are archived first, so their reservations
+    stay in the archived history instead of leaving with the partition.
+    Detached partitions are renamed to ``planetarium_ticket_archived_p*``
+    and lose their foreign keys, so their sessions and reservations can
+    still be deleted. With `drop` they are dropped instead. Returns the
+    names of the detached partitions.
+    """
+    cutoff = add_months(month_start(timezone.now()), -retention_months)
+    archive_show_sessions(cutoff)
+    table = connection.ops.quote_name(TICKET_TABLE)
+    detached = []
+    for name, month in ticket_partitions():
+        if add_months(month, 1) > cutoff:
+            continue
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {table} DETACH PARTITION "
+                f"{connection.ops.quote_name(name)}"
+            )
+            if drop:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+            else:
+                archived = archived_partition_name(month)
+                cursor.execute(
+                    f"ALTER TABLE {connection.ops.quote_name(name)} "
+                    f"RENAME TO {connection.ops.quote_name(archived)}"
+                )
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint "
+                    "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+                    [archived],
+                )
+                for constraint, in cursor.fetchall():
+                    cursor.execute(
+                        f"ALTER TABLE {connection.ops.quote_name(archived)} "
+                        f"DROP CONSTRAINT {connection.ops.quote_name(constraint)}"
+                    )
+        detached.append(name)
+    return detached
@@ -0,0 +1,138 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate, TruncHour
+from django.utils import timezone
+
+from planetarium.models import (
+    SaleEvent,
+    SalesRollup,
+    SalesRollupCheckpoint,
+    ShowSession,
+)
+
+
+def record_sale_events(kind, tickets):
+    """append one SaleEvent per (reservation, show session) pair
+
+    ``tickets`` is an iterable of (reservation_id, show_session_id), one
+    item per sold or cancelled ticket.
+    """
+    counts = Counter(tickets)
+    if not counts:
+        return
+
+    show_sessions = {
+        show_session_id: (astronomy_show_id, planetarium_dome_id)
+        for show_session_id, astronomy_show_id, planetarium_dome_id in (
+            ShowSession.objects.filter(
+                id__in={show_session_id for _, show_session_id in counts}
+            ).values_list("id", "astronomy_show_id", "planetarium_dome_id")
+        )
+    }
+    sign = 1 if kind == SaleEvent.SALE else -1
+    occurred_at = timezone.now()
+
+    SaleEvent.objects.bulk_create(
+        SaleEvent(
+            kind=kind,
+            occurred_at=occurred_at,
+            tickets=sign * count,
+            reservation_id=reservation_id,
+            show_session_id=show_session_id,
+            astronomy_show_id=show_sessions[show_session_id][0],
+            planetarium_dome_id=show_sessions[show_session_id][1],
+        )
+        for (reservation_id, show_session_id), count in counts.items()
+    )
+
+
+def refresh_sales_rollups():
+    """fold sale events newer than the checkpoint into SalesRollup
+
+    Events younger than SALES_ROLLUP_LAG seconds are left for the next
+    refresh, so events of transactions still in flight are not skipped.
+    Returns the number of rollup rows that changed.
+    """
+    with transaction.atomic():
+        checkpoint, _ = (
+            SalesRollupCheckpoint.objects.select_for_update().get_or_create(pk=1)
+        )
+        cutoff = timezone.now() - timedelta(seconds=settings.SALES_ROLLUP_LAG)
+        events = SaleEvent.objects.filter(
+            id__gt=checkpoint.last_event_id, occurred_at__lte=cutoff
+        )
+        last_event_id = events.aggregate(last=Max("id"))["last"]
+        if last_event_id is None:
+            return 0
+
+        events = events.filter(id__lte=last_event_id)
+        groups = (
+            events.annotate(hour=TruncHour("occurred_at"))
+            .values(
+                "hour",
+                "show_session_id",
+                "astronomy_show_id",
+                "planetarium_dome_id",
+            )
+            .annotate(
+                sold=Sum("tickets", filter=Q(tickets__gt=0), default=0),
+                cancelled=-Sum("tickets", filter=Q(tickets__lt=0), default=0),
+            )
+            .order_by()
+        )
+        for group in groups:
+            updated = SalesRollup.objects.filter(
+                hour=group["hour"], show_session_id=group["show_session_id"]
+            ).update(
+                tickets_sold=F("tickets_sold") + group["sold"],
+                tickets_cancelled=F("tickets_cancelled") + group["cancelled"],
+            )
+            if not updated:
+                SalesRollup.objects.create(
+                    hour=group["hour"],
+                    show_session_id=group["show_session_id"],
+                    astronomy_show_id=group["astronomy_show_id"],
+                    planetarium_dome_id=group["planetarium_dome_id"],
+                    tickets_sold=group["sold"],
+                    tickets_cancelled=group["cancelled"],
+                )
+
+        checkpoint.last_event_id = last_event_id
+        checkpoint.refreshed_at = timezone.now()
+        checkpoint.save()
+        return len(groups)
+
+
+SALES_REPORT_GROUPS = {
+    "show": (
+        ["astronomy_show"],
+        {"astronomy_show_title": F("astronomy_show__title")},
+    ),
+    "dome": (
+        ["planetarium_dome"],
+        {"planetarium_dome_name": F("planetarium_dome__name")},
+    ),
+    "session": (["show_session"], {}),
+    "day": ([], {"day": TruncDate("hour")}),
+    "hour": (["hour"], {}),
+    "hour_of_day": ([], {"hour_of_day": ExtractHour("hour")}),
+}
+
+
+def sales_report(group_by, filters):
+    """aggregate SalesRollup rows, never touching the ticket tables"""
+    fields, expressions = SALES_REPORT_GROUPS[group_by]
+    return list(
+        SalesRollup.objects.filter(**filters)
+        .values(*fields, **expressions)
+        .annotate(
+            net_tickets=Sum(F("tickets_sold") - F("tickets_cancelled")),
+            tickets_sold=Sum("tickets_sold"),
+            tickets_cancelled=Sum("tickets_cancelled"),
+        )
+        .order_by(*fields, *expressions)
+    )
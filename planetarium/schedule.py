@@ -0,0 +1,86 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from planetarium.models import ShowSession
+from planetarium.occupancy import get_tickets_version
+
+SCHEDULE_VERSION_KEY = "planetarium:schedule_version"
+
+
+def get_schedule_version():
+    version = cache.get(SCHEDULE_VERSION_KEY)
+    if version is None:
+        cache.add(SCHEDULE_VERSION_KEY, 1, None)
+        version = cache.get(SCHEDULE_VERSION_KEY, 1)
+    return version
+
+
+def bump_schedule_version():
+    """expire every cached calendar"""
+    try:
+        cache.incr(SCHEDULE_VERSION_KEY)
+    except ValueError:
+        cache.add(SCHEDULE_VERSION_KEY, 1, None)
+
+
+def build_calendar(date_from, date_to, filters):
+    """sessions and availability per day from date_from to date_to
+
+    One GROUP BY over the show_time range, days without sessions are
+    filled in with zeros.
+    """
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(
+        datetime.combine(date_to + timedelta(days=1), time.min)
+    )
+    rows = (
+        ShowSession.objects.filter(
+            show_time__gte=start, show_time__lt=end, **filters
+        )
+        .with_tickets_available()
+        .annotate(day=TruncDate("show_time"))
+        .order_by()
+        .values("day")
+        .annotate(
+            sessions=Count("id"),
+            sold_out=Count("id", filter=Q(tickets_available__lte=0)),
+            capacity=Sum("planetarium_dome__total_seats"),
+            available=Sum("tickets_available"),
+        )
+    )
+    per_day = {row["day"]: row for row in rows}
+
+    days = []
+    day = date_from
+    while day <= date_to:
+        row = per_day.get(day, {})
+        days.append({
+            "date": day.isoformat(),
+            "sessions": row.get("sessions", 0),
+            "sold_out_sessions": row.get("sold_out", 0),
+            "capacity": row.get("capacity") or 0,
+            "tickets_available": row.get("available") or 0,
+        })
+        day += timedelta(days=1)
+    return days
+
+
+def get_calendar(date_from, date_to, filters):
+    """calendar cached until the schedule or a ticket changes"""
+    key = "planetarium:calendar:{}:{}:{}:{}:{}".format(
+        get_schedule_version(),
+        get_tickets_version(),
+        date_from.isoformat(),
+        date_to.isoformat(),
+        ":".join(f"{name}={value}" for name, value in sorted(filters.items())),
+    )
+    days = cache.get(key)
+    if days is None:
+        days = build_calendar(date_from, date_to, filters)
+        cache.set(key, days, settings.CALENDAR_CACHE_TIMEOUT)
+    return days
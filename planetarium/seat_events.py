@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+PG_CHANNEL = "planetarium_seat_changes"
+# keeps every NOTIFY payload well below the 8000 byte limit
+PG_SEATS_PER_NOTIFY = 500
+
+_feeds = {}
+
+
+def get_seat_change_feed():
+    """return the process-wide feed configured by SEAT_CHANGE_FEED"""
+    path = settings.SEAT_CHANGE_FEED
+    if path is None:
+        # pg_notify only exists on PostgreSQL
+        path = (
+            "planetarium.seat_events.PostgresSeatChangeFeed"
+            if connection.vendor == "postgresql"
+            else "planetarium.seat_events.InMemorySeatChangeFeed"
+        )
+    if path not in _feeds:
+        _feeds[path] = import_string(path)()
+    return _feeds[path]
+
+
+class SeatChangeFeed:
+    """Fans seat deltas out to the SSE subscribers of this process.
+
+    Subclasses decide how a published delta reaches ``dispatch`` in every
+    process: directly, or through a shared change feed.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+
+    async def start(self):
+        pass
+
+    def publish(self, delta):
+        raise NotImplementedError
+
+    def subscribe(self, show_session_id):
+        queue = asyncio.Queue(maxsize=settings.SEAT_EVENTS_QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        self._subscribers.setdefault(show_session_id, set()).add(subscriber)
+        return queue
+
+    def unsubscribe(self, show_session_id, queue):
+        subscribers = self._subscribers.get(show_session_id, set())
+        subscribers.difference_update(
+            [subscriber for subscriber in subscribers if subscriber[1] is queue]
+        )
+        if not subscribers:
+            self._subscribers.pop(show_session_id, None)
+
+    def dispatch(self, delta):
+        """hand a delta to every local subscriber, safe from any thread"""
+        subscribers = tuple(self._subscribers.get(delta["show_session"], ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, delta)
+
+    def resync_all(self):
+        for show_session_id in tuple(self._subscribers):
+            self.dispatch({"show_session": show_session_id, "resync": True})
+
+    @staticmethod
+    def _put(queue, delta):
+        try:
+            queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            # a slow client lost deltas, tell it to reload the seat map
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"show_session": delta["show_session"], "resync": True})
+
+
+class InMemorySeatChangeFeed(SeatChangeFeed):
+    """Single-process feed, used in tests and local development."""
+
+    def publish(self, delta):
+        transaction.on_commit(lambda: self.dispatch(delta))
+
+
+class PostgresSeatChangeFeed(SeatChangeFeed):
+    """Feed shared by all processes through Postgres LISTEN/NOTIFY.
+
+    NOTIFY is transactional, so deltas are only delivered once the ticket
+    changes commit. Each process keeps a single listening connection.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, delta):
+        with connection.cursor() as cursor:
+            for key in ("taken", "released"):
+                seats = delta[key]
+                for start in range(0, len(seats), PG_SEATS_PER_NOTIFY):
+                    chunk = {
+                        "show_session": delta["show_session"],
+                        "taken": [],
+                        "released": [],
+                        key: seats[start:start + PG_SEATS_PER_NOTIFY],
+                    }
+                    cursor.execute(
+                        "SELECT pg_notify(%s, %s)",
+                        [PG_CHANNEL, json.dumps(chunk)],
+                    )
+
+    async def start(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        import psycopg
+
+        database = settings.DATABASES["default"]
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    dbname=database["NAME"],
+                    user=database["USER"],
+                    password=database["PASSWORD"],
+                    host=database["HOST"],
+                    port=database["PORT"],
+                    autocommit=True,
+                ) as conn:
+                    await conn.execute(f"LISTEN {PG_CHANNEL}")
+                    # deltas sent while we were not listening are lost
+                    self.resync_all()
+                    async for notify in conn.notifies():
+                        self.dispatch(json.loads(notify.payload))
+            except psycopg.OperationalError:
+                await asyncio.sleep(1)
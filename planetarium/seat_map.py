@@ -0,0 +1,84 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.generics import get_object_or_404
+
+from planetarium.models import ShowSession
+
+FREE = "F"
+TAKEN = "T"
+HELD = "H"
+# aisles, removed seats and the ends of short rows
+NO_SEAT = "X"
+
+
+def _cache_key(show_session_id):
+    return f"planetarium:seat_map:{show_session_id}"
+
+
+def encode_row(states):
+    """run-length encode a row of seat states as [[state, count], ...]"""
+    runs = []
+    for state in states:
+        if runs and runs[-1][0] == state:
+            runs[-1][1] += 1
+        else:
+            runs.append([state, 1])
+    return runs
+
+
+def build_seat_map(show_session, held=()):
+    """build the run-length encoded seat state of a show session"""
+    planetarium_dome = show_session.planetarium_dome
+    seat_layout = planetarium_dome.seat_layout
+    grid = [
+        [FREE if position else NO_SEAT for position in row]
+        for row in seat_layout.mask.tolist()
+    ]
+
+    for row, seat in held:
+        grid[row - 1][seat - 1] = HELD
+
+    taken = show_session.active_tickets.values_list("row", "seat")
+    for row, seat in taken:
+        grid[row - 1][seat - 1] = TAKEN
+
+    return {
+        "show_session": show_session.id,
+        "rows": planetarium_dome.rows,
+        "seats_in_row": planetarium_dome.seats_in_row,
+        "capacity": seat_layout.capacity,
+        "seats": [encode_row(states) for states in grid],
+    }
+
+
+def get_seat_map(show_session_id):
+    """return (seat map, etag), served from a short-lived cache"""
+    key = _cache_key(show_session_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    show_session = get_object_or_404(
+        ShowSession.objects.select_related("planetarium_dome").only(
+            "id",
+            "planetarium_dome__rows",
+            "planetarium_dome__seats_in_row",
+            "planetarium_dome__layout",
+        ),
+        pk=show_session_id,
+    )
+    seat_map = build_seat_map(
+        show_session, held=show_session.active_holds.values_list("row", "seat")
+    )
+    content = json.dumps(seat_map, separators=(",", ":")).encode()
+    etag = f'"{hashlib.md5(content).hexdigest()}"'
+
+    cache.set(key, (seat_map, etag), settings.SEAT_MAP_CACHE_TIMEOUT)
+    return seat_map, etag
+
+
+def invalidate_seat_map(show_session_id):
+    cache.delete(_cache_key(show_session_id))
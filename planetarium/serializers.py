@@ -1,7 +1,17 @@
-from django.db import transaction
+from django.conf import settings
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from planetarium.booking import SeatsTaken, book_seats
+from planetarium.check_in import ticket_token
+from planetarium.fieldsets import DynamicFieldsMixin
+from planetarium.layouts import (
+    InvalidLayout,
+    encode_layout,
+    layout_lines,
+    parse_layout,
+)
 from planetarium.models import (
     AstronomyShow,
     ShowTheme,
@@ -9,16 +19,17 @@ from planetarium.models import (
     ShowSession,
     Reservation,
     Ticket,
+    WaitlistEntry,
 )
 
 
-class ShowThemeSerializer(serializers.ModelSerializer):
+class ShowThemeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ShowTheme
         fields = ["id", "name"]
 
 
-class AstronomyShowSerializer(serializers.ModelSerializer):
+class AstronomyShowSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AstronomyShow
         fields = ["id", "title", "description", "show_theme"]
@@ -32,6 +43,7 @@ class AstronomyShowListSerializer(AstronomyShowSerializer):
     class Meta:
         model = AstronomyShow
         fields = ["id", "title", "description", "show_theme"]
+        expandable_fields = {"show_theme": (ShowThemeSerializer, {"many": True})}
 
 
 class AstronomyShowDetailSerializer(AstronomyShowSerializer):
@@ -48,13 +60,78 @@ class AstronomyShowImageSerializer(serializers.ModelSerializer):
         fields = ["id", "image"]
 
 
-class PlanetariumDomeSerializer(serializers.ModelSerializer):
+@extend_schema_field(
+    serializers.ListField(child=serializers.CharField(), allow_null=True)
+)
+class DomeLayoutField(serializers.Field):
+    """seat layout as one string per row, "#" a seat and "." none"""
+
+    def get_attribute(self, instance):
+        return instance
+
+    def to_representation(self, planetarium_dome) -> list[str] | None:
+        if planetarium_dome.layout is None:
+            return None
+        return layout_lines(planetarium_dome.seat_layout.mask)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not all(
+            isinstance(line, str) for line in data
+        ):
+            raise ValidationError("Expected a list of strings, one per row.")
+        try:
+            return parse_layout(data)
+        except InvalidLayout as error:
+            raise ValidationError(str(error))
+
+
+class PlanetariumDomeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    layout = DomeLayoutField(required=False, allow_null=True)
+
     class Meta:
         model = PlanetariumDome
-        fields = ["id", "name", "rows", "seats_in_row", "capacity"]
-
+        fields = ["id", "name", "rows", "seats_in_row", "layout", "capacity"]
+        field_sources = {
+            "layout": ["rows", "seats_in_row", "layout"],
+            "capacity": ["total_seats"],
+        }
 
-class ShowSessionSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        rows = attrs.get("rows", getattr(self.instance, "rows", None))
+        seats_in_row = attrs.get(
+            "seats_in_row", getattr(self.instance, "seats_in_row", None)
+        )
+        if "layout" not in attrs and self.instance is not None:
+            # the stored bitmask only means something for its old shape
+            if self.instance.layout is not None and (
+                (rows, seats_in_row)
+                != (self.instance.rows, self.instance.seats_in_row)
+            ):
+                raise ValidationError(
+                    {
+                        "layout": "a new layout (or null) is required "
+                                  "when rows or seats_in_row change"
+                    }
+                )
+            return attrs
+
+        layout = attrs.get("layout")
+        if layout is None:
+            return attrs
+
+        if layout.shape != (rows, seats_in_row):
+            raise ValidationError(
+                {
+                    "layout": f"layout must have {rows} rows "
+                              f"of {seats_in_row} positions"
+                }
+            )
+        attrs["layout"] = encode_layout(layout)
+        return attrs
+
+
+class ShowSessionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ShowSession
         fields = ["id", "astronomy_show", "planetarium_dome", "show_time"]
@@ -77,9 +154,16 @@ class ShowSessionListSerializer(ShowSessionSerializer):
             "id", "astronomy_show_title", "planetarium_dome_name",
             "planetarium_dome_capacity", "show_time",
         ]
+        field_sources = {
+            "planetarium_dome_capacity": ["planetarium_dome__total_seats"],
+        }
+        expandable_fields = {
+            "astronomy_show": (AstronomyShowListSerializer, {}),
+            "planetarium_dome": (PlanetariumDomeSerializer, {}),
+        }
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
         Ticket.validate_ticket(
@@ -93,10 +177,27 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ["id", "row", "seat", "show_session", "reservation"]
+        read_only_fields = ["reservation"]
 
 
 class TicketListSerializer(TicketSerializer):
     show_session = ShowSessionSerializer(many=False, read_only=True)
+    token = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Ticket
+        fields = [
+            "id", "row", "seat", "show_session", "reservation", "cancelled_at",
+            "checked_in_at", "token",
+        ]
+        expandable_fields = {"show_session": (ShowSessionListSerializer, {})}
+        field_sources = {"token": ["row", "seat", "cancelled_at"]}
+
+    def get_token(self, ticket) -> str | None:
+        """signed token for the door scanner, None once cancelled"""
+        if ticket.cancelled_at is not None:
+            return None
+        return ticket_token(ticket)
 
 
 class TicketSeatSerializer(TicketSerializer):
@@ -108,7 +209,9 @@ class TicketSeatSerializer(TicketSerializer):
 class ShowSessionDetailSerializer(ShowSessionSerializer):
     astronomy_show = AstronomyShowSerializer(many=False, read_only=True)
     planetarium_dome = PlanetariumDomeSerializer(many=False, read_only=True)
-    taken_places = TicketSeatSerializer(source="tickets", many=True, read_only=True)
+    taken_places = TicketSeatSerializer(
+        source="active_tickets", many=True, read_only=True
+    )
 
     class Meta:
         model = ShowSession
@@ -116,23 +219,87 @@ class ShowSessionDetailSerializer(ShowSessionSerializer):
             "id", "show_time", "astronomy_show",
             "planetarium_dome", "taken_places",
         ]
+        field_sources = {"taken_places": ["show_time"]}
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+class ReservationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
 
     class Meta:
         model = Reservation
-        fields = ["id", "tickets", "created_at"]
+        fields = ["id", "tickets", "created_at", "cancelled_at"]
+        read_only_fields = ["cancelled_at"]
+
+    def validate_tickets(self, tickets):
+        seats = [
+            (ticket["show_session"].id, ticket["row"], ticket["seat"])
+            for ticket in tickets
+        ]
+        if len(set(seats)) != len(seats):
+            raise ValidationError("The same seat is requested more than once.")
+        return tickets
 
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            reservation = Reservation.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(reservation=reservation, **ticket_data)
-            return reservation
+        # taken seats are checked in one query under the session lock
+        try:
+            return book_seats(
+                validated_data["user_id"],
+                [
+                    (ticket["show_session"], ticket["row"], ticket["seat"])
+                    for ticket in validated_data["tickets"]
+                ],
+            )
+        except SeatsTaken as error:
+            raise ValidationError({"tickets": [str(error)]})
 
 
 class ReservationListSerializer(ReservationSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class BestAvailableSerializer(serializers.Serializer):
+    show_session = serializers.PrimaryKeyRelatedField(
+        queryset=ShowSession.objects.all()
+    )
+    count = serializers.IntegerField(
+        min_value=1, max_value=settings.ALLOCATION_MAX_SEATS
+    )
+
+
+class CheckInScanSerializer(serializers.Serializer):
+    token = serializers.CharField()
+    scanned_at = serializers.DateTimeField()
+
+
+class CheckInSerializer(serializers.Serializer):
+    scans = CheckInScanSerializer(
+        many=True, allow_empty=False, max_length=settings.CHECK_IN_MAX_SCANS
+    )
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            "id", "show_session", "seats", "status", "position",
+            "created_at", "expires_at",
+        ]
+        read_only_fields = ["show_session", "status", "expires_at"]
+
+    def get_position(self, entry) -> int | None:
+        """place in the queue while waiting, 1 is next"""
+        if entry.status != WaitlistEntry.WAITING:
+            return None
+        return WaitlistEntry.objects.filter(
+            show_session_id=entry.show_session_id,
+            status=WaitlistEntry.WAITING,
+            id__lte=entry.id,
+        ).count()
+
+
+class WaitlistJoinSerializer(serializers.Serializer):
+    seats = serializers.IntegerField(
+        min_value=1, max_value=settings.ALLOCATION_MAX_SEATS
+    )
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from planetarium.models import PlanetariumDome, ShowSession, Ticket
+from planetarium.occupancy import bump_tickets_version
+from planetarium.schedule import bump_schedule_version
+from planetarium.seat_events import get_seat_change_feed
+from planetarium.seat_map import invalidate_seat_map
+
+# sent with show_session_id, taken and released lists of (row, seat)
+tickets_changed = Signal()
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, created, **kwargs):
+    if created:
+        tickets_changed.send(
+            sender=Ticket,
+            show_session_id=instance.show_session_id,
+            taken=[(instance.row, instance.seat)],
+            released=[],
+        )
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    tickets_changed.send(
+        sender=Ticket,
+        show_session_id=instance.show_session_id,
+        taken=[],
+        released=[(instance.row, instance.seat)],
+    )
+
+
+@receiver(post_save, sender=ShowSession)
+@receiver(post_delete, sender=ShowSession)
+@receiver(post_save, sender=PlanetariumDome)
+def expire_calendars(sender, **kwargs):
+    transaction.on_commit(bump_schedule_version)
+
+
+@receiver(tickets_changed)
+def refresh_seat_map(sender, show_session_id, **kwargs):
+    transaction.on_commit(lambda: invalidate_seat_map(show_session_id))
+
+
+@receiver(tickets_changed)
+def expire_occupancy_reports(sender, **kwargs):
+    transaction.on_commit(bump_tickets_version)
+
+
+@receiver(tickets_changed)
+def publish_seat_changes(sender, show_session_id, taken, released, **kwargs):
+    get_seat_change_feed().publish({
+        "show_session": show_session_id,
+        "taken": list(taken),
+        "released": list(released),
+    })
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import re
+import secrets
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from planetarium.models import ShowSession
+from planetarium.seat_events import get_seat_change_feed
+from user.authentication import CachedJWTAuthentication
+
+SEAT_EVENTS_PATH = re.compile(
+    r"^/api/planetarium/show-session/(?P<pk>\d+)/events/$"
+)
+STREAM_TICKET_KEY = "seat-events:ticket:{}"
+
+
+class SeatEventsRouter:
+    """ASGI router serving seat change streams next to the Django app"""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            match = SEAT_EVENTS_PATH.match(scope["path"])
+            if match:
+                return await seat_events(
+                    scope, receive, send, int(match.group("pk"))
+                )
+        return await self.application(scope, receive, send)
+
+
+def issue_stream_ticket(user_id, show_session_id):
+    """single-use ticket opening the seat events stream of a session
+
+    EventSource cannot send an Authorization header, and a JWT in the URL
+    would end up in access logs, so browsers pass this short-lived ticket
+    as ?ticket= instead.
+    """
+    ticket = secrets.token_urlsafe(24)
+    cache.set(
+        STREAM_TICKET_KEY.format(ticket),
+        (user_id, show_session_id),
+        settings.SEAT_EVENTS_TICKET_TIMEOUT,
+    )
+    return ticket
+
+
+def _raw_token(scope):
+    """read the JWT from the Authorization header"""
+    headers = dict(scope["headers"])
+    authorization = headers.get(b"authorization", b"").split()
+    if len(authorization) == 2 and authorization[0] == b"Bearer":
+        return authorization[1]
+    return None
+
+
+def _stream_ticket(scope):
+    ticket = parse_qs(scope["query_string"].decode()).get("ticket")
+    return ticket[0] if ticket else None
+
+
+@sync_to_async
+def _authenticate(raw_token):
+    authentication = CachedJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+@sync_to_async
+def _redeem_stream_ticket(ticket, show_session_id):
+    """whether the ticket was issued for the session, using it up"""
+    key = STREAM_TICKET_KEY.format(ticket)
+    issued = cache.get(key)
+    # only the request that deletes the ticket may use it
+    if issued is None or not cache.delete(key):
+        return False
+    _, ticket_show_session_id = issued
+    return ticket_show_session_id == show_session_id
+
+
+async def _is_authenticated(scope, show_session_id):
+    raw_token = _raw_token(scope)
+    if raw_token is not None:
+        return await _authenticate(raw_token) is not None
+    ticket = _stream_ticket(scope)
+    if ticket is not None:
+        return await _redeem_stream_ticket(ticket, show_session_id)
+    return False
+
+
+async def _respond(send, status, detail):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({
+        "type": "http.response.body",
+        "body": json.dumps({"detail": detail}).encode(),
+    })
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _event(delta):
+    if delta.get("resync"):
+        return b"event: resync\ndata: {}\n\n"
+    data = json.dumps(
+        {"taken": delta["taken"], "released": delta["released"]},
+        separators=(",", ":"),
+    )
+    return f"event: seats\ndata: {data}\n\n".encode()
+
+
+async def seat_events(scope, receive, send, show_session_id):
+    """stream seat deltas of a show session as Server-Sent Events"""
+    if not await _is_authenticated(scope, show_session_id):
+        return await _respond(
+            send, 401, "Authentication credentials were not provided."
+        )
+
+    if not await ShowSession.objects.filter(pk=show_session_id).aexists():
+        return await _respond(
+            send, 404, "No ShowSession matches the given query."
+        )
+
+    feed = get_seat_change_feed()
+    await feed.start()
+    queue = feed.subscribe(show_session_id)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        await send({
+            "type": "http.response.body",
+            "body": b"retry: 3000\n\n",
+            "more_body": True,
+        })
+        while True:
+            next_delta = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {next_delta, disconnected},
+                timeout=settings.SEAT_EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                next_delta.cancel()
+                break
+            if next_delta in done:
+                body = _event(next_delta.result())
+            else:
+                next_delta.cancel()
+                body = b": keepalive\n\n"
+            await send({
+                "type": "http.response.body",
+                "body": body,
+                "more_body": True,
+            })
+    finally:
+        feed.unsubscribe(show_session_id, queue)
+        disconnected.cancel()
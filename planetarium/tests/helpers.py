@@ -0,0 +1,54 @@
+"""Sample objects shared by the planetarium tests."""
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+
+from planetarium.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+
+SAMPLE_SHOW_TIME = datetime(2022, 6, 2, 14, tzinfo=timezone.utc)
+
+
+def create_sample_user(email="test@test.com", **params):
+    return get_user_model().objects.create_user(email, "testpass", **params)
+
+
+def create_sample_astronomy_show(**params):
+    defaults = {
+        "title": "Sample astronomy show",
+        "description": "Sample description",
+    }
+    defaults.update(params)
+    return AstronomyShow.objects.create(**defaults)
+
+
+def create_sample_planetarium_dome(**params):
+    defaults = {"name": "Blue", "rows": 5, "seats_in_row": 5}
+    defaults.update(params)
+    return PlanetariumDome.objects.create(**defaults)
+
+
+def create_sample_show_session(**params):
+    defaults = {"show_time": SAMPLE_SHOW_TIME}
+    defaults.update(params)
+    if "astronomy_show" not in defaults:
+        defaults["astronomy_show"] = create_sample_astronomy_show()
+    if "planetarium_dome" not in defaults:
+        defaults["planetarium_dome"] = create_sample_planetarium_dome()
+    return ShowSession.objects.create(**defaults)
+
+
+def create_sample_reservation(user, *seats):
+    """reservation of `user` with a ticket per (show_session, row, seat)"""
+    reservation = Reservation.objects.create(user=user)
+    for show_session, row, seat in seats:
+        Ticket.objects.create(
+            row=row, seat=seat, show_session=show_session,
+            reservation=reservation,
+        )
+    return reservation
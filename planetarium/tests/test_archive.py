@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.archive import (
+    ARCHIVE_FILE_PATTERN,
+    archive_records,
+    user_archive_path,
+    write_archive,
+)
+from planetarium.models import Reservation, ShowSession
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_reservation,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+HISTORY_URL = reverse("planetarium:reservation-history")
+
+
+class ArchiveShowSessionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_root.cleanup)
+        settings_override = override_settings(ARCHIVE_ROOT=archive_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.other_user = create_sample_user("other@test.com")
+        self.client.force_authenticate(self.user)
+        astronomy_show = create_sample_astronomy_show()
+        planetarium_dome = create_sample_planetarium_dome()
+        self.past_session = create_sample_show_session(
+            astronomy_show=astronomy_show, planetarium_dome=planetarium_dome
+        )
+        self.upcoming_session = create_sample_show_session(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=datetime.now(timezone.utc) + timedelta(days=7),
+        )
+
+    def test_archive_moves_past_sessions(self):
+        past = create_sample_reservation(
+            self.user, (self.past_session, 1, 1), (self.past_session, 1, 2)
+        )
+        mixed = create_sample_reservation(
+            self.user,
+            (self.past_session, 2, 1),
+            (self.upcoming_session, 2, 1),
+        )
+
+        call_command("archive_show_sessions", "--days", "30", stdout=StringIO())
+
+        self.assertFalse(ShowSession.objects.filter(id=self.past_session.id))
+        self.assertFalse(Reservation.objects.filter(id=past.id))
+        self.assertEqual(
+            list(mixed.tickets.values_list("show_session", flat=True)),
+            [self.upcoming_session.id],
+        )
+
+        res = self.client.get(HISTORY_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 2)
+        records = {record["reservation"]: record for record in res.data["results"]}
+        self.assertEqual(
+            records[past.id]["tickets"],
+            [
+                {"row": 1, "seat": 1, "cancelled_at": None},
+                {"row": 1, "seat": 2, "cancelled_at": None},
+            ],
+        )
+        self.assertEqual(
+            records[past.id]["show_session"]["id"], self.past_session.id
+        )
+
+    def test_history_lists_only_own_reservations(self):
+        create_sample_reservation(self.other_user, (self.past_session, 1, 1))
+
+        call_command("archive_show_sessions", "--days", "30", stdout=StringIO())
+
+        res = self.client.get(HISTORY_URL)
+        self.assertEqual(res.data["count"], 0)
+
+    def test_history_skips_records_archived_twice(self):
+        create_sample_reservation(self.user, (self.past_session, 1, 1))
+        write_archive(archive_records([self.past_session.id]))
+
+        call_command("archive_show_sessions", "--days", "30", stdout=StringIO())
+
+        res = self.client.get(HISTORY_URL)
+        self.assertEqual(res.data["count"], 1)
+
+    def test_history_reads_only_the_user_file(self):
+        create_sample_reservation(self.user, (self.past_session, 1, 1))
+        create_sample_reservation(self.other_user, (self.past_session, 1, 2))
+
+        call_command("archive_show_sessions", "--days", "30", stdout=StringIO())
+
+        self.assertTrue(user_archive_path(self.user.id).exists())
+        self.assertTrue(user_archive_path(self.other_user.id).exists())
+        for path in Path(settings.ARCHIVE_ROOT).glob(ARCHIVE_FILE_PATTERN):
+            path.unlink()
+        res = self.client.get(HISTORY_URL)
+        self.assertEqual(res.data["count"], 1)
+
+    def test_rebuild_user_files(self):
+        create_sample_reservation(self.user, (self.past_session, 1, 1))
+        call_command("archive_show_sessions", "--days", "30", stdout=StringIO())
+        shutil.rmtree(user_archive_path(self.user.id).parent.parent)
+
+        self.assertEqual(self.client.get(HISTORY_URL).data["count"], 0)
+        call_command(
+            "archive_show_sessions", "--days", "30", "--rebuild-user-files",
+            stdout=StringIO(),
+        )
+        self.assertEqual(self.client.get(HISTORY_URL).data["count"], 1)
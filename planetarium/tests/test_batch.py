@@ -0,0 +1,225 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from planetarium.models import Reservation, ShowTheme
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_show_session,
+    create_sample_user,
+)
+from planetarium_api_service import batch
+from planetarium_api_service.throttling import SlidingWindowRateThrottle
+from user.authentication import CachedJWTAuthentication
+
+BATCH_URL = reverse("batch")
+SHOW_THEME_URL = reverse("planetarium:showtheme-list")
+ASTRONOMY_SHOW_URL = reverse("planetarium:astronomyshow-list")
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+RESERVATION_URL = reverse("planetarium:reservation-list")
+REGISTER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token_obtain_pair")
+
+
+def sample_show_session():
+    ShowTheme.objects.create(name="Stars")
+    return create_sample_show_session(
+        astronomy_show=create_sample_astronomy_show(title="Show"),
+        show_time=datetime.now(timezone.utc) + timedelta(days=1),
+    )
+
+
+def get(path):
+    return {"method": "GET", "path": path}
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.show_session = sample_show_session()
+
+    def test_home_screen_batch(self):
+        authenticate = CachedJWTAuthentication.authenticate
+        with mock.patch.object(
+            CachedJWTAuthentication, "authenticate", autospec=True,
+            side_effect=authenticate,
+        ) as authenticated:
+            res = self.client.post(BATCH_URL, {"requests": [
+                get(SHOW_THEME_URL),
+                get(ASTRONOMY_SHOW_URL + "?fields=id,title"),
+                get(SHOW_SESSION_URL),
+                get(RESERVATION_URL),
+            ]}, format="json")
+
+        self.assertEqual(authenticated.call_count, 1)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        themes, shows, sessions, reservations = res.data["responses"]
+        self.assertEqual(
+            [response["status"] for response in res.data["responses"]],
+            [200, 200, 200, 200],
+        )
+        self.assertEqual(themes["body"]["results"][0]["name"], "Stars")
+        self.assertEqual(
+            shows["body"]["results"][0],
+            {"id": self.show_session.astronomy_show_id, "title": "Show"},
+        )
+        self.assertEqual(
+            sessions["body"]["results"][0]["id"], self.show_session.id
+        )
+        self.assertEqual(reservations["body"]["count"], 0)
+        self.assertNotIn("pin_primary", res.cookies)
+
+    def test_sub_requests_keep_their_permissions(self):
+        self.client.credentials()
+
+        res = self.client.post(BATCH_URL, {"requests": [
+            get(SHOW_THEME_URL),
+            {
+                "method": "POST",
+                "path": REGISTER_URL,
+                "body": {"email": "new@test.com", "password": "newpass"},
+            },
+        ]}, format="json")
+
+        themes, registered = res.data["responses"]
+        self.assertEqual(themes["status"], 401)
+        self.assertEqual(registered["status"], 201)
+
+    def test_writes_run_in_order(self):
+        res = self.client.post(BATCH_URL, {"requests": [
+            {
+                "method": "POST",
+                "path": RESERVATION_URL,
+                "headers": {"Idempotency-Key": "batch-1"},
+                "body": {"tickets": [
+                    {
+                        "row": 1, "seat": 1,
+                        "show_session": self.show_session.id,
+                    },
+                ]},
+            },
+            get(RESERVATION_URL),
+        ]}, format="json")
+
+        created, listed = res.data["responses"]
+        self.assertEqual(created["status"], 201)
+        self.assertEqual(listed["body"]["count"], 1)
+        self.assertEqual(Reservation.objects.get().user, self.user)
+        self.assertIn("pin_primary", res.cookies)
+
+    def test_failing_sub_request_gets_its_own_error_response(self):
+        self.client.raise_request_exception = False
+
+        with mock.patch(
+            "planetarium.views.ShowSessionViewSet.get_queryset",
+            side_effect=ValueError,
+        ), self.assertLogs("django.request", "ERROR"):
+            res = self.client.post(BATCH_URL, {"requests": [
+                {
+                    "method": "POST",
+                    "path": RESERVATION_URL,
+                    "body": {"tickets": [
+                        {
+                            "row": 1, "seat": 1,
+                            "show_session": self.show_session.id,
+                        },
+                    ]},
+                },
+                get(SHOW_SESSION_URL),
+                get(RESERVATION_URL),
+            ]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        created, failed, listed = res.data["responses"]
+        self.assertEqual(created["status"], 201)
+        self.assertEqual(failed["status"], 500)
+        self.assertEqual(listed["body"]["count"], 1)
+        self.assertTrue(Reservation.objects.exists())
+
+    def test_only_api_routes_can_be_batched(self):
+        for path in ("/admin/", "/api/batch/", "/api/nowhere/"):
+            res = self.client.post(
+                BATCH_URL, {"requests": [get(path)]}, format="json"
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_size_is_limited(self):
+        res = self.client.post(
+            BATCH_URL, {"requests": [get(SHOW_THEME_URL)] * 21}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @mock.patch.object(
+        SlidingWindowRateThrottle, "THROTTLE_RATES",
+        {"batch": "1/min", "catalog": "1/min"},
+    )
+    def test_sub_requests_are_throttled(self):
+        res = self.client.post(BATCH_URL, {"requests": [
+            get(SHOW_THEME_URL), get(SHOW_THEME_URL),
+        ]}, format="json")
+
+        self.assertEqual(res["RateLimit-Limit"], "1")
+        self.assertEqual(
+            [response["status"] for response in res.data["responses"]],
+            [200, 429],
+        )
+        self.assertEqual(
+            res.data["responses"][0]["headers"]["RateLimit-Limit"], "1"
+        )
+
+    @mock.patch.object(
+        SlidingWindowRateThrottle, "THROTTLE_RATES",
+        {"batch": "10/min", "anon": "3/min"},
+    )
+    def test_batches_do_not_bypass_login_throttling(self):
+        self.client.credentials()
+        login = {
+            "method": "POST",
+            "path": TOKEN_URL,
+            "body": {"email": "test@test.com", "password": "wrong"},
+        }
+
+        res = self.client.post(
+            BATCH_URL, {"requests": [login] * 5}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [response["status"] for response in res.data["responses"]],
+            [401, 401, 401, 429, 429],
+        )
+        res = self.client.post(
+            BATCH_URL, {"requests": [login]}, format="json"
+        )
+        self.assertEqual(res.data["responses"][0]["status"], 429)
+
+
+# reads run concurrently only outside a transaction
+class ConcurrentBatchTests(TransactionTestCase):
+    def test_reads_run_concurrently(self):
+        show_session = sample_show_session()
+        client = APIClient()
+        client.force_authenticate(create_sample_user())
+
+        with mock.patch.object(
+            batch, "_dispatch_in_worker", wraps=batch._dispatch_in_worker
+        ) as worker:
+            res = client.post(BATCH_URL, {"requests": [
+                get(SHOW_THEME_URL), get(SHOW_SESSION_URL),
+            ]}, format="json")
+
+        self.assertEqual(worker.call_count, 2)
+        sessions = res.data["responses"][1]
+        self.assertEqual(sessions["status"], 200)
+        self.assertEqual(sessions["body"]["results"][0]["id"], show_session.id)
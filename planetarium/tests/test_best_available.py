@@ -0,0 +1,84 @@
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.allocation import find_best_block, seat_scores
+from planetarium.models import Reservation, SaleEvent, Ticket
+from planetarium.tests.helpers import (
+    create_sample_show_session,
+    create_sample_user,
+)
+
+BEST_AVAILABLE_URL = reverse("planetarium:reservation-best-available")
+
+
+class FindBestBlockTests(TestCase):
+    def test_prefers_centre_seats(self):
+        free = np.ones((5, 5), dtype=bool)
+        self.assertEqual(find_best_block(free, seat_scores(5, 5), 3), (3, 2))
+
+    def test_skips_blocks_with_taken_seats(self):
+        free = np.ones((5, 5), dtype=bool)
+        free[2, 2] = False
+        self.assertEqual(find_best_block(free, seat_scores(5, 5), 3), (4, 2))
+
+    def test_no_block_wide_enough(self):
+        free = np.ones((5, 5), dtype=bool)
+        free[:, 2] = False
+        self.assertIsNone(find_best_block(free, seat_scores(5, 5), 3))
+        self.assertIsNone(find_best_block(free, seat_scores(5, 5), 6))
+
+
+class BestAvailableReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        self.show_session = create_sample_show_session()
+
+    def test_reserve_best_available(self):
+        payload = {"show_session": self.show_session.id, "count": 3}
+        res = self.client.post(BEST_AVAILABLE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        reservation = Reservation.objects.get(id=res.data["id"])
+        self.assertEqual(reservation.user, self.user)
+        self.assertEqual(
+            list(reservation.tickets.order_by("seat").values_list("row", "seat")),
+            [(3, 2), (3, 3), (3, 4)],
+        )
+        self.assertEqual(
+            SaleEvent.objects.get(reservation=reservation).tickets, 3
+        )
+
+    def test_reserve_best_available_around_taken_seats(self):
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=3, seat=3, show_session=self.show_session,
+            reservation=reservation,
+        )
+        payload = {"show_session": self.show_session.id, "count": 3}
+        res = self.client.post(BEST_AVAILABLE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted((ticket["row"], ticket["seat"]) for ticket in res.data["tickets"]),
+            [(4, 2), (4, 3), (4, 4)],
+        )
+
+    def test_reserve_best_available_without_block(self):
+        payload = {"show_session": self.show_session.id, "count": 6}
+        res = self.client.post(BEST_AVAILABLE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_reserve_best_available_count_limit(self):
+        payload = {"show_session": self.show_session.id, "count": 11}
+        res = self.client.post(BEST_AVAILABLE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
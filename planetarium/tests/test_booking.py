@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium import booking
+from planetarium.booking import SeatsTaken, book_seats
+from planetarium.models import Reservation
+from planetarium.tests.helpers import (
+    create_sample_show_session,
+    create_sample_user,
+)
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+class BookSeatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_sample_user()
+        self.show_session = create_sample_show_session()
+
+    def test_book_seats(self):
+        reservation = book_seats(
+            self.user.id,
+            [(self.show_session, 1, 1), (self.show_session, 1, 2)],
+        )
+        self.assertEqual(
+            list(reservation.tickets.values_list("row", "seat")),
+            [(1, 1), (1, 2)],
+        )
+
+    def test_taken_seat_rejects_whole_booking(self):
+        book_seats(self.user.id, [(self.show_session, 1, 2)])
+
+        with self.assertRaises(SeatsTaken) as error:
+            book_seats(
+                self.user.id,
+                [(self.show_session, 1, 1), (self.show_session, 1, 2)],
+            )
+        self.assertEqual(error.exception.seats, [(self.show_session.id, 1, 2)])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_cancelled_seat_can_be_booked(self):
+        reservation = book_seats(self.user.id, [(self.show_session, 1, 1)])
+        reservation.tickets.update(cancelled_at="2022-06-01T10:00:00Z")
+
+        book_seats(self.user.id, [(self.show_session, 1, 1)])
+
+    @override_settings(RESERVATION_RETRIES=2, RESERVATION_RETRY_BACKOFF=0)
+    def test_conflict_is_retried(self):
+        create_reservation = booking.create_reservation
+        attempts = []
+
+        def conflict_once(user_id, seats):
+            attempts.append(seats)
+            if len(attempts) == 1:
+                raise IntegrityError
+            return create_reservation(user_id, seats)
+
+        with mock.patch.object(booking, "create_reservation", conflict_once):
+            reservation = book_seats(self.user.id, [(self.show_session, 1, 1)])
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(reservation.tickets.count(), 1)
+
+    @override_settings(RESERVATION_RETRIES=1, RESERVATION_RETRY_BACKOFF=0)
+    def test_conflict_is_raised_after_retries(self):
+        with mock.patch.object(
+            booking, "create_reservation", side_effect=IntegrityError
+        ) as patched:
+            with self.assertRaises(IntegrityError):
+                book_seats(self.user.id, [(self.show_session, 1, 1)])
+        self.assertEqual(patched.call_count, 2)
+
+
+class ReservationBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_sample_user())
+        self.show_session = create_sample_show_session()
+
+    def test_same_seat_twice(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "show_session": self.show_session.id},
+                {"row": 1, "seat": 1, "show_session": self.show_session.id},
+            ]
+        }
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.exists())
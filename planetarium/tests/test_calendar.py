@@ -0,0 +1,151 @@
+from datetime import date, datetime, time
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import Reservation, ShowSession, ShowTheme, Ticket
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+CALENDAR_URL = reverse("planetarium:showsession-calendar")
+
+
+def at(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class CalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+
+        self.theme = ShowTheme.objects.create(name="Stars")
+        self.show = create_sample_astronomy_show()
+        self.show.show_theme.add(self.theme)
+        other_show = create_sample_astronomy_show(title="Other")
+        self.dome = create_sample_planetarium_dome(
+            name="Small", rows=1, seats_in_row=2
+        )
+        self.first = create_sample_show_session(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time=at(date(2030, 5, 1), 10),
+        )
+        create_sample_show_session(
+            astronomy_show=other_show,
+            planetarium_dome=self.dome,
+            show_time=at(date(2030, 5, 1), 23),
+        )
+        create_sample_show_session(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time=at(date(2030, 5, 3), 0),
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        for seat in (1, 2):
+            Ticket.objects.create(
+                row=1, seat=seat, show_session=self.first,
+                reservation=reservation,
+            )
+
+    def test_days_of_range(self):
+        res = self.client.get(
+            CALENDAR_URL, {"from": "2030-05-01", "to": "2030-05-03"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["days"], [
+            {
+                "date": "2030-05-01", "sessions": 2, "sold_out_sessions": 1,
+                "capacity": 4, "tickets_available": 2,
+            },
+            {
+                "date": "2030-05-02", "sessions": 0, "sold_out_sessions": 0,
+                "capacity": 0, "tickets_available": 0,
+            },
+            {
+                "date": "2030-05-03", "sessions": 1, "sold_out_sessions": 0,
+                "capacity": 2, "tickets_available": 2,
+            },
+        ])
+
+    def test_filters(self):
+        for params in (
+            {"astronomy_show": self.show.id},
+            {"show_theme": self.theme.id},
+        ):
+            res = self.client.get(CALENDAR_URL, {
+                "from": "2030-05-01", "to": "2030-05-01", **params,
+            })
+            self.assertEqual(res.data["days"][0]["sessions"], 1)
+
+        res = self.client.get(CALENDAR_URL, {
+            "from": "2030-05-01", "to": "2030-05-01",
+            "planetarium_dome": self.dome.id + 1,
+        })
+        self.assertEqual(res.data["days"][0]["sessions"], 0)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(
+                CALENDAR_URL, {"from": "2030-05-01", "to": "2030-05-31"}
+            )
+
+    def test_cached_until_schedule_changes(self):
+        params = {"from": "2030-05-02", "to": "2030-05-02"}
+        self.client.get(CALENDAR_URL, params)
+        with self.assertNumQueries(0):
+            self.client.get(CALENDAR_URL, params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_sample_show_session(
+                astronomy_show=self.show,
+                planetarium_dome=self.dome,
+                show_time=at(date(2030, 5, 2), 12),
+            )
+
+        res = self.client.get(CALENDAR_URL, params)
+        self.assertEqual(res.data["days"][0]["sessions"], 1)
+
+    def test_cached_until_tickets_change(self):
+        params = {"from": "2030-05-03", "to": "2030-05-03"}
+        self.client.get(CALENDAR_URL, params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                row=1, seat=1,
+                show_session=ShowSession.objects.get(
+                    show_time=at(date(2030, 5, 3), 0)
+                ),
+                reservation=Reservation.objects.create(user=self.user),
+            )
+
+        res = self.client.get(CALENDAR_URL, params)
+        self.assertEqual(res.data["days"][0]["tickets_available"], 1)
+
+    def test_invalid_ranges(self):
+        for params in (
+            {"from": "2030-05-01"},
+            {"from": "2030-05-03", "to": "2030-05-01"},
+            {"from": "2030-05-01", "to": "2030-08-01"},
+        ):
+            res = self.client.get(CALENDAR_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_filters(self):
+        for name in ("astronomy_show", "show_theme", "planetarium_dome"):
+            res = self.client.get(CALENDAR_URL, {
+                "from": "2030-05-01", "to": "2030-05-01", name: "blue",
+            })
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, res.data)
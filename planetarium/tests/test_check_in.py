@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.check_in import signing_key, ticket_token
+from planetarium.models import Reservation, Ticket
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+from planetarium.tokens import (
+    InvalidTicketToken,
+    TicketClaims,
+    sign_token,
+    verify_token,
+)
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+def check_in_url(show_session_id):
+    return reverse("planetarium:showsession-check-in", args=[show_session_id])
+
+
+class TicketTokenTests(TestCase):
+    def test_round_trip(self):
+        claims = TicketClaims(ticket=12, show_session=3, row=4, seat=15)
+        token = sign_token(claims, b"key")
+
+        self.assertEqual(len(token), 50)
+        self.assertEqual(verify_token(token, b"key"), claims)
+
+    def test_forged_tokens_are_rejected(self):
+        token = sign_token(TicketClaims(12, 3, 4, 15), b"key")
+        forged = sign_token(TicketClaims(12, 3, 4, 16), b"other key")
+
+        for bad in (forged, token[:-2] + "AA", token[:20], "not a token!"):
+            with self.assertRaises(InvalidTicketToken):
+                verify_token(bad, b"key")
+
+    @override_settings(TICKET_TOKEN_KEY="scanner key")
+    def test_configured_key(self):
+        self.assertEqual(signing_key(), b"scanner key")
+
+
+class CheckInTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.staff = create_sample_user("staff@test.com", is_staff=True)
+        astronomy_show = create_sample_astronomy_show()
+        planetarium_dome = create_sample_planetarium_dome()
+        show_time = datetime.now(timezone.utc) + timedelta(hours=1)
+        self.show_session = create_sample_show_session(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=show_time,
+        )
+        self.other_session = create_sample_show_session(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=show_time + timedelta(days=1),
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        self.tickets = [
+            Ticket.objects.create(
+                row=1, seat=seat, show_session=self.show_session,
+                reservation=reservation,
+            )
+            for seat in range(1, 5)
+        ]
+        self.other_ticket = Ticket.objects.create(
+            row=1, seat=1, show_session=self.other_session,
+            reservation=reservation,
+        )
+        self.scanned_at = datetime.now(timezone.utc)
+
+    def scan(self, ticket, seconds=0):
+        return {
+            "token": ticket_token(ticket),
+            "scanned_at": (
+                self.scanned_at + timedelta(seconds=seconds)
+            ).isoformat(),
+        }
+
+    def test_reservations_carry_tokens(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(RESERVATION_URL)
+
+        ticket = res.data["results"][0]["tickets"][0]
+        claims = verify_token(ticket["token"], signing_key())
+        self.assertEqual(claims.ticket, ticket["id"])
+        self.assertEqual((claims.row, claims.seat), (1, ticket["seat"]))
+        self.assertIsNone(ticket["checked_in_at"])
+
+    def test_check_in_requires_staff(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.client.post(
+            check_in_url(self.show_session.id),
+            {"scans": [self.scan(self.tickets[0])]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_check_in(self):
+        self.client.force_authenticate(self.staff)
+        self.tickets[1].checked_in_at = self.scanned_at
+        self.tickets[1].save()
+        self.tickets[2].cancelled_at = self.scanned_at
+        self.tickets[2].save()
+        forged = dict(self.scan(self.tickets[3]), token="A" * 50)
+
+        res = self.client.post(check_in_url(self.show_session.id), {"scans": [
+            self.scan(self.tickets[0], seconds=5),
+            self.scan(self.tickets[0], seconds=1),
+            self.scan(self.tickets[1]),
+            self.scan(self.tickets[2]),
+            self.scan(self.other_ticket),
+            forged,
+        ]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            [
+                "duplicate", "checked_in", "duplicate", "cancelled",
+                "wrong_session", "invalid",
+            ],
+        )
+        self.tickets[0].refresh_from_db()
+        self.assertEqual(
+            self.tickets[0].checked_in_at,
+            self.scanned_at + timedelta(seconds=1),
+        )
+        self.assertEqual(
+            res.data["results"][0]["checked_in_at"],
+            self.tickets[0].checked_in_at,
+        )
+
+    def test_queries_do_not_grow_with_scans(self):
+        self.client.force_authenticate(self.staff)
+        scans = [self.scan(ticket) for ticket in self.tickets]
+
+        # session, locked tickets and the update, plus savepoint queries
+        with self.assertNumQueries(5):
+            self.client.post(
+                check_in_url(self.show_session.id),
+                {"scans": scans},
+                format="json",
+            )
+
+        self.assertFalse(
+            Ticket.objects.filter(
+                show_session=self.show_session, checked_in_at__isnull=True
+            ).exists()
+        )
@@ -0,0 +1,139 @@
+import gzip
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+from planetarium_api_service.compression import (
+    CompressionMiddleware,
+    accepted_encodings,
+    negotiate,
+)
+
+SCHEMA_URL = reverse("schema")
+SHOW_SESSION_STREAM_URL = reverse("planetarium:showsession-stream")
+
+BODY = json.dumps([{"id": number, "title": "Show"} for number in range(100)])
+
+
+def compress(response, accept_encoding="gzip"):
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+class NegotiationTests(TestCase):
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings("gzip;q=0.5, br, identity ;q=0, bad;q=x"),
+            {"gzip": 0.5, "br": 1.0, "identity": 0.0},
+        )
+
+    def test_negotiate(self):
+        levels = {"br": 5, "gzip": 6}
+
+        self.assertEqual(negotiate("gzip, deflate", levels), ("gzip", 6))
+        self.assertEqual(negotiate("*", levels)[0], negotiate("gzip", levels)[0])
+        self.assertIsNone(negotiate("gzip;q=0", levels))
+        self.assertIsNone(negotiate("", levels))
+
+
+class CompressionMiddlewareTests(TestCase):
+    def test_json_is_gzipped(self):
+        response = compress(
+            HttpResponse(BODY, content_type="application/json")
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content).decode(), BODY)
+
+    def test_identity_without_accept_encoding(self):
+        response = compress(
+            HttpResponse(BODY, content_type="application/json"), ""
+        )
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response.content.decode(), BODY)
+
+    def test_small_body_is_not_compressed(self):
+        response = compress(
+            HttpResponse('{"id": 1}', content_type="application/json")
+        )
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_compressed_media_is_skipped(self):
+        response = compress(HttpResponse(BODY, content_type="image/png"))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertFalse(response.has_header("Vary"))
+
+    def test_etag_becomes_weak(self):
+        response = HttpResponse(BODY, content_type="application/json")
+        response["ETag"] = '"abc"'
+
+        self.assertEqual(compress(response)["ETag"], 'W/"abc"')
+
+    def test_streaming_response_is_flushed_per_chunk(self):
+        chunks = [line.encode() + b"\n" for line in BODY.split(",")]
+        response = compress(
+            StreamingHttpResponse(
+                iter(chunks), content_type="application/x-ndjson"
+            )
+        )
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        compressed = list(response.streaming_content)
+        for chunk, data in zip(chunks, compressed):
+            # every chunk is decodable as soon as it is received
+            self.assertEqual(decompressor.decompress(data), chunk)
+        self.assertEqual(len(compressed), len(chunks) + 1)
+        self.assertEqual(
+            gzip.decompress(b"".join(compressed)), b"".join(chunks)
+        )
+
+
+class CompressedEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_schema_is_compressed(self):
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn(b"openapi", gzip.decompress(res.content))
+
+    def test_stream_is_compressed(self):
+        staff = create_sample_user("staff@test.com", is_staff=True)
+        self.client.force_authenticate(staff)
+        astronomy_show = create_sample_astronomy_show(title="Show")
+        planetarium_dome = create_sample_planetarium_dome()
+        create_sample_show_session(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=datetime.now(timezone.utc) + timedelta(days=1),
+        )
+
+        res = self.client.get(
+            SHOW_SESSION_STREAM_URL, HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(res.streaming_content)).splitlines()
+        self.assertEqual(json.loads(lines[0])["astronomy_show_title"], "Show")
@@ -0,0 +1,141 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import PlanetariumDome
+from planetarium_api_service.db_routing import ReplicaRoutingMiddleware
+
+REPLICA = "replica"
+DOME_URL = reverse("planetarium:planetariumdome-list")
+
+
+def read_database(request):
+    domes = PlanetariumDome.objects.all()
+    return HttpResponse(f"{domes.db} {domes.count()}")
+
+
+def failing_write(request):
+    return HttpResponse(PlanetariumDome.objects.all().db, status=400)
+
+
+# TestCase would wrap every test in a transaction on the primary
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Reads and writes against a second SQLite database as the replica.
+
+    The replica is registered after the test databases are set up, so
+    it gets no migrations and only holds what replicate() copies to it,
+    like a replica lagging behind the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(read_database)
+
+        replica_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(replica_dir.cleanup)
+        connections.settings[REPLICA] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+            REPLICA: {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": f"{replica_dir.name}/replica.sqlite3",
+            },
+        })[REPLICA]
+        self.addCleanup(self.remove_replica)
+        with connections[REPLICA].schema_editor() as schema_editor:
+            schema_editor.create_model(PlanetariumDome)
+
+    def remove_replica(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def replicate(self):
+        PlanetariumDome.objects.using(REPLICA).bulk_create(
+            PlanetariumDome.objects.using(DEFAULT_DB_ALIAS).exclude(
+                id__in=list(
+                    PlanetariumDome.objects.using(REPLICA).values_list(
+                        "id", flat=True
+                    )
+                )
+            )
+        )
+
+    def test_safe_request_reads_from_replica(self):
+        PlanetariumDome.objects.create(name="Blue", rows=5, seats_in_row=5)
+
+        response = self.middleware(self.factory.get("/"))
+        self.assertEqual(response.content, b"replica 0")
+
+        self.replicate()
+        response = self.middleware(self.factory.get("/"))
+        self.assertEqual(response.content, b"replica 1")
+
+    def test_unsafe_request_uses_primary_and_pins_client(self):
+        PlanetariumDome.objects.create(name="Blue", rows=5, seats_in_row=5)
+
+        response = self.middleware(self.factory.post("/"))
+        self.assertEqual(response.content, b"default 1")
+        self.assertIn("pin_primary", response.cookies)
+
+    def test_failed_write_does_not_pin_client(self):
+        response = ReplicaRoutingMiddleware(failing_write)(
+            self.factory.post("/")
+        )
+        self.assertNotIn("pin_primary", response.cookies)
+
+    def test_pinned_client_reads_from_primary(self):
+        PlanetariumDome.objects.create(name="Blue", rows=5, seats_in_row=5)
+        request = self.factory.get("/")
+        request.COOKIES["pin_primary"] = "1"
+
+        response = self.middleware(request)
+        self.assertEqual(response.content, b"default 1")
+
+    def test_reads_outside_requests_use_primary(self):
+        PlanetariumDome.objects.create(name="Blue", rows=5, seats_in_row=5)
+        self.assertEqual(PlanetariumDome.objects.count(), 1)
+
+    def test_reads_in_transaction_use_primary(self):
+        def read_in_transaction(request):
+            with transaction.atomic():
+                return read_database(request)
+
+        response = ReplicaRoutingMiddleware(read_in_transaction)(
+            self.factory.get("/")
+        )
+        self.assertEqual(response.content, b"default 0")
+
+    def test_read_your_writes_after_post(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "testpass"
+        )
+        writer = APIClient()
+        writer.force_authenticate(admin)
+        reader = APIClient()
+        reader.force_authenticate(admin)
+
+        res = writer.post(
+            DOME_URL, {"name": "Blue", "rows": 5, "seats_in_row": 5}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn("pin_primary", writer.cookies)
+
+        # the writer sees its dome, others wait for replication
+        self.assertEqual(writer.get(DOME_URL).data["count"], 1)
+        self.assertEqual(reader.get(DOME_URL).data["count"], 0)
+        self.replicate()
+        self.assertEqual(reader.get(DOME_URL).data["count"], 1)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        response = self.middleware(self.factory.get("/"))
+        self.assertEqual(response.content, b"default 0")
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from planetarium.fieldsets import parse_fieldset
+from planetarium.models import AstronomyShow, Reservation, ShowTheme, Ticket
+from planetarium.tests.helpers import (
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+ASTRONOMY_SHOW_URL = reverse("planetarium:astronomyshow-list")
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+def show_session_detail_url(show_session_id):
+    return reverse("planetarium:showsession-detail", args=[show_session_id])
+
+
+class ParseFieldsetTests(TestCase):
+    def test_parse_fieldset(self):
+        self.assertEqual(
+            parse_fieldset("id, astronomy_show.title,astronomy_show.id,,"),
+            {"id": None, "astronomy_show": {"title": None, "id": None}},
+        )
+
+    def test_whole_nested_serializer_wins(self):
+        self.assertEqual(
+            parse_fieldset("show.title,show"), {"show": None}
+        )
+        self.assertEqual(
+            parse_fieldset("show,show.title"), {"show": None}
+        )
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        self.astronomy_show = AstronomyShow.objects.create(
+            title="Show", description="A very long description"
+        )
+        self.astronomy_show.show_theme.add(ShowTheme.objects.create(name="Sun"))
+        self.planetarium_dome = create_sample_planetarium_dome(
+            rows=5, seats_in_row=6
+        )
+        show_time = datetime.now(timezone.utc) + timedelta(days=1)
+        self.show_sessions = [
+            create_sample_show_session(
+                astronomy_show=self.astronomy_show,
+                planetarium_dome=self.planetarium_dome,
+                show_time=show_time + timedelta(hours=hours),
+            )
+            for hours in range(3)
+        ]
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        return res, [query["sql"] for query in queries]
+
+    def test_default_shape_is_unchanged(self):
+        res, _ = self.get(SHOW_SESSION_URL)
+        self.assertEqual(
+            set(res.data["results"][0]),
+            {
+                "id", "astronomy_show_title", "planetarium_dome_name",
+                "planetarium_dome_capacity", "show_time",
+            },
+        )
+        self.assertEqual(res.data["results"][0]["planetarium_dome_capacity"], 30)
+
+    def test_fields_skip_joins_and_columns(self):
+        res, queries = self.get(SHOW_SESSION_URL, fields="id,show_time")
+
+        self.assertEqual(set(res.data["results"][0]), {"id", "show_time"})
+        select = queries[-1]
+        self.assertNotIn('"planetarium_astronomyshow"."title"', select)
+        self.assertNotIn('"planetarium_planetariumdome"."name"', select)
+
+    def test_related_columns_are_deferred(self):
+        res, queries = self.get(SHOW_SESSION_URL)
+
+        self.assertEqual(res.data["results"][0]["astronomy_show_title"], "Show")
+        self.assertIn('"planetarium_astronomyshow"."title"', queries[-1])
+        self.assertNotIn('"planetarium_astronomyshow"."description"', queries[-1])
+
+    def test_expand(self):
+        res, queries = self.get(
+            SHOW_SESSION_URL, expand="planetarium_dome,astronomy_show"
+        )
+
+        show_session = res.data["results"][0]
+        self.assertEqual(
+            show_session["planetarium_dome"],
+            {
+                "id": self.planetarium_dome.id,
+                "name": "Blue",
+                "rows": 5,
+                "seats_in_row": 6,
+                "layout": None,
+                "capacity": 30,
+            },
+        )
+        self.assertEqual(show_session["astronomy_show"]["show_theme"], ["Sun"])
+        # count, sessions with their show and dome, show themes
+        self.assertEqual(len(queries), 3)
+
+    def test_nested_fields(self):
+        res, queries = self.get(
+            show_session_detail_url(self.show_sessions[0].id),
+            fields="id,astronomy_show.title",
+        )
+
+        self.assertEqual(
+            res.data,
+            {
+                "id": self.show_sessions[0].id,
+                "astronomy_show": {"title": "Show"},
+            },
+        )
+        self.assertNotIn('"planetarium_astronomyshow"."description"', queries[-1])
+
+    def test_reservation_list_queries_do_not_grow_with_tickets(self):
+        for show_session in self.show_sessions:
+            reservation = Reservation.objects.create(user=self.user)
+            for seat in range(1, 4):
+                Ticket.objects.create(
+                    row=1, seat=seat, show_session=show_session,
+                    reservation=reservation,
+                )
+
+        res, queries = self.get(RESERVATION_URL)
+        self.assertEqual(res.data["count"], 3)
+        # count, reservations, tickets with their sessions
+        self.assertEqual(len(queries), 3)
+
+        res, queries = self.get(
+            RESERVATION_URL, fields="id,tickets.row,tickets.seat"
+        )
+        self.assertEqual(
+            res.data["results"][0]["tickets"],
+            [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}, {"row": 1, "seat": 3}],
+        )
+        self.assertNotIn("planetarium_showsession", queries[-1])
+
+    def test_astronomy_show_list_without_themes_skips_prefetch(self):
+        _, queries = self.get(ASTRONOMY_SHOW_URL, fields="id,title")
+        self.assertFalse(
+            any("planetarium_showtheme" in query for query in queries)
+        )
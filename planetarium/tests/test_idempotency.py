@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import Reservation
+from planetarium.tests.helpers import (
+    create_sample_show_session,
+    create_sample_user,
+)
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+class IdempotentReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        self.show_session = create_sample_show_session()
+
+    def post(self, key, seat=1):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": seat, "show_session": self.show_session.id}
+            ]
+        }
+        return self.client.post(
+            RESERVATION_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_stored_response(self):
+        first = self.post("key-1")
+        retry = self.post("key-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_key_reused_with_different_payload(self):
+        self.post("key-1")
+        res = self.post("key-1", seat=2)
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self.post("key-1")
+        self.client.force_authenticate(create_sample_user("other@test.com"))
+        res = self.post("key-1", seat=2)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_in_flight_duplicate_conflicts_after_wait(self):
+        cache.set(f"idempotency:{self.user.pk}:key-1:lock", "in-flight")
+        res = self.post("key-1")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Reservation.objects.count(), 0)
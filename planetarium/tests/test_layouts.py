@@ -0,0 +1,194 @@
+from datetime import date, datetime, time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.layouts import (
+    InvalidLayout,
+    compile_layout,
+    decode_layout,
+    encode_layout,
+    layout_lines,
+    parse_layout,
+)
+from planetarium.models import PlanetariumDome, Reservation, Ticket
+from planetarium.serializers import PlanetariumDomeSerializer
+from planetarium.tests.helpers import (
+    create_sample_show_session,
+    create_sample_user,
+)
+
+DOME_URL = reverse("planetarium:planetariumdome-list")
+RESERVATION_URL = reverse("planetarium:reservation-list")
+BEST_AVAILABLE_URL = reverse("planetarium:reservation-best-available")
+CALENDAR_URL = reverse("planetarium:showsession-calendar")
+
+LAYOUT = [
+    ".###.",
+    "##.##",
+    "#####",
+]
+
+
+def get_seats_url(show_session_id):
+    return reverse("planetarium:showsession-seats", args=[show_session_id])
+
+
+class LayoutTests(TestCase):
+    def test_round_trip(self):
+        mask = parse_layout(LAYOUT)
+        layout = encode_layout(mask)
+
+        self.assertEqual(len(layout), 2)
+        self.assertEqual(layout_lines(decode_layout(layout, 3, 5)), LAYOUT)
+
+    def test_compiled_layout(self):
+        seat_layout = compile_layout(3, 5, encode_layout(parse_layout(LAYOUT)))
+
+        self.assertEqual(seat_layout.capacity, 12)
+        self.assertTrue(seat_layout.has_seat(1, 2))
+        self.assertFalse(seat_layout.has_seat(1, 1))
+        self.assertFalse(seat_layout.has_seat(2, 3))
+        self.assertFalse(seat_layout.has_seat(4, 1))
+        self.assertEqual(seat_layout.available([(1, 2), (1, 2), (2, 3)]), 11)
+        self.assertIs(
+            compile_layout(3, 5, encode_layout(parse_layout(LAYOUT))),
+            seat_layout,
+        )
+
+    def test_rectangle_without_layout(self):
+        seat_layout = compile_layout(2, 3)
+
+        self.assertEqual(seat_layout.capacity, 6)
+        self.assertTrue(seat_layout.has_seat(2, 3))
+
+    def test_invalid_layouts(self):
+        for lines in ([], ["##", "#"], ["#x"]):
+            with self.assertRaises(InvalidLayout):
+                parse_layout(lines)
+        with self.assertRaises(InvalidLayout):
+            decode_layout(b"\xff", 3, 5)
+
+
+class DomeLayoutApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        self.dome = PlanetariumDome.objects.create(
+            name="Curved",
+            rows=3,
+            seats_in_row=5,
+            layout=encode_layout(parse_layout(LAYOUT)),
+        )
+        self.show_session = create_sample_show_session(
+            planetarium_dome=self.dome,
+            show_time=timezone.make_aware(
+                datetime.combine(date(2030, 5, 1), time(10))
+            ),
+        )
+
+    def test_create_dome_with_layout(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "testpass"
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.post(DOME_URL, {
+            "name": "Small", "rows": 3, "seats_in_row": 5, "layout": LAYOUT,
+        }, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["layout"], LAYOUT)
+        self.assertEqual(res.data["capacity"], 12)
+        self.assertEqual(
+            PlanetariumDome.objects.get(id=res.data["id"]).total_seats, 12
+        )
+
+        res = self.client.post(DOME_URL, {
+            "name": "Wrong", "rows": 2, "seats_in_row": 5, "layout": LAYOUT,
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seats_outside_the_layout_cannot_be_booked(self):
+        res = self.client.post(RESERVATION_URL, {
+            "tickets": [
+                {"row": 2, "seat": 3, "show_session": self.show_session.id},
+            ]
+        }, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_seat_map_marks_positions_without_seats(self):
+        res = self.client.get(get_seats_url(self.show_session.id))
+
+        self.assertEqual(res.data["capacity"], 12)
+        self.assertEqual(res.data["seats"][1], [["F", 2], ["X", 1], ["F", 2]])
+
+    def test_best_available_does_not_span_aisles(self):
+        res = self.client.post(BEST_AVAILABLE_URL, {
+            "show_session": self.show_session.id, "count": 4,
+        }, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(
+                Ticket.objects.filter(
+                    reservation_id=res.data["id"]
+                ).values_list("row", flat=True)
+            ),
+            [3, 3, 3, 3],
+        )
+
+    def test_availability_counts_layout_seats(self):
+        Ticket.objects.create(
+            row=1, seat=2, show_session=self.show_session,
+            reservation=Reservation.objects.create(user=self.user),
+        )
+
+        res = self.client.get(
+            CALENDAR_URL, {"from": "2030-05-01", "to": "2030-05-01"}
+        )
+
+        self.assertEqual(res.data["days"][0]["capacity"], 12)
+        self.assertEqual(res.data["days"][0]["tickets_available"], 11)
+
+    def test_resizing_requires_a_new_layout(self):
+        for data in ({"rows": 5, "seats_in_row": 3}, {"rows": 2}):
+            serializer = PlanetariumDomeSerializer(
+                self.dome, data=data, partial=True
+            )
+            self.assertFalse(serializer.is_valid())
+            self.assertIn("layout", serializer.errors)
+
+        serializer = PlanetariumDomeSerializer(
+            self.dome, data={"rows": 2, "layout": LAYOUT[:2]}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().total_seats, 7)
+
+        serializer = PlanetariumDomeSerializer(
+            self.dome, data={"rows": 4, "layout": None}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().total_seats, 20)
+
+    def test_clean_rejects_a_stale_layout(self):
+        self.dome.rows, self.dome.seats_in_row = 5, 3
+        with self.assertRaises(ValidationError):
+            self.dome.full_clean()
+
+        self.dome.rows = 2
+        with self.assertRaises(ValidationError):
+            self.dome.full_clean()
+
+        self.dome.rows, self.dome.seats_in_row = 3, 5
+        self.dome.full_clean()
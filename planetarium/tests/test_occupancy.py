@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.occupancy import get_occupancy_report
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_reservation,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+OCCUPANCY_URL = reverse("planetarium:occupancy-analytics-list")
+
+
+class OccupancyAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user("admin@test.com", is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.astronomy_show = create_sample_astronomy_show()
+        self.planetarium_dome = create_sample_planetarium_dome(
+            rows=2, seats_in_row=3
+        )
+        now = timezone.now()
+        self.show_sessions = [
+            create_sample_show_session(
+                astronomy_show=self.astronomy_show,
+                planetarium_dome=self.planetarium_dome,
+                show_time=now + timedelta(hours=hours),
+            )
+            for hours in (10, 100)
+        ]
+
+    def test_occupancy_report(self):
+        create_sample_reservation(self.user, (self.show_sessions[0], 1, 2))
+        create_sample_reservation(self.user, (self.show_sessions[1], 1, 2))
+        create_sample_reservation(self.user, (self.show_sessions[1], 2, 3))
+
+        res = self.client.get(
+            OCCUPANCY_URL, {"planetarium_dome": self.planetarium_dome.id}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["sessions"], 2)
+        self.assertEqual(res.data["tickets"], 3)
+
+        dome = res.data["domes"][0]
+        self.assertEqual(dome["heatmap"], [[0, 1, 0], [0, 0, 0.5]])
+        self.assertEqual(
+            dome["popular_seats"][0], {"row": 1, "seat": 2, "sold": 2}
+        )
+        self.assertIsNone(dome["mean_lead_hours"][0][0])
+
+        fill_curve = {
+            point["hours_before"]: point["fill_rate"]
+            for point in res.data["fill_curve"]
+        }
+        self.assertEqual(fill_curve[0], 0.25)
+        self.assertEqual(fill_curve[24], round(2 / 12, 4))
+        self.assertEqual(fill_curve[168], 0)
+
+    def test_report_cached_until_tickets_change(self):
+        filters = {"astronomy_show_id": self.astronomy_show.id}
+        get_occupancy_report(filters)
+        with self.assertNumQueries(0):
+            get_occupancy_report(filters)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_sample_reservation(self.user, (self.show_sessions[0], 2, 1))
+        self.assertEqual(get_occupancy_report(filters)["tickets"], 1)
+
+    def test_filter_required(self):
+        res = self.client.get(OCCUPANCY_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_filters(self):
+        for name in ("planetarium_dome", "astronomy_show"):
+            res = self.client.get(OCCUPANCY_URL, {name: "dome"})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, res.data)
@@ -0,0 +1,166 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium_api_service.pagination import estimate_count
+
+from planetarium.models import Reservation, ShowSession, Ticket
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_user,
+)
+
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+SHOW_SESSION_STREAM_URL = reverse("planetarium:showsession-stream")
+RESERVATION_URL = reverse("planetarium:reservation-list")
+RESERVATION_STREAM_URL = reverse("planetarium:reservation-stream")
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        astronomy_show = create_sample_astronomy_show()
+        planetarium_dome = create_sample_planetarium_dome()
+        show_time = datetime.now(timezone.utc) + timedelta(days=1)
+        self.show_sessions = ShowSession.objects.bulk_create(
+            ShowSession(
+                astronomy_show=astronomy_show,
+                planetarium_dome=planetarium_dome,
+                show_time=show_time + timedelta(hours=hours),
+            )
+            for hours in range(7)
+        )
+
+    @override_settings(PAGINATION_MAX_LIMIT=3)
+    def test_limit_is_capped(self):
+        res = self.client.get(SHOW_SESSION_URL, {"limit": 1000000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 7)
+        self.assertEqual(len(res.data["results"]), 3)
+
+    @mock.patch("planetarium_api_service.pagination.estimate_count")
+    def test_small_counts_are_exact(self, estimate):
+        res = self.client.get(SHOW_SESSION_URL, {"limit": 2})
+
+        estimate.assert_not_called()
+        self.assertEqual(res.data["count"], 7)
+        self.assertFalse(res.data["count_estimated"])
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+    @mock.patch("planetarium_api_service.pagination.estimate_count")
+    def test_estimated_count_above_threshold(self, estimate):
+        estimate.return_value = 5000
+        res = self.client.get(SHOW_SESSION_URL, {"limit": 2})
+
+        self.assertEqual(res.data["count"], 5000)
+        self.assertTrue(res.data["count_estimated"])
+        self.assertIsNotNone(res.data["next"])
+
+        # the estimate is cached, no count or estimate runs again
+        with self.assertNumQueries(1):
+            res = self.client.get(SHOW_SESSION_URL, {"limit": 2})
+        self.assertEqual(res.data["count"], 5000)
+        self.assertEqual(estimate.call_count, 1)
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+    @mock.patch("planetarium_api_service.pagination.estimate_count")
+    def test_estimate_is_at_least_the_bounded_count(self, estimate):
+        estimate.return_value = 2
+        res = self.client.get(SHOW_SESSION_URL, {"limit": 2})
+
+        self.assertEqual(res.data["count"], 6)
+        self.assertTrue(res.data["count_estimated"])
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+    @mock.patch(
+        "planetarium_api_service.pagination.estimate_count",
+        return_value=None,
+    )
+    def test_exact_count_without_estimates(self, estimate):
+        res = self.client.get(SHOW_SESSION_URL, {"limit": 2})
+
+        self.assertEqual(res.data["count"], 7)
+        self.assertFalse(res.data["count_estimated"])
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+    @mock.patch(
+        "planetarium_api_service.pagination.estimate_count",
+        return_value=5000,
+    )
+    def test_last_page_corrects_estimate(self, estimate):
+        res = self.client.get(SHOW_SESSION_URL, {"limit": 5, "offset": 5})
+
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertEqual(res.data["count"], 7)
+        self.assertFalse(res.data["count_estimated"])
+        self.assertIsNone(res.data["next"])
+
+    @skipUnless(connection.vendor == "postgresql", "planner estimates")
+    def test_unfiltered_estimate_skips_explain(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE planetarium_showsession")
+
+        with CaptureQueriesContext(connection) as queries:
+            estimate = estimate_count(ShowSession.objects.all())
+
+        self.assertEqual(estimate, 7)
+        self.assertNotIn("EXPLAIN", queries[0]["sql"])
+        self.assertIsNotNone(
+            estimate_count(ShowSession.objects.filter(id__gt=0))
+        )
+
+    def test_view_max_page_size(self):
+        for _ in range(55):
+            Reservation.objects.create(user=self.user)
+
+        res = self.client.get(RESERVATION_URL, {"limit": 1000})
+        self.assertEqual(len(res.data["results"]), 50)
+
+    def test_stream_requires_staff(self):
+        res = self.client.get(SHOW_SESSION_STREAM_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(STREAM_CHUNK_SIZE=2)
+    def test_stream_show_sessions(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(SHOW_SESSION_STREAM_URL, {"fields": "id"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        chunks = list(res.streaming_content)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(
+            [json.loads(line) for line in b"".join(chunks).splitlines()],
+            [{"id": show_session.id} for show_session in self.show_sessions],
+        )
+
+    def test_stream_reservations_of_every_user(self):
+        staff = create_sample_user("staff@test.com", is_staff=True)
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=1, seat=1, show_session=self.show_sessions[0],
+            reservation=reservation,
+        )
+        self.client.force_authenticate(staff)
+
+        res = self.client.get(RESERVATION_STREAM_URL)
+
+        lines = b"".join(res.streaming_content).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["id"], reservation.id)
+        self.assertEqual(json.loads(lines[0])["tickets"][0]["row"], 1)
@@ -1,9 +1,11 @@
 import os
+import shutil
 import tempfile
 
 from PIL import Image
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
@@ -160,6 +162,7 @@ class AdminAstronomyShowApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class AstronomyShowImageUploadTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -174,6 +177,7 @@ class AstronomyShowImageUploadTests(TestCase):
 
     def tearDown(self):
         self.astronomy_show.image.delete()
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
     def test_upload_image_to_astronomy_show(self):
         url = get_image_upload_url(self.astronomy_show.id)
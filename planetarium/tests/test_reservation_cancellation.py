@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import Ticket
+from planetarium.tests.helpers import (
+    SAMPLE_SHOW_TIME,
+    create_sample_reservation,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+def get_cancel_url(reservation_id):
+    return reverse("planetarium:reservation-cancel", args=[reservation_id])
+
+
+class ReservationCancellationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        self.show_session = create_sample_show_session()
+        self.other_show_session = create_sample_show_session(
+            astronomy_show=self.show_session.astronomy_show,
+            planetarium_dome=self.show_session.planetarium_dome,
+            show_time=SAMPLE_SHOW_TIME + timedelta(days=1),
+        )
+
+    def test_create_reservation(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "show_session": self.show_session.id},
+                {"row": 1, "seat": 2, "show_session": self.show_session.id},
+            ]
+        }
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Ticket.objects.filter(reservation_id=res.data["id"]).count(), 2
+        )
+
+    def test_create_reservation_with_taken_seat(self):
+        create_sample_reservation(self.user, (self.show_session, 1, 1))
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "show_session": self.show_session.id},
+            ]
+        }
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cancel_reservation_releases_seats(self):
+        reservation = create_sample_reservation(
+            self.user, (self.show_session, 1, 1), (self.show_session, 1, 2)
+        )
+        res = self.client.post(get_cancel_url(reservation.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(res.data["cancelled_at"])
+        self.assertFalse(Ticket.objects.active().exists())
+        self.assertEqual(Ticket.objects.count(), 2)
+
+        create_sample_reservation(self.user, (self.show_session, 1, 1))
+        self.assertEqual(Ticket.objects.active().count(), 1)
+
+    def test_cancel_reservation_twice(self):
+        reservation = create_sample_reservation(
+            self.user, (self.show_session, 1, 1)
+        )
+        self.client.post(get_cancel_url(reservation.id))
+        res = self.client.post(get_cancel_url(reservation.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cannot_cancel_other_users_reservation(self):
+        other_user = create_sample_user("other@test.com")
+        reservation = create_sample_reservation(
+            other_user, (self.show_session, 1, 1)
+        )
+        res = self.client.post(get_cancel_url(reservation.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_show_session_requires_admin(self):
+        url = reverse("planetarium:showsession-cancel", args=[self.show_session.id])
+        res = self.client.post(url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cancel_show_session_reservations(self):
+        self.user.is_staff = True
+        self.user.save()
+        single = create_sample_reservation(
+            self.user, (self.show_session, 1, 1), (self.show_session, 2, 2)
+        )
+        mixed = create_sample_reservation(
+            self.user,
+            (self.show_session, 3, 3),
+            (self.other_show_session, 3, 3),
+        )
+        url = reverse("planetarium:showsession-cancel", args=[self.show_session.id])
+        res = self.client.post(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["released_seats"], 3)
+
+        single.refresh_from_db()
+        mixed.refresh_from_db()
+        self.assertIsNotNone(single.cancelled_at)
+        self.assertIsNone(mixed.cancelled_at)
+        self.assertEqual(
+            list(Ticket.objects.active().values_list("show_session", flat=True)),
+            [self.other_show_session.id],
+        )
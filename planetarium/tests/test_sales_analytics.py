@@ -0,0 +1,121 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import SaleEvent, SalesRollup
+from planetarium.sales import refresh_sales_rollups
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+SALES_URL = reverse("planetarium:sales-analytics-list")
+
+
+@override_settings(SALES_ROLLUP_LAG=0)
+class SalesAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user("admin@test.com", is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.astronomy_show = create_sample_astronomy_show(title="Show")
+        self.show_session = create_sample_show_session(
+            astronomy_show=self.astronomy_show,
+        )
+
+    def reserve(self, *seats):
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "show_session": self.show_session.id}
+                for row, seat in seats
+            ]
+        }
+        return self.client.post(RESERVATION_URL, payload, format="json")
+
+    def test_reservation_path_appends_events(self):
+        res = self.reserve((1, 1), (1, 2))
+        self.client.post(
+            reverse("planetarium:reservation-cancel", args=[res.data["id"]])
+        )
+        self.assertEqual(
+            list(SaleEvent.objects.order_by("id").values_list("kind", "tickets")),
+            [(SaleEvent.SALE, 2), (SaleEvent.CANCELLATION, -2)],
+        )
+
+    def test_refresh_is_incremental(self):
+        self.reserve((1, 1))
+        refresh_sales_rollups()
+        self.reserve((2, 1), (2, 2))
+        refresh_sales_rollups()
+        self.assertEqual(refresh_sales_rollups(), 0)
+
+        rollup = SalesRollup.objects.get()
+        self.assertEqual(rollup.tickets_sold, 3)
+        self.assertEqual(rollup.tickets_cancelled, 0)
+
+    def test_refresh_worker_survives_a_failed_pass(self):
+        out = StringIO()
+
+        with mock.patch(
+            "planetarium.management.commands.refresh_sales_rollups."
+            "refresh_sales_rollups",
+            side_effect=[DatabaseError, 1],
+        ), mock.patch(
+            "time.sleep", side_effect=[None, KeyboardInterrupt]
+        ), self.assertLogs(
+            "planetarium.management.commands.refresh_sales_rollups", "ERROR"
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command(
+                    "refresh_sales_rollups", "--interval", "60", stdout=out
+                )
+
+        self.assertIn("1 rows updated", out.getvalue())
+
+    def test_sales_report_reads_rollups_only(self):
+        res = self.reserve((1, 1), (1, 2))
+        self.client.post(
+            reverse("planetarium:reservation-cancel", args=[res.data["id"]])
+        )
+        self.reserve((3, 3))
+        refresh_sales_rollups()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(SALES_URL, {"group_by": "show"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [{
+                "astronomy_show": self.astronomy_show.id,
+                "astronomy_show_title": "Show",
+                "tickets_sold": 3,
+                "tickets_cancelled": 2,
+                "net_tickets": 1,
+            }],
+        )
+
+    def test_sales_report_invalid_group(self):
+        res = self.client.get(SALES_URL, {"group_by": "planet"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sales_report_invalid_filters(self):
+        for name in ("astronomy_show", "planetarium_dome"):
+            res = self.client.get(SALES_URL, {name: "1,2"})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, res.data)
+
+    def test_sales_report_requires_admin(self):
+        self.user.is_staff = False
+        self.user.save()
+        res = self.client.get(SALES_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,106 @@
+import glob
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium_api_service.schema import load_schema, rendered_schema
+
+SCHEMA_URL = reverse("schema")
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.schema_dir = tempfile.TemporaryDirectory()
+        self.schema_file = os.path.join(self.schema_dir.name, "schema.json")
+        self.override = override_settings(SCHEMA_FILE=self.schema_file)
+        self.override.enable()
+        load_schema.cache_clear()
+        rendered_schema.cache_clear()
+
+    def tearDown(self):
+        self.override.disable()
+        self.schema_dir.cleanup()
+        load_schema.cache_clear()
+        rendered_schema.cache_clear()
+
+    def test_schema_is_generated_once(self):
+        get_schema = SchemaGenerator.get_schema
+        with mock.patch.object(
+            SchemaGenerator, "get_schema", autospec=True,
+            side_effect=get_schema,
+        ) as generate:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+            self.client.get(SCHEMA_URL, {"format": "json"})
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_etag_revalidation(self):
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+    def test_json_schema_documents_jwt_auth(self):
+        res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        self.assertEqual(
+            res["Content-Type"], "application/vnd.oai.openapi+json"
+        )
+        schema = json.loads(res.content)
+        self.assertIn("jwtAuth", schema["components"]["securitySchemes"])
+
+    def test_build_schema_is_served(self):
+        call_command("build_schema", stdout=StringIO())
+        with open(self.schema_file) as schema_file:
+            schema = json.load(schema_file)
+        schema["info"]["title"] = "Built schema"
+        with open(self.schema_file, "w") as schema_file:
+            json.dump(schema, schema_file)
+        for path in glob.glob(f"{self.schema_file}.*"):
+            os.remove(path)
+
+        res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        self.assertEqual(json.loads(res.content)["info"]["title"], "Built schema")
+
+    def test_precompressed_schema_is_served(self):
+        call_command("build_schema", stdout=StringIO())
+        with open(f"{self.schema_file}.json.gz", "rb") as variant:
+            compressed = variant.read()
+
+        with mock.patch.object(SchemaGenerator, "get_schema") as generate:
+            res = self.client.get(
+                SCHEMA_URL, {"format": "json"}, HTTP_ACCEPT_ENCODING="gzip"
+            )
+            plain = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        generate.assert_not_called()
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertEqual(res.content, compressed)
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertNotEqual(res["ETag"], plain["ETag"])
+
+        res = self.client.get(
+            SCHEMA_URL, {"format": "json"}, HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
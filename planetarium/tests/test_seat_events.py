@@ -0,0 +1,167 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from planetarium.models import Reservation, Ticket
+from planetarium.seat_events import (
+    InMemorySeatChangeFeed,
+    PostgresSeatChangeFeed,
+    get_seat_change_feed,
+)
+from planetarium.sse import SeatEventsRouter, issue_stream_ticket
+from planetarium.tests.helpers import (
+    create_sample_show_session,
+    create_sample_user,
+)
+
+IN_MEMORY_FEED = "planetarium.seat_events.InMemorySeatChangeFeed"
+
+
+def events_ticket_url(show_session_id):
+    return reverse(
+        "planetarium:showsession-events-ticket", args=[show_session_id]
+    )
+
+
+async def not_found_app(scope, receive, send):
+    raise AssertionError("request should not reach the Django app")
+
+
+@override_settings(SEAT_CHANGE_FEED=IN_MEMORY_FEED)
+class SeatEventsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_sample_user()
+        self.show_session = create_sample_show_session()
+        self.application = SeatEventsRouter(not_found_app)
+
+    def get_scope(self, token=None, query_string=b""):
+        headers = []
+        if token:
+            headers.append((b"authorization", f"Bearer {token}".encode()))
+        return {
+            "type": "http",
+            "path": f"/api/planetarium/show-session/{self.show_session.id}/events/",
+            "query_string": query_string,
+            "headers": headers,
+        }
+
+    async def call(self, scope, messages):
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        task = asyncio.ensure_future(self.application(scope, receive, send))
+        return task, disconnect
+
+    @override_settings(SEAT_CHANGE_FEED=None)
+    def test_default_feed_follows_the_database(self):
+        self.assertIsInstance(
+            get_seat_change_feed(),
+            PostgresSeatChangeFeed
+            if connection.vendor == "postgresql"
+            else InMemorySeatChangeFeed,
+        )
+
+    def test_ticket_created_publishes_delta(self):
+        reservation = Reservation.objects.create(user=self.user)
+        with mock.patch.object(get_seat_change_feed(), "dispatch") as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                Ticket.objects.create(
+                    row=2, seat=3, show_session=self.show_session,
+                    reservation=reservation,
+                )
+        dispatch.assert_called_once_with({
+            "show_session": self.show_session.id,
+            "taken": [(2, 3)],
+            "released": [],
+        })
+
+    async def test_stream_requires_authentication(self):
+        messages = []
+        task, _ = await self.call(self.get_scope(), messages)
+        await task
+        self.assertEqual(messages[0]["status"], 401)
+
+    async def test_jwt_in_the_url_is_rejected(self):
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        messages = []
+        task, _ = await self.call(
+            self.get_scope(query_string=f"token={token}".encode()), messages
+        )
+        await task
+        self.assertEqual(messages[0]["status"], 401)
+
+    async def test_stream_ticket_is_single_use(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = await sync_to_async(client.post)(
+            events_ticket_url(self.show_session.id)
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        scope = self.get_scope(
+            query_string=f"ticket={res.data['ticket']}".encode()
+        )
+
+        messages = []
+        task, disconnect = await self.call(scope, messages)
+        while not messages:
+            await asyncio.sleep(0.01)
+        self.assertEqual(messages[0]["status"], 200)
+        disconnect.set()
+        await task
+
+        messages = []
+        task, _ = await self.call(scope, messages)
+        await task
+        self.assertEqual(messages[0]["status"], 401)
+
+    async def test_stream_ticket_is_bound_to_its_session(self):
+        ticket = await sync_to_async(issue_stream_ticket)(
+            self.user.id, self.show_session.id + 1
+        )
+        messages = []
+        task, _ = await self.call(
+            self.get_scope(query_string=f"ticket={ticket}".encode()), messages
+        )
+        await task
+        self.assertEqual(messages[0]["status"], 401)
+
+    async def test_stream_emits_seat_deltas(self):
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        messages = []
+        task, disconnect = await self.call(self.get_scope(token), messages)
+        while len(messages) < 2:
+            await asyncio.sleep(0.01)
+        self.assertEqual(messages[0]["status"], 200)
+
+        get_seat_change_feed().dispatch({
+            "show_session": self.show_session.id,
+            "taken": [[1, 1]],
+            "released": [[4, 2]],
+        })
+        while len(messages) < 3:
+            await asyncio.sleep(0.01)
+        disconnect.set()
+        await task
+
+        event, data = messages[2]["body"].decode().strip().split("\n")
+        self.assertEqual(event, "event: seats")
+        self.assertEqual(
+            json.loads(data.removeprefix("data: ")),
+            {"taken": [[1, 1]], "released": [[4, 2]]},
+        )
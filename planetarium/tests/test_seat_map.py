@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import Reservation, Ticket
+from planetarium.seat_map import encode_row
+from planetarium.tests.helpers import (
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+
+def get_seats_url(show_session_id):
+    return reverse("planetarium:showsession-seats", args=[show_session_id])
+
+
+class EncodeRowTests(TestCase):
+    def test_encode_row(self):
+        self.assertEqual(
+            encode_row(["F", "F", "T", "H", "H", "F"]),
+            [["F", 2], ["T", 1], ["H", 2], ["F", 1]],
+        )
+
+    def test_encode_empty_row(self):
+        self.assertEqual(encode_row([]), [])
+
+
+class ShowSessionSeatsApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        self.show_session = create_sample_show_session(
+            planetarium_dome=create_sample_planetarium_dome(
+                rows=2, seats_in_row=4
+            ),
+        )
+        self.reservation = Reservation.objects.create(user=self.user)
+
+    def test_seats_are_run_length_encoded(self):
+        Ticket.objects.create(
+            row=1, seat=2, show_session=self.show_session,
+            reservation=self.reservation,
+        )
+        res = self.client.get(get_seats_url(self.show_session.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["seats"],
+            [[["F", 1], ["T", 1], ["F", 2]], [["F", 4]]],
+        )
+        self.assertIn("ETag", res)
+
+    def test_conditional_get_returns_not_modified(self):
+        url = get_seats_url(self.show_session.id)
+        etag = self.client.get(url)["ETag"]
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_new_ticket_invalidates_seat_map(self):
+        url = get_seats_url(self.show_session.id)
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                row=2, seat=4, show_session=self.show_session,
+                reservation=self.reservation,
+            )
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["seats"][1], [["F", 3], ["T", 1]])
+
+    def test_unknown_show_session(self):
+        res = self.client.get(get_seats_url(999))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localtime
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.models import Reservation, Ticket
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+SHOW_SESSION_URL = reverse("planetarium:showsession-list")
+
+
+class ShowSessionStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.client.force_authenticate(self.user)
+        astronomy_show = create_sample_astronomy_show()
+        planetarium_dome = create_sample_planetarium_dome(
+            name="Small", rows=1, seats_in_row=1
+        )
+        now = datetime.now(timezone.utc)
+
+        def create_session(show_time):
+            return create_sample_show_session(
+                astronomy_show=astronomy_show,
+                planetarium_dome=planetarium_dome,
+                show_time=show_time,
+            )
+
+        self.past = create_session(now - timedelta(days=1))
+        self.later = create_session(now + timedelta(days=2))
+        self.sooner = create_session(now + timedelta(days=1))
+        Ticket.objects.create(
+            row=1, seat=1, show_session=self.later,
+            reservation=Reservation.objects.create(user=self.user),
+        )
+
+    def get_ids(self, **params):
+        res = self.client.get(SHOW_SESSION_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [show_session["id"] for show_session in res.data["results"]]
+
+    def test_upcoming_by_default_in_chronological_order(self):
+        self.assertEqual(self.get_ids(), [self.sooner.id, self.later.id])
+
+    def test_past(self):
+        self.assertEqual(self.get_ids(status="past"), [self.past.id])
+
+    def test_on_sale(self):
+        self.assertEqual(self.get_ids(status="on_sale"), [self.sooner.id])
+
+    def test_sold_out(self):
+        self.assertEqual(self.get_ids(status="sold_out"), [self.later.id])
+
+    def test_all(self):
+        self.assertEqual(
+            self.get_ids(status="all"),
+            [self.later.id, self.sooner.id, self.past.id],
+        )
+
+    def test_date_filter_includes_past_sessions(self):
+        self.assertEqual(
+            self.get_ids(date=f"{localtime(self.past.show_time):%Y-%m-%d}"),
+            [self.past.id],
+        )
+
+    def test_invalid_status(self):
+        res = self.client.get(SHOW_SESSION_URL, {"status": "soon"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_filters(self):
+        for name, value in (("date", "xx"), ("astronomy_show", "1,2")):
+            res = self.client.get(SHOW_SESSION_URL, {name: value})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, res.data)
+
+    def test_retrieve_past_session(self):
+        res = self.client.get(
+            reverse("planetarium:showsession-detail", args=[self.past.id])
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium_api_service.throttling import SlidingWindowRateThrottle
+
+SHOW_THEME_URL = reverse("planetarium:showtheme-list")
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+@mock.patch.object(
+    SlidingWindowRateThrottle,
+    "THROTTLE_RATES",
+    {"user": "3/min", "catalog": "2/min", "reservation_write": "1/min"},
+)
+class SlidingWindowRateThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_rate_limit_headers(self):
+        res = self.client.get(SHOW_THEME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["RateLimit-Limit"], "2")
+        self.assertEqual(res["RateLimit-Remaining"], "1")
+        self.assertIn("RateLimit-Reset", res)
+
+    def test_requests_over_limit_are_throttled(self):
+        with mock.patch.object(SlidingWindowRateThrottle, "timer", return_value=30.0):
+            for _ in range(2):
+                self.client.get(SHOW_THEME_URL)
+            res = self.client.get(SHOW_THEME_URL)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["RateLimit-Remaining"], "0")
+        self.assertIn("Retry-After", res)
+
+    def test_previous_window_is_weighted(self):
+        with mock.patch.object(SlidingWindowRateThrottle, "timer", return_value=50.0):
+            for _ in range(2):
+                self.client.get(SHOW_THEME_URL)
+        # 30s into the next window half of the previous requests still count
+        with mock.patch.object(SlidingWindowRateThrottle, "timer", return_value=90.0):
+            allowed = self.client.get(SHOW_THEME_URL)
+            throttled = self.client.get(SHOW_THEME_URL)
+        self.assertEqual(allowed.status_code, status.HTTP_200_OK)
+        self.assertEqual(throttled.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_scopes_per_action(self):
+        self.client.post(RESERVATION_URL, {}, format="json")
+        res = self.client.post(RESERVATION_URL, {}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = self.client.get(RESERVATION_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["RateLimit-Limit"], "3")
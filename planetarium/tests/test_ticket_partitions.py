@@ -0,0 +1,148 @@
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import skipIf, skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from planetarium.models import Reservation, ShowSession, Ticket
+from planetarium.partitions import (
+    add_months,
+    detach_ticket_partitions,
+    ensure_ticket_partitions,
+    month_start,
+    partition_name,
+    ticket_partitions,
+)
+from planetarium.tests.helpers import (
+    create_sample_astronomy_show,
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+
+HISTORY_URL = reverse("planetarium:reservation-history")
+
+
+class PartitionHelperTests(TestCase):
+    def test_month_start(self):
+        self.assertEqual(
+            month_start(datetime(2024, 3, 17, 22, 5, tzinfo=timezone.utc)),
+            datetime(2024, 3, 1, tzinfo=timezone.utc),
+        )
+
+    def test_add_months(self):
+        month = datetime(2024, 11, 1, tzinfo=timezone.utc)
+        self.assertEqual(
+            add_months(month, 3), datetime(2025, 2, 1, tzinfo=timezone.utc)
+        )
+        self.assertEqual(
+            add_months(month, -11), datetime(2023, 12, 1, tzinfo=timezone.utc)
+        )
+
+    def test_partition_name(self):
+        self.assertEqual(
+            partition_name(datetime(2024, 3, 1, tzinfo=timezone.utc)),
+            "planetarium_ticket_p202403",
+        )
+
+    @skipIf(connection.vendor == "postgresql", "tickets are partitioned")
+    def test_command_needs_partitioned_table(self):
+        with self.assertRaises(CommandError):
+            call_command("manage_ticket_partitions")
+
+
+@skipUnless(connection.vendor == "postgresql", "partitions need PostgreSQL")
+class TicketPartitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_root.cleanup)
+        settings_override = override_settings(ARCHIVE_ROOT=archive_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = create_sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.current = month_start(datetime.now(timezone.utc))
+        self.old_session = create_sample_show_session(
+            planetarium_dome=create_sample_planetarium_dome(
+                rows=10, seats_in_row=10
+            ),
+            show_time=add_months(self.current, -14) + timedelta(days=2),
+        )
+        self.reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            row=1, seat=1, show_session=self.old_session,
+            reservation=self.reservation,
+        )
+
+    def test_create_partitions(self):
+        call_command(
+            "manage_ticket_partitions", "--months-ahead", "2",
+            stdout=StringIO(),
+        )
+
+        months = [month for _, month in ticket_partitions()]
+        self.assertEqual(months[0], add_months(self.current, -14))
+        self.assertEqual(months[-1], add_months(self.current, 2))
+        self.assertEqual(
+            Ticket.objects.get().show_time, self.old_session.show_time
+        )
+
+    def test_detach_archives_sessions_first(self):
+        ensure_ticket_partitions(0)
+
+        detached = detach_ticket_partitions(12)
+
+        self.assertIn(
+            partition_name(add_months(self.current, -14)), detached
+        )
+        self.assertNotIn(
+            add_months(self.current, -14),
+            [month for _, month in ticket_partitions()],
+        )
+        self.assertFalse(ShowSession.objects.filter(id=self.old_session.id))
+        res = self.client.get(HISTORY_URL)
+        self.assertEqual(
+            [record["reservation"] for record in res.data["results"]],
+            [self.reservation.id],
+        )
+
+
+class TicketShowTimeTests(TestCase):
+    def setUp(self):
+        user = create_sample_user()
+        astronomy_show = create_sample_astronomy_show()
+        planetarium_dome = create_sample_planetarium_dome()
+        self.show_session = create_sample_show_session(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=datetime(2024, 3, 1, 18, tzinfo=timezone.utc),
+        )
+        self.ticket = Ticket.objects.create(
+            row=1,
+            seat=1,
+            show_session=self.show_session,
+            reservation=Reservation.objects.create(user=user),
+        )
+
+    def test_ticket_copies_show_time(self):
+        self.assertEqual(self.ticket.show_time, self.show_session.show_time)
+
+    def test_rescheduling_session_moves_tickets(self):
+        self.show_session.show_time = datetime(
+            2024, 4, 2, 18, tzinfo=timezone.utc
+        )
+        self.show_session.save()
+
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.show_time, self.show_session.show_time)
+        self.assertEqual(list(self.show_session.active_tickets), [self.ticket])
@@ -0,0 +1,265 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from planetarium.cancellation import cancel_tickets
+from planetarium.models import Reservation, SeatHold, Ticket, WaitlistEntry
+from planetarium.tests.helpers import (
+    create_sample_planetarium_dome,
+    create_sample_show_session,
+    create_sample_user,
+)
+from planetarium.waitlist import process_waitlist
+
+RESERVATION_URL = reverse("planetarium:reservation-list")
+
+
+def waitlist_url(show_session_id):
+    return reverse("planetarium:showsession-waitlist", args=[show_session_id])
+
+
+def claim_url(show_session_id):
+    return reverse(
+        "planetarium:showsession-claim-waitlist", args=[show_session_id]
+    )
+
+
+def seats_url(show_session_id):
+    return reverse("planetarium:showsession-seats", args=[show_session_id])
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_sample_user()
+        self.other = create_sample_user("other@test.com")
+        self.buyer = create_sample_user("buyer@test.com")
+        self.client.force_authenticate(self.user)
+        self.show_session = create_sample_show_session(
+            planetarium_dome=create_sample_planetarium_dome(
+                name="Small", rows=1, seats_in_row=3
+            ),
+            show_time=datetime.now(timezone.utc) + timedelta(days=1),
+        )
+        reservation = Reservation.objects.create(user=self.buyer)
+        self.tickets = [
+            Ticket.objects.create(
+                row=1, seat=seat, show_session=self.show_session,
+                reservation=reservation,
+            )
+            for seat in (1, 2, 3)
+        ]
+
+    def join(self, user, seats):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            waitlist_url(self.show_session.id), {"seats": seats}
+        )
+
+    def release(self, *seats):
+        cancel_tickets(
+            Ticket.objects.filter(
+                show_session=self.show_session, seat__in=seats
+            )
+        )
+
+    def test_join_sold_out_session(self):
+        res = self.join(self.user, 2)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["status"], WaitlistEntry.WAITING)
+        self.assertEqual(res.data["position"], 1)
+        self.assertEqual(self.join(self.other, 1).data["position"], 2)
+
+        res = self.join(self.user, 1)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_joins(self):
+        self.join(self.user, 1)
+
+        # the second join passed its check before the first one committed
+        with mock.patch.object(QuerySet, "exists", return_value=False):
+            res = self.join(self.user, 1)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(WaitlistEntry.objects.count(), 1)
+
+    def test_join_requires_a_sold_out_session(self):
+        self.release(1)
+
+        res = self.join(self.user, 1)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_freed_seats_are_offered_in_order(self):
+        self.join(self.user, 2)
+        self.join(self.other, 1)
+        self.release(3)
+
+        # the first party does not fit, the second may not jump ahead
+        self.assertEqual(process_waitlist(), (0, 0, 0))
+
+        self.release(2)
+        self.assertEqual(process_waitlist(), (0, 1, 1))
+
+        entry = WaitlistEntry.objects.get(user=self.user)
+        self.assertEqual(entry.status, WaitlistEntry.OFFERED)
+        self.assertEqual(
+            sorted(entry.holds.values_list("row", "seat")), [(1, 2), (1, 3)]
+        )
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["test@test.com"])
+        self.assertEqual(process_waitlist(), (0, 0, 0))
+
+    def test_held_seats_cannot_be_booked(self):
+        self.join(self.user, 1)
+        self.release(2)
+        process_waitlist()
+
+        res = self.client.get(seats_url(self.show_session.id))
+        self.assertEqual(res.data["seats"], [[["T", 1], ["H", 1], ["T", 1]]])
+
+        self.client.force_authenticate(self.other)
+        res = self.client.post(RESERVATION_URL, {
+            "tickets": [
+                {"row": 1, "seat": 2, "show_session": self.show_session.id},
+            ]
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_claim_offer(self):
+        self.join(self.user, 1)
+        self.release(2)
+        process_waitlist()
+
+        res = self.client.post(claim_url(self.show_session.id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [
+                (ticket["row"], ticket["seat"])
+                for ticket in res.data["tickets"]
+            ],
+            [(1, 2)],
+        )
+        entry = WaitlistEntry.objects.get(user=self.user)
+        self.assertEqual(entry.status, WaitlistEntry.CLAIMED)
+        self.assertEqual(entry.reservation_id, res.data["id"])
+        self.assertFalse(SeatHold.objects.exists())
+
+        res = self.client.post(claim_url(self.show_session.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_claim_without_held_seats(self):
+        self.join(self.user, 1)
+        self.release(2)
+        process_waitlist()
+        reservations = Reservation.objects.count()
+
+        SeatHold.objects.update(
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+        )
+        res = self.client.post(claim_url(self.show_session.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        SeatHold.objects.all().delete()
+        res = self.client.post(claim_url(self.show_session.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(Reservation.objects.count(), reservations)
+        self.assertEqual(
+            WaitlistEntry.objects.get(user=self.user).status,
+            WaitlistEntry.OFFERED,
+        )
+
+    def test_expired_offer_goes_to_next_entry(self):
+        self.join(self.user, 1)
+        self.join(self.other, 1)
+        self.release(2)
+        process_waitlist()
+        WaitlistEntry.objects.filter(user=self.user).update(
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+        )
+
+        self.client.force_authenticate(self.user)
+        res = self.client.post(claim_url(self.show_session.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(process_waitlist(), (1, 1, 1))
+        self.assertEqual(
+            WaitlistEntry.objects.get(user=self.user).status,
+            WaitlistEntry.EXPIRED,
+        )
+        self.assertEqual(
+            SeatHold.objects.get().waitlist_entry.user, self.other
+        )
+
+    def test_leave_releases_held_seats(self):
+        self.join(self.user, 1)
+        self.release(2)
+        process_waitlist()
+
+        res = self.client.delete(waitlist_url(self.show_session.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["status"], WaitlistEntry.LEFT)
+        self.assertFalse(SeatHold.objects.exists())
+        res = self.client.get(waitlist_url(self.show_session.id))
+        self.assertEqual(res.data["status"], WaitlistEntry.LEFT)
+
+    def test_process_waitlist_command(self):
+        self.join(self.user, 1)
+        self.release(2)
+        out = StringIO()
+
+        call_command("process_waitlist", "--once", stdout=out)
+
+        self.assertIn("1 made, 1 notified", out.getvalue())
+
+    def test_failed_notification_keeps_the_offer(self):
+        self.join(self.user, 1)
+        self.release(2)
+
+        with mock.patch(
+            "planetarium.waitlist.send_mass_mail", side_effect=SMTPException
+        ):
+            with self.assertRaises(SMTPException):
+                process_waitlist()
+
+        entry = WaitlistEntry.objects.get(user=self.user)
+        self.assertEqual(entry.status, WaitlistEntry.OFFERED)
+        self.assertIsNone(entry.notified_at)
+        self.assertEqual(entry.holds.count(), 1)
+
+        self.assertEqual(process_waitlist(), (0, 0, 1))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_worker_survives_a_failed_pass(self):
+        out = StringIO()
+
+        with mock.patch(
+            "planetarium.management.commands.process_waitlist."
+            "process_waitlist",
+            side_effect=[DatabaseError, (0, 1, 1)],
+        ), mock.patch(
+            "time.sleep", side_effect=[None, KeyboardInterrupt]
+        ), self.assertLogs(
+            "planetarium.management.commands.process_waitlist", "ERROR"
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("process_waitlist", stdout=out)
+
+        self.assertIn("1 made, 1 notified", out.getvalue())
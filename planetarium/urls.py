@@ -6,7 +6,9 @@ from planetarium.views import (
     ShowThemeViewSet,
     PlanetariumDomeViewSet,
     ShowSessionViewSet,
-    ReservationViewSet
+    ReservationViewSet,
+    SalesAnalyticsViewSet,
+    OccupancyAnalyticsViewSet,
 )
 
 router = routers.DefaultRouter()
@@ -16,6 +18,14 @@ router.register("show-theme", ShowThemeViewSet)
 router.register("planetarium-dome", PlanetariumDomeViewSet)
 router.register("show-session", ShowSessionViewSet)
 router.register("reservation", ReservationViewSet)
+router.register(
+    "analytics/sales", SalesAnalyticsViewSet, basename="sales-analytics"
+)
+router.register(
+    "analytics/occupancy",
+    OccupancyAnalyticsViewSet,
+    basename="occupancy-analytics",
+)
 
 
 urlpatterns = [path("", include(router.urls))]
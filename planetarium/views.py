@@ -1,20 +1,33 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
-from django.db.models import F, Count
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import viewsets, mixins
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from planetarium.allocation import NoSeatsAvailable, reserve_best_available
+from planetarium.archive import archived_reservations
+from planetarium.cancellation import (
+    cancel_reservation,
+    cancel_show_session_reservations,
+)
+from planetarium.check_in import check_in_tickets
+from planetarium.fieldsets import FIELDSET_PARAMETERS, SparseFieldsetMixin
+from planetarium.idempotency import IdempotentCreateMixin
 from planetarium.models import (
     AstronomyShow,
     ShowTheme,
     PlanetariumDome,
     ShowSession,
-    Reservation
+    Reservation,
+    WaitlistEntry,
 )
 from planetarium.permissions import IsAdminOrIfAuthenticatedReadOnly
 from planetarium.serializers import (
@@ -28,11 +41,44 @@ from planetarium.serializers import (
     ShowSessionListSerializer,
     ShowSessionDetailSerializer,
     ReservationListSerializer,
-    AstronomyShowImageSerializer
+    AstronomyShowImageSerializer,
+    BestAvailableSerializer,
+    CheckInSerializer,
+    WaitlistEntrySerializer,
+    WaitlistJoinSerializer,
+)
+from planetarium.occupancy import get_occupancy_report
+from planetarium.sales import SALES_REPORT_GROUPS, sales_report
+from planetarium.schedule import get_calendar
+from planetarium.seat_map import get_seat_map
+from planetarium.sse import issue_stream_ticket
+from planetarium.streaming import StreamingListMixin
+from planetarium.waitlist import (
+    WaitlistError,
+    claim_offer,
+    join_waitlist,
+    leave_waitlist,
 )
 
+SHOW_SESSION_STATUSES = ("upcoming", "on_sale", "sold_out", "past", "all")
+
+
+def _params_to_date(name, value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValidationError({name: "Date must be in YYYY-MM-DD format."})
+
+
+def _params_to_id(name, value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer id."})
+
 
 class ShowThemeViewSet(
+    SparseFieldsetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -40,17 +86,20 @@ class ShowThemeViewSet(
     queryset = ShowTheme.objects.all()
     serializer_class = ShowThemeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
 
 
 class AstronomyShowViewSet(
+    SparseFieldsetMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = AstronomyShow.objects.prefetch_related("show_theme")
+    queryset = AstronomyShow.objects.all()
     serializer_class = AstronomyShowSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
 
     @staticmethod
     def _params_to_ints(qs):
@@ -112,6 +161,7 @@ class AstronomyShowViewSet(
                 type=OpenApiTypes.STR,
                 description="Filter by movie title (ex. ?title=stars)",
             ),
+            *FIELDSET_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -119,6 +169,7 @@ class AstronomyShowViewSet(
 
 
 class PlanetariumDomeViewSet(
+    SparseFieldsetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -126,21 +177,20 @@ class PlanetariumDomeViewSet(
     queryset = PlanetariumDome.objects.all()
     serializer_class = PlanetariumDomeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
 
 
-class ShowSessionViewSet(viewsets.ModelViewSet):
-    queryset = (
-        ShowSession.objects.all()
-        .select_related("astronomy_show", "planetarium_dome")
-        .annotate(
-            tickets_available=(
-                    F("planetarium_dome__rows") * F("planetarium_dome__seats_in_row")
-                    - Count("tickets")
-            )
-        )
-    )
+class ShowSessionViewSet(
+    SparseFieldsetMixin, StreamingListMixin, viewsets.ModelViewSet
+):
+    queryset = ShowSession.objects.with_tickets_available()
     serializer_class = ShowSessionSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+    throttle_scopes = {
+        "waitlist": "reservation_write",
+        "claim_waitlist": "reservation_write",
+    }
 
     def get_queryset(self):
         date = self.request.query_params.get("date")
@@ -149,16 +199,49 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
         queryset = self.queryset
 
         if date:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(show_time__date=date)
+            date = _params_to_date("date", date)
+            # a range on show_time, unlike __date, can use its index
+            day_start = timezone.make_aware(datetime.combine(date, time.min))
+            queryset = queryset.filter(
+                show_time__gte=day_start,
+                show_time__lt=day_start + timedelta(days=1),
+            )
 
         if astronomy_show_id_str:
-            queryset = queryset.filter(astronomy_show_id=int(astronomy_show_id_str))
+            queryset = queryset.filter(
+                astronomy_show_id=_params_to_id(
+                    "astronomy_show", astronomy_show_id_str
+                )
+            )
+
+        if self.action in ("list", "stream"):
+            session_status = self.request.query_params.get(
+                "status", "all" if date else "upcoming"
+            )
+            if session_status not in SHOW_SESSION_STATUSES:
+                raise ValidationError(
+                    {
+                        "status": "Must be one of: "
+                        + ", ".join(SHOW_SESSION_STATUSES)
+                    }
+                )
+
+            now = timezone.now()
+            if session_status == "past":
+                queryset = queryset.filter(show_time__lt=now)
+            elif session_status != "all":
+                queryset = queryset.filter(show_time__gte=now).order_by(
+                    "show_time", "id"
+                )
+                if session_status == "on_sale":
+                    queryset = queryset.filter(tickets_available__gt=0)
+                elif session_status == "sold_out":
+                    queryset = queryset.filter(tickets_available__lte=0)
 
         return queryset
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "stream"):
             return ShowSessionListSerializer
 
         if self.action == "retrieve":
@@ -166,6 +249,191 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
 
         return ShowSessionSerializer
 
+    @action(methods=["GET"], detail=True, url_path="seats")
+    def seats(self, request, pk=None):
+        """run-length encoded seat state with conditional GET support"""
+        seat_map, etag = get_seat_map(pk)
+        response = Response(seat_map, headers={
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={settings.SEAT_MAP_CACHE_TIMEOUT}",
+        })
+        return get_conditional_response(request, etag=etag, response=response)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATE,
+                required=True,
+                description="First day of the calendar (ex. ?from=2024-05-01)",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATE,
+                required=True,
+                description="Last day of the calendar (ex. ?to=2024-05-31)",
+            ),
+            OpenApiParameter(
+                "astronomy_show",
+                type=OpenApiTypes.INT,
+                description="Filter by astronomy_show id (ex. ?astronomy_show=2)",
+            ),
+            OpenApiParameter(
+                "show_theme",
+                type=OpenApiTypes.INT,
+                description="Filter by show_theme id (ex. ?show_theme=3)",
+            ),
+            OpenApiParameter(
+                "planetarium_dome",
+                type=OpenApiTypes.INT,
+                description="Filter by planetarium_dome id (ex. ?planetarium_dome=1)",
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=["GET"], detail=False, url_path="calendar")
+    def calendar(self, request):
+        """sessions and tickets available per day of a date range"""
+        date_from = _params_to_date("from", request.query_params.get("from", ""))
+        date_to = _params_to_date("to", request.query_params.get("to", ""))
+        if date_to < date_from:
+            raise ValidationError({"to": "Must not be before from."})
+        if (date_to - date_from).days >= settings.CALENDAR_MAX_DAYS:
+            raise ValidationError(
+                {"to": f"At most {settings.CALENDAR_MAX_DAYS} days at once."}
+            )
+
+        filters = {}
+        astronomy_show = request.query_params.get("astronomy_show")
+        show_theme = request.query_params.get("show_theme")
+        planetarium_dome = request.query_params.get("planetarium_dome")
+        if astronomy_show:
+            filters["astronomy_show_id"] = _params_to_id(
+                "astronomy_show", astronomy_show
+            )
+        if show_theme:
+            filters["astronomy_show__show_theme"] = _params_to_id(
+                "show_theme", show_theme
+            )
+        if planetarium_dome:
+            filters["planetarium_dome_id"] = _params_to_id(
+                "planetarium_dome", planetarium_dome
+            )
+
+        return Response({
+            "from": date_from,
+            "to": date_to,
+            "days": get_calendar(date_from, date_to, filters),
+        })
+
+    @action(methods=["POST"], detail=True, url_path="cancel")
+    def cancel(self, request, pk=None):
+        """cancel every reservation of a show session that was called off"""
+        show_session = self.get_object()
+        released = cancel_show_session_reservations(show_session)
+        return Response({"released_seats": released})
+
+    @extend_schema(request=CheckInSerializer, responses=OpenApiTypes.OBJECT)
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="check-in",
+        permission_classes=[IsAdminUser],
+    )
+    def check_in(self, request, pk=None):
+        """sync door scans, one result per scan in the order sent"""
+        show_session = self.get_object()
+        serializer = CheckInSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = check_in_tickets(
+            show_session,
+            [
+                (scan["token"], scan["scanned_at"])
+                for scan in serializer.validated_data["scans"]
+            ],
+        )
+        return Response({"results": results})
+
+    @extend_schema(request=None, responses=OpenApiTypes.OBJECT)
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="events/ticket",
+        permission_classes=[IsAuthenticated],
+    )
+    def events_ticket(self, request, pk=None):
+        """single-use ticket for the seat events stream, passed as ?ticket="""
+        show_session = self.get_object()
+        return Response({
+            "ticket": issue_stream_ticket(request.user.pk, show_session.id),
+            "expires_in": settings.SEAT_EVENTS_TICKET_TIMEOUT,
+        })
+
+    @extend_schema(
+        methods=["GET", "DELETE"],
+        request=None,
+        responses=WaitlistEntrySerializer,
+    )
+    @extend_schema(
+        methods=["POST"],
+        request=WaitlistJoinSerializer,
+        responses=WaitlistEntrySerializer,
+    )
+    @action(
+        methods=["GET", "POST", "DELETE"],
+        detail=True,
+        url_path="waitlist",
+        permission_classes=[IsAuthenticated],
+    )
+    def waitlist(self, request, pk=None):
+        """join, look up or leave the waitlist of a sold-out session"""
+        show_session = self.get_object()
+        try:
+            if request.method == "POST":
+                serializer = WaitlistJoinSerializer(data=request.data)
+                serializer.is_valid(raise_exception=True)
+                entry = join_waitlist(
+                    request.user.pk,
+                    show_session,
+                    serializer.validated_data["seats"],
+                )
+                return Response(
+                    WaitlistEntrySerializer(entry).data,
+                    status=status.HTTP_201_CREATED,
+                )
+            if request.method == "DELETE":
+                entry = leave_waitlist(show_session, request.user.pk)
+                return Response(WaitlistEntrySerializer(entry).data)
+        except WaitlistError as error:
+            raise ValidationError({"detail": str(error)})
+
+        entry = WaitlistEntry.objects.filter(
+            show_session=show_session, user_id=request.user.pk
+        ).last()
+        if entry is None:
+            raise NotFound("You are not on the waitlist.")
+        return Response(WaitlistEntrySerializer(entry).data)
+
+    @extend_schema(request=None, responses=ReservationListSerializer)
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="waitlist/claim",
+        permission_classes=[IsAuthenticated],
+    )
+    def claim_waitlist(self, request, pk=None):
+        """reserve the seats held for the user's waitlist offer"""
+        show_session = self.get_object()
+        try:
+            reservation = claim_offer(show_session, request.user.pk)
+        except WaitlistError as error:
+            raise ValidationError({"detail": str(error)})
+
+        serializer = ReservationListSerializer(
+            reservation, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -181,6 +449,17 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
                         "(ex. ?date=2022-10-23)"
                 ),
             ),
+            OpenApiParameter(
+                "status",
+                type=OpenApiTypes.STR,
+                enum=SHOW_SESSION_STATUSES,
+                description=(
+                        "Filter by session status, upcoming sessions come "
+                        "in chronological order. Defaults to upcoming, or "
+                        "to all when filtering by date (ex. ?status=on_sale)"
+                ),
+            ),
+            *FIELDSET_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -188,25 +467,193 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
 
 
 class ReservationViewSet(
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    IdempotentCreateMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
 ):
-    queryset = Reservation.objects.prefetch_related(
-        "tickets__show_session__astronomy_show",
-        "tickets__show_session__planetarium_dome",
-    )
+    queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
     permission_classes = (IsAuthenticated,)
+    # reservations nest their tickets, keep pages small
+    max_page_size = 50
+    throttle_scopes = {
+        "create": "reservation_write",
+        "cancel": "reservation_write",
+        "best_available": "reservation_write",
+    }
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user)
+        if self.action == "stream":
+            return Reservation.objects.all()
+
+        return Reservation.objects.filter(user_id=self.request.user.pk)
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "stream"):
             return ReservationListSerializer
 
+        if self.action == "best_available":
+            return BestAvailableSerializer
+
         return ReservationSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.pk)
+
+    @action(methods=["POST"], detail=True, url_path="cancel")
+    def cancel(self, request, pk=None):
+        """cancel reservation and release all of its seats"""
+        reservation = self.get_object()
+        if reservation.cancelled_at is not None:
+            raise ValidationError(
+                {"detail": "Reservation is already cancelled."}
+            )
+
+        cancel_reservation(reservation)
+        reservation.refresh_from_db()
+        serializer = ReservationListSerializer(
+            reservation, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(methods=["GET"], detail=False, url_path="history")
+    def history(self, request):
+        """reservations for shows that were moved to the archive"""
+        records = archived_reservations(request.user.pk)
+        page = self.paginate_queryset(records)
+        if page is not None:
+            return self.get_paginated_response(page)
+
+        return Response(records)
+
+    @extend_schema(responses=ReservationListSerializer)
+    @action(methods=["POST"], detail=False, url_path="best-available")
+    def best_available(self, request):
+        """reserve the best block of `count` adjacent seats of a session"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservation = reserve_best_available(
+                request.user.pk,
+                serializer.validated_data["show_session"].id,
+                serializer.validated_data["count"],
+            )
+        except NoSeatsAvailable as error:
+            raise ValidationError({"count": [str(error)]})
+
+        serializer = ReservationListSerializer(
+            reservation, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class SalesAnalyticsViewSet(GenericViewSet):
+    """ticket sales reports read from the hourly sales rollup"""
+
+    permission_classes = (IsAdminUser,)
+    pagination_class = None
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "group_by",
+                type=OpenApiTypes.STR,
+                enum=list(SALES_REPORT_GROUPS),
+                description="Group sales by (ex. ?group_by=dome)",
+            ),
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATE,
+                description="Sales from this day (ex. ?from=2024-05-01)",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATE,
+                description="Sales up to this day (ex. ?to=2024-05-31)",
+            ),
+            OpenApiParameter(
+                "astronomy_show",
+                type=OpenApiTypes.INT,
+                description="Filter by astronomy_show id (ex. ?astronomy_show=2)",
+            ),
+            OpenApiParameter(
+                "planetarium_dome",
+                type=OpenApiTypes.INT,
+                description="Filter by planetarium_dome id (ex. ?planetarium_dome=1)",
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def list(self, request, *args, **kwargs):
+        group_by = request.query_params.get("group_by", "show")
+        if group_by not in SALES_REPORT_GROUPS:
+            raise ValidationError(
+                {"group_by": f"Must be one of: {', '.join(SALES_REPORT_GROUPS)}."}
+            )
+
+        filters = {}
+        date_from = request.query_params.get("from")
+        date_to = request.query_params.get("to")
+        astronomy_show = request.query_params.get("astronomy_show")
+        planetarium_dome = request.query_params.get("planetarium_dome")
+
+        if date_from:
+            filters["hour__date__gte"] = _params_to_date("from", date_from)
+        if date_to:
+            filters["hour__date__lte"] = _params_to_date("to", date_to)
+        if astronomy_show:
+            filters["astronomy_show_id"] = _params_to_id(
+                "astronomy_show", astronomy_show
+            )
+        if planetarium_dome:
+            filters["planetarium_dome_id"] = _params_to_id(
+                "planetarium_dome", planetarium_dome
+            )
+
+        return Response(sales_report(group_by, filters))
+
+
+class OccupancyAnalyticsViewSet(GenericViewSet):
+    """seat heatmaps and fill curves of a dome or show"""
+
+    permission_classes = (IsAdminUser,)
+    pagination_class = None
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "planetarium_dome",
+                type=OpenApiTypes.INT,
+                description="Sessions in planetarium_dome (ex. ?planetarium_dome=1)",
+            ),
+            OpenApiParameter(
+                "astronomy_show",
+                type=OpenApiTypes.INT,
+                description="Sessions of astronomy_show (ex. ?astronomy_show=2)",
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def list(self, request, *args, **kwargs):
+        filters = {}
+        planetarium_dome = request.query_params.get("planetarium_dome")
+        astronomy_show = request.query_params.get("astronomy_show")
+
+        if planetarium_dome:
+            filters["planetarium_dome_id"] = _params_to_id(
+                "planetarium_dome", planetarium_dome
+            )
+        if astronomy_show:
+            filters["astronomy_show_id"] = _params_to_id(
+                "astronomy_show", astronomy_show
+            )
+        if not filters:
+            raise ValidationError(
+                {"detail": "Filter by planetarium_dome or astronomy_show."}
+            )
+
+        return Response(get_occupancy_report(filters))
@@ -0,0 +1,305 @@
+"""Waitlist of sold-out show sessions.
+
+Users join the waitlist of a session for a number of seats. A worker
+(`manage.py process_waitlist`) turns freed seats into offers: waiting
+entries are taken in FIFO order and the best block of free seats is
+held for each of them for WAITLIST_OFFER_TIMEOUT seconds. Offered users
+are notified in batches and claim their held seats as a reservation;
+offers that are not claimed in time expire and the seats go to the next
+entry.
+
+Entries and sessions are picked with SELECT ... FOR UPDATE SKIP LOCKED,
+so several workers share the queue without waiting on each other, or on
+the bookers of a session.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from planetarium.allocation import find_best_block, seat_scores
+from planetarium.booking import create_reservation, lock_show_sessions
+from planetarium.models import SeatHold, ShowSession, WaitlistEntry
+from planetarium.seat_map import invalidate_seat_map
+
+_notifiers = {}
+
+
+class WaitlistError(Exception):
+    pass
+
+
+def get_waitlist_notifier():
+    """return the process-wide notifier configured by WAITLIST_NOTIFIER"""
+    path = settings.WAITLIST_NOTIFIER
+    if path not in _notifiers:
+        _notifiers[path] = import_string(path)()
+    return _notifiers[path]
+
+
+class EmailWaitlistNotifier:
+    """Emails offered users, one SMTP connection per batch."""
+
+    subject = "Seats are waiting for you"
+
+    def notify(self, entries):
+        send_mass_mail(
+            [
+                (
+                    self.subject,
+                    f"{entry.seats} seat(s) of {entry.show_session} are "
+                    f"held for you until {entry.expires_at:%Y-%m-%d %H:%M} "
+                    f"UTC. Claim them before they go to the next in line.",
+                    None,
+                    [entry.user.email],
+                )
+                for entry in entries
+            ],
+            fail_silently=False,
+        )
+
+
+def free_seats(show_session):
+    """bool grid of seats with neither an active ticket nor a hold
+
+    Holds of expired offers count until expire_offers deletes them.
+    """
+    return show_session.planetarium_dome.seat_layout.free_seats(
+        [
+            *show_session.active_tickets.values_list("row", "seat"),
+            *show_session.seat_holds.values_list("row", "seat"),
+        ]
+    )
+
+
+def join_waitlist(user_id, show_session, seats):
+    """add the user to the waitlist of a session with too few free seats"""
+    if show_session.show_time <= timezone.now():
+        raise WaitlistError("The show session has already started.")
+    if WaitlistEntry.objects.filter(
+        show_session=show_session,
+        user_id=user_id,
+        status__in=[WaitlistEntry.WAITING, WaitlistEntry.OFFERED],
+    ).exists():
+        raise WaitlistError("You are already on the waitlist.")
+    if free_seats(show_session).sum() >= seats:
+        raise WaitlistError("Seats are available, book them instead.")
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(
+                show_session=show_session, user_id=user_id, seats=seats
+            )
+    except IntegrityError:
+        # a concurrent join of the same user won the unique constraint
+        raise WaitlistError("You are already on the waitlist.")
+
+
+def open_entry(show_session, user_id):
+    """the waiting or offered entry of the user, locked, or None"""
+    return (
+        WaitlistEntry.objects.select_for_update()
+        .filter(
+            show_session=show_session,
+            user_id=user_id,
+            status__in=[WaitlistEntry.WAITING, WaitlistEntry.OFFERED],
+        )
+        .first()
+    )
+
+
+def leave_waitlist(show_session, user_id):
+    """take the user off the waitlist, releasing any held seats"""
+    with transaction.atomic():
+        entry = open_entry(show_session, user_id)
+        if entry is None:
+            raise WaitlistError("You are not on the waitlist.")
+        entry.status = WaitlistEntry.LEFT
+        entry.save(update_fields=["status"])
+        released, _ = entry.holds.all().delete()
+        if released:
+            transaction.on_commit(lambda: invalidate_seat_map(show_session.id))
+    return entry
+
+
+def claim_offer(show_session, user_id):
+    """turn the seats held for the user into a reservation"""
+    with transaction.atomic():
+        show_session = lock_show_sessions([show_session.id])[show_session.id]
+        entry = open_entry(show_session, user_id)
+        if entry is None or entry.status != WaitlistEntry.OFFERED:
+            raise WaitlistError("You have no offer for this show session.")
+        if entry.expires_at <= timezone.now():
+            raise WaitlistError("The offer has expired.")
+
+        seats = list(
+            entry.holds.filter(expires_at__gt=timezone.now()).values_list(
+                "row", "seat"
+            )
+        )
+        if len(seats) != entry.seats:
+            raise WaitlistError("The held seats have been released.")
+        entry.holds.all().delete()
+        reservation = create_reservation(
+            user_id, [(show_session, row, seat) for row, seat in seats]
+        )
+        entry.status = WaitlistEntry.CLAIMED
+        entry.reservation = reservation
+        entry.save(update_fields=["status", "reservation"])
+    return reservation
+
+
+def expire_offers(now=None):
+    """expire unclaimed offers and release their seats"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        entries = list(
+            WaitlistEntry.objects.select_for_update(skip_locked=True)
+            .filter(status=WaitlistEntry.OFFERED, expires_at__lte=now)
+            .values_list("id", "show_session_id")
+        )
+        if not entries:
+            return 0
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        SeatHold.objects.filter(waitlist_entry_id__in=entry_ids).delete()
+        WaitlistEntry.objects.filter(id__in=entry_ids).update(
+            status=WaitlistEntry.EXPIRED
+        )
+        for show_session_id in {session_id for _, session_id in entries}:
+            transaction.on_commit(
+                lambda show_session_id=show_session_id: invalidate_seat_map(
+                    show_session_id
+                )
+            )
+    return len(entries)
+
+
+def offer_session_seats(show_session_id, batch_size, now):
+    """hold seats for the waiting entries of one session, in FIFO order
+
+    The session is skipped when another worker or a booker holds its
+    lock, it is picked up again on the next pass. An entry whose party
+    does not fit stops the session, later entries do not jump the queue.
+    """
+    with transaction.atomic():
+        show_session = (
+            ShowSession.objects.select_for_update(
+                skip_locked=True, of=("self",)
+            )
+            .select_related("planetarium_dome")
+            .filter(id=show_session_id)
+            .first()
+        )
+        if show_session is None:
+            return 0
+
+        entries = list(
+            WaitlistEntry.objects.select_for_update(skip_locked=True)
+            .filter(show_session=show_session, status=WaitlistEntry.WAITING)
+            .order_by("id")[:batch_size]
+        )
+        if not entries:
+            return 0
+
+        free = free_seats(show_session)
+        planetarium_dome = show_session.planetarium_dome
+        scores = seat_scores(
+            planetarium_dome.rows, planetarium_dome.seats_in_row
+        )
+        expires_at = now + timedelta(seconds=settings.WAITLIST_OFFER_TIMEOUT)
+        holds = []
+        offered = []
+        for entry in entries:
+            block = find_best_block(free, scores, entry.seats)
+            if block is None:
+                break
+
+            row, first_seat = block
+            for seat in range(first_seat, first_seat + entry.seats):
+                free[row - 1, seat - 1] = False
+                holds.append(
+                    SeatHold(
+                        show_session=show_session,
+                        row=row,
+                        seat=seat,
+                        waitlist_entry=entry,
+                        expires_at=expires_at,
+                    )
+                )
+            entry.status = WaitlistEntry.OFFERED
+            entry.offered_at = now
+            entry.expires_at = expires_at
+            offered.append(entry)
+
+        if offered:
+            SeatHold.objects.bulk_create(holds)
+            WaitlistEntry.objects.bulk_update(
+                offered, ["status", "offered_at", "expires_at"]
+            )
+            transaction.on_commit(lambda: invalidate_seat_map(show_session.id))
+    return len(offered)
+
+
+def offer_seats(batch_size=None, now=None):
+    """hold freed seats for waiting entries of every upcoming session"""
+    batch_size = batch_size or settings.WAITLIST_BATCH_SIZE
+    now = now or timezone.now()
+    show_session_ids = (
+        WaitlistEntry.objects.filter(
+            status=WaitlistEntry.WAITING, show_session__show_time__gt=now
+        )
+        .order_by()
+        .values_list("show_session_id", flat=True)
+        .distinct()
+    )
+    return sum(
+        offer_session_seats(show_session_id, batch_size, now)
+        for show_session_id in list(show_session_ids)
+    )
+
+
+def dispatch_notifications(batch_size=None):
+    """notify one batch of offered users, returns how many were notified
+
+    The batch stays locked while the notifier runs, so a failed dispatch
+    rolls back and the same entries are retried on the next pass. Their
+    seats stay held meanwhile, an offer that cannot be sent before it
+    expires releases them like an unclaimed one.
+    """
+    batch_size = batch_size or settings.WAITLIST_BATCH_SIZE
+    with transaction.atomic():
+        entries = list(
+            WaitlistEntry.objects.select_for_update(
+                skip_locked=True, of=("self",)
+            )
+            .filter(status=WaitlistEntry.OFFERED, notified_at__isnull=True)
+            .select_related("user", "show_session__astronomy_show")
+            .order_by("id")[:batch_size]
+        )
+        if not entries:
+            return 0
+
+        get_waitlist_notifier().notify(entries)
+        WaitlistEntry.objects.filter(
+            id__in=[entry.id for entry in entries]
+        ).update(notified_at=timezone.now())
+    return len(entries)
+
+
+def process_waitlist(batch_size=None):
+    """one worker pass: expire offers, make new ones and notify them
+
+    Returns (expired, offered, notified).
+    """
+    expired = expire_offers()
+    offered = offer_seats(batch_size)
+    notified = 0
+    while True:
+        dispatched = dispatch_notifications(batch_size)
+        notified += dispatched
+        if not dispatched:
+            break
+    return expired, offered, notified
@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "planetarium_api_service.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from planetarium.sse import SeatEventsRouter  # noqa: E402
+
+application = SeatEventsRouter(django_application)
@@ -0,0 +1,226 @@
+"""Several API requests in one round trip.
+
+POST /api/batch/ takes {"requests": [{"method", "path", "headers",
+"body"}, ...]} for routes of the planetarium and user apps and answers
+{"responses": [{"status", "headers", "body"}, ...]} in the same order.
+The batch is authenticated once, its sub-requests are dispatched
+straight to their views with the same user and count against the
+throttles of those views like direct requests do. Consecutive
+safe sub-requests run concurrently on BATCH_WORKERS threads when no
+transaction is open, unsafe ones run one at a time in order. A
+sub-request whose view raises gets the error response Django would have
+sent for it, the rest of the batch still runs.
+"""
+import functools
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from planetarium_api_service.db_routing import SAFE_METHODS, replica_reads
+
+BATCHED_APPS = ("planetarium", "user")
+
+# environ of the batch request that sub-requests inherit, besides their
+# own headers
+INHERITED_ENVIRON = (
+    "REMOTE_ADDR", "SERVER_NAME", "SERVER_PORT", "SERVER_PROTOCOL",
+    "HTTP_HOST", "HTTP_USER_AGENT", "HTTP_ACCEPT_LANGUAGE", "HTTP_COOKIE",
+    "HTTP_X_FORWARDED_FOR",
+)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(
+        choices=["GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"]
+    )
+    path = serializers.CharField()
+    headers = serializers.DictField(
+        child=serializers.CharField(), required=False, default=dict
+    )
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_path(self, path):
+        try:
+            match = resolve(urlsplit(path).path)
+        except Resolver404:
+            raise serializers.ValidationError("Unknown path.")
+        if not set(match.app_names) & set(BATCHED_APPS):
+            raise serializers.ValidationError(
+                "Only planetarium and user routes can be batched."
+            )
+        return path
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(
+        many=True, allow_empty=False, max_length=settings.BATCH_MAX_REQUESTS
+    )
+
+
+class SubResponseSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    headers = serializers.DictField(child=serializers.CharField())
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    responses = SubResponseSerializer(many=True)
+
+
+def build_request(request, method, path, headers, body):
+    """HttpRequest of a sub-request, authenticated as the batch request"""
+    url = urlsplit(path)
+    content = b"" if body is None else json.dumps(body).encode()
+    environ = {
+        key: request.META[key]
+        for key in INHERITED_ENVIRON
+        if key in request.META
+    }
+    for name, value in headers.items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+    environ.update({
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(content)),
+        "wsgi.input": io.BytesIO(content),
+        "wsgi.url_scheme": request.scheme,
+    })
+
+    sub_request = WSGIRequest(environ)
+    if request.user.is_authenticated:
+        # picked up by rest_framework.request.Request instead of
+        # authenticating again
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def dispatch(sub_request):
+    """response of a sub-request, an error response if its view raises"""
+    match = resolve(sub_request.path_info)
+    sub_request.resolver_match = match
+    pinned = settings.REPLICA_PIN_COOKIE in sub_request.COOKIES
+    with replica_reads(sub_request.method in SAFE_METHODS and not pinned):
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+            if hasattr(response, "render"):
+                response.render()
+        except Exception as exc:
+            # one failing sub-request must not fail the whole batch
+            response = response_for_exception(sub_request, exc)
+    return response
+
+
+def _dispatch_in_worker(sub_request):
+    # worker threads keep their connections like request threads do
+    close_old_connections()
+    try:
+        return dispatch(sub_request)
+    finally:
+        close_old_connections()
+
+
+@functools.cache
+def executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.BATCH_WORKERS, thread_name_prefix="batch"
+    )
+
+
+def run_requests(sub_requests):
+    """responses of `sub_requests`, safe ones run concurrently in groups"""
+    # inside a transaction other threads would not see its writes
+    concurrent = settings.BATCH_WORKERS > 1 and not connection.in_atomic_block
+    responses = [None] * len(sub_requests)
+    reads = []
+
+    def run_reads():
+        if concurrent and len(reads) > 1:
+            futures = [
+                (index, executor().submit(
+                    copy_context().run, _dispatch_in_worker, sub_request
+                ))
+                for index, sub_request in reads
+            ]
+            for index, future in futures:
+                responses[index] = future.result()
+        else:
+            for index, sub_request in reads:
+                responses[index] = dispatch(sub_request)
+        reads.clear()
+
+    for index, sub_request in enumerate(sub_requests):
+        if sub_request.method in SAFE_METHODS:
+            reads.append((index, sub_request))
+        else:
+            run_reads()
+            responses[index] = dispatch(sub_request)
+    run_reads()
+    return responses
+
+
+def response_payload(response):
+    if response.streaming:
+        response.close()
+        return {
+            "status": 400,
+            "headers": {},
+            "body": {"detail": "Streaming responses cannot be batched."},
+        }
+
+    body = response.content.decode() or None
+    content_type = response.get("Content-Type", "")
+    if body and content_type.startswith("application/json"):
+        body = json.loads(body)
+    return {
+        "status": response.status_code,
+        "headers": dict(response.items()),
+        "body": body,
+    }
+
+
+class BatchView(APIView):
+    """run several planetarium and user API requests in one round trip"""
+
+    throttle_scope = "batch"
+
+    @extend_schema(request=BatchSerializer, responses=BatchResponseSerializer)
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sub_requests = [
+            build_request(
+                request,
+                item["method"],
+                item["path"],
+                item["headers"],
+                item.get("body"),
+            )
+            for item in serializer.validated_data["requests"]
+        ]
+
+        payloads = [
+            response_payload(response)
+            for response in run_requests(sub_requests)
+        ]
+        # only pin the client to the primary if something was written
+        request._request.replica_pin = any(
+            sub_request.method not in SAFE_METHODS and payload["status"] < 400
+            for sub_request, payload in zip(sub_requests, payloads)
+        )
+        return Response({"responses": payloads})
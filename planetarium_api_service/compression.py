@@ -0,0 +1,194 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(
+            level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    encoding = "zstd"
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+
+_coding_re = re.compile(r"^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$")
+
+
+def accepted_encodings(header):
+    """{"gzip": 1.0, "br": 0.5} from an Accept-Encoding header"""
+    accepted = {}
+    for coding in header.split(","):
+        match = _coding_re.match(coding)
+        if match is None:
+            continue
+        try:
+            quality = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+        accepted[match[1].lower()] = quality
+    return accepted
+
+
+def compression_levels(content_type):
+    """COMPRESSION_LEVELS entry of a Content-Type, None if not compressed"""
+    media_type = content_type.split(";")[0].strip().lower()
+    levels = settings.COMPRESSION_LEVELS
+    if media_type in levels:
+        return levels[media_type]
+    return levels.get(media_type.split("/")[0] + "/*")
+
+
+def negotiate(accept_encoding, levels):
+    """(encoding, level) the client accepts most, None for identity
+
+    Ties go to the encoding listed first for the content type.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    best, best_quality = None, 0
+    for encoding, level in levels.items():
+        if encoding not in COMPRESSORS:
+            continue
+        quality = accepted.get(encoding, accepted.get("*", 0))
+        if quality > best_quality:
+            best, best_quality = (encoding, level), quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip, brotli or zstd.
+
+    Only media types listed in COMPRESSION_LEVELS are compressed, which
+    leaves images and other already compressed media alone, as well as
+    bodies under COMPRESSION_MIN_SIZE bytes. Streaming responses are
+    compressed chunk by chunk and flushed after each one, so clients
+    still receive rows as they are produced.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        levels = compression_levels(response.get("Content-Type", ""))
+        if (
+            levels is None
+            or response.has_header("Content-Encoding")
+            or "no-transform" in response.get("Cache-Control", "")
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        negotiated = negotiate(
+            request.headers.get("Accept-Encoding", ""), levels
+        )
+        if negotiated is None:
+            return response
+        encoding, level = negotiated
+        compressor = COMPRESSORS[encoding](level)
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _compress_async(
+                    response.streaming_content, compressor
+                )
+            else:
+                response.streaming_content = _compress(
+                    response.streaming_content, compressor
+                )
+            del response["Content-Length"]
+        else:
+            content = (
+                compressor.compress(response.content) + compressor.finish()
+            )
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # the compressed body is a different representation of the resource
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+
+def _compress(chunks, compressor):
+    for chunk in chunks:
+        if data := compressor.compress(chunk) + compressor.flush():
+            yield data
+    yield compressor.finish()
+
+
+async def _compress_async(chunks, compressor):
+    async for chunk in chunks:
+        if data := compressor.compress(chunk) + compressor.flush():
+            yield data
+    yield compressor.finish()
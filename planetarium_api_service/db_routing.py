@@ -0,0 +1,84 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_read_from_replica = ContextVar("read_from_replica", default=False)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@contextmanager
+def replica_reads(enabled):
+    """route reads of the current context to replicas while `enabled`"""
+    token = _read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads of safe requests to DATABASE_REPLICAS.
+
+    Reads go to a random replica only while ReplicaRoutingMiddleware has
+    marked the current request as replica safe and no transaction is open
+    on the primary. Everything else, including management commands and
+    background work, uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            not settings.DATABASE_REPLICAS
+            or not _read_from_replica.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Mark safe requests for replica reads and pin writers to the primary.
+
+    A successful unsafe request sets a short-lived cookie. While it is
+    present, that client reads from the primary too, so a client sees
+    its own writes even while replicas lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        with replica_reads(request.method in SAFE_METHODS and not pinned):
+            response = self.get_response(request)
+
+        # views that only read despite the method, like /api/batch/, can
+        # clear request.replica_pin
+        wrote = getattr(
+            request, "replica_pin", request.method not in SAFE_METHODS
+        )
+        if wrote and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,159 @@
+"""OpenAPI schema generated once per deploy.
+
+``manage.py build_schema`` writes SCHEMA_FILE when the service is
+deployed, along with every rendered format and its compressed variants
+(``openapi-schema.json.yaml``, ``.yaml.gz``, ``.yaml.br``, ...). Without
+the file the schema is generated on the first request. Either way each
+process loads it once per format and serves the same bytes with an ETag
+until it is restarted. Prebuilt variants are sent as they are, with
+their own Content-Encoding, so CompressionMiddleware leaves them alone.
+"""
+import functools
+import hashlib
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+from planetarium_api_service.compression import (
+    COMPRESSORS,
+    compression_levels,
+    negotiate,
+)
+
+# file suffixes of the compressed variants
+ENCODING_SUFFIXES = {"gzip": "gz", "br": "br", "zstd": "zst"}
+
+
+def generate_schema():
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(
+        request=None, public=spectacular_settings.SERVE_PUBLIC
+    )
+
+
+@functools.cache
+def load_schema():
+    """schema of SCHEMA_FILE if it was built, generated otherwise"""
+    try:
+        with open(settings.SCHEMA_FILE) as schema_file:
+            return json.load(schema_file)
+    except FileNotFoundError:
+        return generate_schema()
+
+
+def _etag(content):
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def schema_variant_path(format, encoding=None):
+    """path of a format of the built schema, compressed with `encoding`"""
+    path = f"{settings.SCHEMA_FILE}.{format}"
+    if encoding is not None:
+        path = f"{path}.{ENCODING_SUFFIXES[encoding]}"
+    return Path(path)
+
+
+def render_schema(renderer_class, schema):
+    renderer = renderer_class()
+    return renderer.render(schema, renderer.media_type, {})
+
+
+def write_schema_variants(schema):
+    """write every format of the schema, plain and compressed
+
+    Variants use the COMPRESSION_LEVELS of the format's media type and
+    are skipped when they do not make the schema smaller. Returns the
+    written paths.
+    """
+    written = []
+    formats = {}
+    for renderer_class in SpectacularAPIView.renderer_classes:
+        formats.setdefault(renderer_class.format, renderer_class)
+    for format, renderer_class in formats.items():
+        content = render_schema(renderer_class, schema)
+        variants = {None: content}
+        levels = compression_levels(renderer_class.media_type) or {}
+        for encoding, level in levels.items():
+            if encoding not in COMPRESSORS:
+                continue
+            compressor = COMPRESSORS[encoding](level)
+            compressed = compressor.compress(content) + compressor.finish()
+            if len(compressed) < len(content):
+                variants[encoding] = compressed
+        for encoding, variant in variants.items():
+            path = schema_variant_path(format, encoding)
+            path.unlink(missing_ok=True)
+            path.write_bytes(variant)
+            written.append(path)
+    return written
+
+
+@functools.cache
+def rendered_schema(renderer_class):
+    """{encoding: (content, etag)} of the schema by `renderer_class`
+
+    None is the uncompressed schema. Compressed variants are only those
+    built by build_schema, the middleware compresses the others.
+    """
+    path = schema_variant_path(renderer_class.format)
+    if not path.exists():
+        content = render_schema(renderer_class, load_schema())
+        return {None: (content, _etag(content))}
+
+    variants = {}
+    for encoding in (None, *ENCODING_SUFFIXES):
+        try:
+            content = schema_variant_path(
+                renderer_class.format, encoding
+            ).read_bytes()
+        except FileNotFoundError:
+            continue
+        variants[encoding] = content, _etag(content)
+    return variants
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """SpectacularAPIView serving the schema from load_schema"""
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        # ?lang= and ?version= produce other schemas
+        if set(request.query_params) - {"format"}:
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        variants = rendered_schema(type(renderer))
+        levels = compression_levels(renderer.media_type) or {}
+        negotiated = negotiate(
+            request.headers.get("Accept-Encoding", ""),
+            {
+                encoding: level
+                for encoding, level in levels.items()
+                if encoding in variants
+            },
+        )
+        encoding = negotiated[0] if negotiated else None
+        content, etag = variants[encoding]
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+
+        response = HttpResponse(content, content_type=content_type, headers={
+            "ETag": etag,
+            # the schema only changes on deploy, revalidating is a 304
+            "Cache-Control": "public, no-cache",
+            "Content-Disposition": (
+                f'inline; filename="{self._get_filename(request, None)}"'
+            ),
+        })
+        if encoding is not None:
+            response["Content-Encoding"] = encoding
+        if len(variants) > 1:
+            patch_vary_headers(response, ("Accept-Encoding",))
+        return get_conditional_response(request, etag=etag, response=response)
@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "planetarium_api_service.compression.CompressionMiddleware",
+    "planetarium_api_service.db_routing.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -92,6 +94,68 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma separated hosts sharing the primary's credentials.
+# Safe requests read from them unless the client wrote within the last
+# REPLICA_PIN_SECONDS, tracked by the REPLICA_PIN_COOKIE cookie.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1
+):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["planetarium_api_service.db_routing.ReplicaRouter"]
+REPLICA_PIN_COOKIE = "pin_primary"
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Rate limits, idempotency keys and seat maps are shared between workers
+# through Redis when REDIS_URL is set.
+
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+        if os.getenv("REDIS_URL")
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/
+# New passwords use the first hasher, argon2 unless PASSWORD_HASHER is
+# "scrypt". Hashes made by the others, or with other cost parameters, are
+# upgraded on login.
+
+PASSWORD_HASHERS = [
+    "user.hashers.TunedArgon2PasswordHasher",
+    "user.hashers.TunedScryptPasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+if os.getenv("PASSWORD_HASHER") == "scrypt":
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+# Single-lane parameters favour throughput under concurrent load
+PASSWORD_HASHER_PARAMS = {
+    "argon2": {"time_cost": 2, "memory_cost": 19456, "parallelism": 1},
+    "scrypt": {"work_factor": 2**14, "block_size": 8, "parallelism": 1},
+}
+
+# Threads hashing passwords concurrently in each process
+PASSWORD_HASHING_WORKERS = int(
+    os.getenv("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -145,14 +209,21 @@ AUTH_USER_MODEL = "user.USER"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "planetarium_api_service.throttling.SlidingWindowRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "10/day", "user": "30/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "60/min",
+        "user": "300/min",
+        "catalog": "600/min",
+        "reservation_write": "20/min",
+        "batch": "60/min",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
+    ),
+    "DEFAULT_PAGINATION_CLASS": (
+        "planetarium_api_service.pagination.BoundedLimitOffsetPagination"
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 5,
 }
 
@@ -173,4 +244,130 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=55),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.TokenObtainPairSerializer",
 }
+
+# Seconds an authenticated user stays cached between saves
+JWT_USER_CACHE_TIMEOUT = 60
+
+# Build request.user from token claims instead of the database; staff
+# changes then only apply once the user's tokens are refreshed
+JWT_STATELESS_USER = False
+
+# Seconds a show session seat map stays cached between ticket changes
+SEAT_MAP_CACHE_TIMEOUT = 5
+
+# Change feed behind the show session seat events stream, InMemorySeatChangeFeed
+# only fans out within a single process. Unset, PostgresSeatChangeFeed is used
+# on PostgreSQL and InMemorySeatChangeFeed on other databases
+SEAT_CHANGE_FEED = os.getenv("SEAT_CHANGE_FEED")
+
+# Pending deltas per stream before a slow client is asked to resync
+SEAT_EVENTS_QUEUE_SIZE = 100
+
+# Seconds between keepalive comments on idle seat event streams
+SEAT_EVENTS_KEEPALIVE = 15
+
+# Seconds a ticket from show-session/{id}/events/ticket/ may open a stream
+SEAT_EVENTS_TICKET_TIMEOUT = 30
+
+# Idempotency-Key handling for reservation creation, in seconds
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+# Seconds a sale event waits before it is folded into the sales rollup,
+# covering reservation transactions that are still in flight
+SALES_ROLLUP_LAG = 60
+
+# Occupancy analytics: tickets fetched per streamed chunk, seats listed as
+# most popular, and seconds a report is kept (reports also expire on any
+# ticket change)
+OCCUPANCY_CHUNK_SIZE = 5000
+OCCUPANCY_POPULAR_SEATS = 10
+OCCUPANCY_CACHE_TIMEOUT = 60 * 60
+
+# largest block of adjacent seats the best-available allocator will look for
+ALLOCATION_MAX_SEATS = 10
+
+# Ticket table partitioning (PostgreSQL): months ahead to keep partitions
+# ready for, and months of past partitions to keep attached (None keeps all)
+TICKET_PARTITION_MONTHS_AHEAD = 3
+TICKET_PARTITION_RETENTION_MONTHS = (
+    int(os.getenv("TICKET_PARTITION_RETENTION_MONTHS"))
+    if os.getenv("TICKET_PARTITION_RETENTION_MONTHS")
+    else None
+)
+
+# Cold storage of past show sessions: directory of the gzipped NDJSON
+# archive, sessions moved per batch, and days after a show it is archived
+ARCHIVE_ROOT = os.getenv("ARCHIVE_ROOT", BASE_DIR / "archive")
+ARCHIVE_BATCH_SIZE = 200
+ARCHIVE_AFTER_DAYS = 365
+
+# Reservations: milliseconds to wait for the show session lock (PostgreSQL),
+# retries after a lock timeout or constraint conflict, and the base backoff
+# in seconds between retries
+RESERVATION_LOCK_TIMEOUT = 2000
+RESERVATION_RETRIES = 3
+RESERVATION_RETRY_BACKOFF = 0.05
+
+# Largest ?limit= of paginated lists, views may lower it with
+# max_page_size. Staff stream bulk reads instead, STREAM_CHUNK_SIZE rows
+# at a time.
+PAGINATION_MAX_LIMIT = 100
+STREAM_CHUNK_SIZE = 500
+
+# Paginated lists count exactly up to this many rows, larger results use
+# the PostgreSQL planner estimate, kept for PAGINATION_ESTIMATE_CACHE_TIMEOUT
+# seconds, and are flagged with count_estimated
+PAGINATION_EXACT_COUNT_THRESHOLD = 10000
+PAGINATION_ESTIMATE_CACHE_TIMEOUT = 60
+
+# Response compression: media types to compress, each with its encodings
+# in order of preference and their levels. brotli and zstd are used when
+# the brotli and zstandard packages are installed. HTML is left out, its
+# pages carry CSRF tokens (BREACH). Bodies under COMPRESSION_MIN_SIZE
+# bytes are sent as they are.
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_LEVELS = {
+    "application/json": {"br": 5, "zstd": 6, "gzip": 6},
+    "application/x-ndjson": {"zstd": 3, "br": 4, "gzip": 4},
+    "application/vnd.oai.openapi": {"br": 9, "zstd": 12, "gzip": 9},
+    "application/vnd.oai.openapi+json": {"br": 9, "zstd": 12, "gzip": 9},
+    "application/javascript": {"br": 9, "zstd": 12, "gzip": 9},
+    "text/css": {"br": 9, "zstd": 12, "gzip": 9},
+    "text/plain": {"br": 5, "zstd": 6, "gzip": 6},
+}
+
+# OpenAPI schema built by `manage.py build_schema` on deploy, generated on
+# the first request to /api/schema/ when the file is missing
+SCHEMA_FILE = os.getenv("SCHEMA_FILE", BASE_DIR / "openapi-schema.json")
+
+# /api/batch/: most sub-requests per batch, and threads running the safe
+# ones concurrently
+BATCH_MAX_REQUESTS = 20
+BATCH_WORKERS = 4
+
+# Schedule calendar: longest date range per request, and seconds a
+# calendar stays cached (it is also expired by schedule and ticket changes)
+CALENDAR_MAX_DAYS = 62
+CALENDAR_CACHE_TIMEOUT = 60 * 60
+
+# Door check-in: HMAC key of ticket tokens, also loaded onto the scanners
+# (derived from SECRET_KEY when unset), most scans per sync request and
+# tickets per UPDATE
+TICKET_TOKEN_KEY = os.getenv("TICKET_TOKEN_KEY")
+CHECK_IN_MAX_SCANS = 5000
+CHECK_IN_BATCH_SIZE = 1000
+
+# Waitlist of sold-out sessions: seconds an offer holds its seats, entries
+# offered or notified per batch, the notifier class, and seconds the
+# process_waitlist worker sleeps between passes
+WAITLIST_OFFER_TIMEOUT = 15 * 60
+WAITLIST_BATCH_SIZE = 100
+WAITLIST_NOTIFIER = os.getenv(
+    "WAITLIST_NOTIFIER", "planetarium.waitlist.EmailWaitlistNotifier"
+)
+WAITLIST_WORKER_INTERVAL = 5
@@ -0,0 +1,114 @@
+import math
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class SlidingWindowRateThrottle(BaseThrottle):
+    """Sliding window counter rate limit with O(1) cache state per client.
+
+    Each client has one counter for the current fixed window and one for
+    the previous window, both updated with atomic cache increments. The
+    previous counter is weighted by how much of it still overlaps the
+    sliding window, so there is no timestamp list to rewrite.
+
+    The scope comes from ``view.throttle_scopes[view.action]``, then
+    ``view.throttle_scope``, then "user" or "anon". Rates are read from
+    ``DEFAULT_THROTTLE_RATES``. Standard RateLimit-* headers are added to
+    every throttled view response. Sub-requests of /api/batch/ are
+    throttled by their own views, on top of the batch request itself.
+    """
+
+    cache = default_cache
+    timer = time.time
+    cache_format = "throttle_%(scope)s_%(ident)s_%(window)s"
+    THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+
+    def __init__(self):
+        self._wait = None
+
+    def get_scope(self, request, view):
+        scope = getattr(view, "throttle_scopes", {}).get(
+            getattr(view, "action", None)
+        )
+        if scope is None:
+            scope = getattr(view, "throttle_scope", None)
+        if scope is None:
+            is_authenticated = request.user and request.user.is_authenticated
+            scope = "user" if is_authenticated else "anon"
+        return scope
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return super().get_ident(request)
+
+    @staticmethod
+    def parse_rate(rate):
+        """parse "<num>/<period>" into (num requests, duration in seconds)"""
+        num, period = rate.split("/")
+        duration = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+        return int(num), duration
+
+    def increment(self, key, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # the key expired between add() and incr()
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = self.THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        num_requests, duration = self.parse_rate(rate)
+        ident = self.get_ident(request)
+        now = self.timer()
+        window = int(now // duration)
+        elapsed = now - window * duration
+
+        current = self.increment(
+            self.cache_format % {"scope": scope, "ident": ident, "window": window},
+            duration * 2,
+        )
+        previous = self.cache.get(
+            self.cache_format % {
+                "scope": scope, "ident": ident, "window": window - 1
+            },
+            0,
+        )
+        weight = 1 - elapsed / duration
+        count = previous * weight + current
+        allowed = count <= num_requests
+
+        reset = math.ceil(duration - elapsed)
+        view.headers.update({
+            "RateLimit-Limit": str(num_requests),
+            "RateLimit-Remaining": str(max(0, math.floor(num_requests - count))),
+            "RateLimit-Reset": str(reset),
+        })
+
+        if not allowed:
+            self._wait = self._get_wait(
+                num_requests, duration, elapsed, current, previous
+            )
+        return allowed
+
+    @staticmethod
+    def _get_wait(num_requests, duration, elapsed, current, previous):
+        """seconds until the weighted count drops back under the limit"""
+        if current <= num_requests and previous:
+            needed = (1 - (num_requests - current) / previous) * duration
+            return max(0.0, needed - elapsed)
+        # the current window is over the limit on its own, wait for it to
+        # become the previous window and decay enough
+        return (duration - elapsed) + duration * (1 - num_requests / current)
+
+    def wait(self):
+        return self._wait
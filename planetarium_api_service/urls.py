@@ -16,16 +16,24 @@ Including another URLconf
 """
 from django.conf.urls.static import static
 from django.contrib import admin
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
 
 from planetarium_api_service import settings
+from planetarium_api_service.batch import BatchView
+from planetarium_api_service.schema import CachedSpectacularAPIView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/planetarium/", include("planetarium.urls", namespace="planetarium")),
     path("api/user/", include("user.urls", namespace="user")),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/batch/", BatchView.as_view(), name="batch"),
+    path("api/schema/", CachedSpectacularAPIView.as_view(), name="schema"),
     path("api/doc/swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui",),
     path("api/doc/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc",),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# admin static files under uvicorn, which unlike runserver does not serve
+# them; empty without DEBUG
+urlpatterns += staticfiles_urlpatterns()
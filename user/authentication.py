@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def cached_user_fields(user):
+    """what authenticating a token needs of a user, nothing more"""
+    return {
+        "id": user.pk,
+        "is_active": user.is_active,
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+        # changes with the password, like the revoke claim of its tokens
+        "token_version": get_md5_hash_password(user.password),
+    }
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that does not hit the database on every request.
+
+    After the token signature is verified, the fields authentication needs
+    are read from a cache that lives JWT_USER_CACHE_TIMEOUT seconds and is
+    invalidated when the user is saved, and request.user is a token user
+    built from them. With JWT_STATELESS_USER the user is built from the
+    token claims (id, is_staff) and the database is never queried.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        if settings.JWT_STATELESS_USER:
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        key = user_cache_key(validated_token[api_settings.USER_ID_CLAIM])
+        fields = cache.get(key)
+        if fields is None:
+            fields = cached_user_fields(super().get_user(validated_token))
+            cache.set(key, fields, settings.JWT_USER_CACHE_TIMEOUT)
+
+        if not fields["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != fields["token_version"]:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."),
+                    code="password_changed",
+                )
+
+        return api_settings.TOKEN_USER_CLASS({
+            api_settings.USER_ID_CLAIM: fields["id"],
+            "is_staff": fields["is_staff"],
+            "is_superuser": fields["is_superuser"],
+        })
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class TunedHasherMixin:
+    """Read cost parameters from PASSWORD_HASHER_PARAMS[algorithm].
+
+    Changing the parameters makes ``must_update`` true for existing
+    hashes, so they are upgraded on the next successful login.
+    """
+
+    def __init__(self):
+        params = settings.PASSWORD_HASHER_PARAMS.get(self.algorithm, {})
+        for name, value in params.items():
+            setattr(self, name, value)
+
+
+class TunedArgon2PasswordHasher(TunedHasherMixin, hashers.Argon2PasswordHasher):
+    pass
+
+
+class TunedScryptPasswordHasher(TunedHasherMixin, hashers.ScryptPasswordHasher):
+    pass
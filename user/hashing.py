@@ -0,0 +1,45 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+_executor = None
+
+
+def get_executor():
+    """bounded pool that runs every password hash of this process
+
+    argon2 and scrypt release the GIL, so hashes run in parallel while
+    request threads and event loops only wait on the result.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_WORKERS,
+            thread_name_prefix="password-hashing",
+        )
+    return _executor
+
+
+def make_password(password):
+    return get_executor().submit(hashers.make_password, password).result()
+
+
+def verify_password(password, encoded):
+    """return (is_correct, must_update) for the encoded password"""
+    return get_executor().submit(
+        hashers.verify_password, password, encoded
+    ).result()
+
+
+async def amake_password(password):
+    return await asyncio.wrap_future(
+        get_executor().submit(hashers.make_password, password)
+    )
+
+
+async def averify_password(password, encoded):
+    return await asyncio.wrap_future(
+        get_executor().submit(hashers.verify_password, password, encoded)
+    )
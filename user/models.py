@@ -5,6 +5,8 @@ from django.contrib.auth.models import (
 from django.db import models
 from django.utils.translation import gettext as _
 
+from user import hashing
+
 
 class UserManager(BaseUserManager):
     """Define a model manager for User model with no username field."""
@@ -50,3 +52,27 @@ class User(AbstractUser):
     REQUIRED_FIELDS = []
 
     objects = UserManager()
+
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Check the password on the hashing pool, upgrading old hashes"""
+        is_correct, must_update = hashing.verify_password(
+            raw_password, self.password
+        )
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=["password"])
+        return is_correct
+
+    async def acheck_password(self, raw_password):
+        is_correct, must_update = await hashing.averify_password(
+            raw_password, self.password
+        )
+        if is_correct and must_update:
+            self.password = await hashing.amake_password(raw_password)
+            await self.asave(update_fields=["password"])
+        return is_correct
@@ -1,3 +1,129 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from user.authentication import CachedJWTAuthentication, user_cache_key
+from user.serializers import TokenObtainPairSerializer
+
+ME_URL = reverse("user:manage")
+REGISTER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token_obtain_pair")
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.token = AccessToken.for_user(self.user)
+        self.authentication = CachedJWTAuthentication()
+
+    def test_user_is_served_from_cache(self):
+        self.authentication.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self.token)
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertFalse(user.is_staff)
+
+    def test_cache_holds_no_password_hash(self):
+        self.authentication.get_user(self.token)
+        fields = cache.get(user_cache_key(self.user.pk))
+        self.assertEqual(
+            set(fields),
+            {"id", "is_active", "is_staff", "is_superuser", "token_version"},
+        )
+        self.assertNotIn(self.user.password, fields.values())
+
+    def test_saving_user_invalidates_cache_on_commit(self):
+        self.authentication.get_user(self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+            self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertTrue(self.authentication.get_user(self.token).is_staff)
+
+    def test_inactive_cached_user_is_rejected(self):
+        self.authentication.get_user(self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    @override_settings(JWT_STATELESS_USER=True)
+    def test_stateless_user_from_claims(self):
+        token = TokenObtainPairSerializer.get_token(self.user).access_token
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(token)
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertFalse(user.is_staff)
+
+
+class ManageUserApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+
+    def authenticate(self):
+        token = TokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_retrieve_me(self):
+        self.authenticate()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    @override_settings(JWT_STATELESS_USER=True)
+    def test_update_me_with_stateless_user(self):
+        self.authenticate()
+        res = self.client.patch(ME_URL, {"password": "newpass"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("newpass"))
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_register_hashes_with_argon2(self):
+        res = self.client.post(
+            REGISTER_URL, {"email": "new@test.com", "password": "testpass"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        user = get_user_model().objects.get(email="new@test.com")
+        self.assertTrue(user.password.startswith("argon2$"))
+        self.assertTrue(user.check_password("testpass"))
+
+    def test_login_upgrades_old_hash(self):
+        user = get_user_model().objects.create_user("old@test.com")
+        user.password = PBKDF2PasswordHasher().encode("testpass", "salt1234")
+        user.save()
+        res = self.client.post(
+            TOKEN_URL, {"email": "old@test.com", "password": "testpass"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("argon2$"))
+
+    async def test_async_check_password(self):
+        user = get_user_model()(email="async@test.com")
+        user.set_password("testpass")
+        self.assertTrue(await user.acheck_password("testpass"))
+        self.assertFalse(await user.acheck_password("wrongpass"))
@@ -1,6 +1,7 @@
+from django.contrib.auth import get_user_model
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
 
 from user.serializers import UserSerializer
 
@@ -11,8 +12,9 @@ class CreateUserView(generics.CreateAPIView):
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
+        if isinstance(self.request.user, TokenUser):
+            return get_user_model().objects.get(pk=self.request.user.pk)
         return self.request.user